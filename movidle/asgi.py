@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "movidle.settings")
 
 application = get_asgi_application()
+
+# El programador en proceso solo arranca en el servidor (no en los comandos
+# de manage.py, que no cargan este módulo)
+from moviegame.services.scheduler import arrancar_si_procede  # noqa: E402
+
+arrancar_si_procede()
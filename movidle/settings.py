@@ -40,6 +40,51 @@ import os
 
 OMDB_API_KEY = os.getenv("OMDB_API_KEY", "")
 
+# Caché. Las versiones del catálogo y de la película del día
+# (moviegame/services/catalog_cache.py, game_service.py) solo invalidan las
+# copias en memoria de TODOS los workers si la caché es compartida: en
+# producción con más de un proceso hay que definir MOVIDLE_REDIS_URL. Sin
+# ella se usa LocMem, que es por proceso (válida con un único worker).
+MOVIDLE_REDIS_URL = os.getenv("MOVIDLE_REDIS_URL", "")
+MOVIDLE_CACHE_COMPARTIDA = bool(MOVIDLE_REDIS_URL)
+if MOVIDLE_CACHE_COMPARTIDA:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": MOVIDLE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Programador de la película del día (ver moviegame/services/scheduler.py)
+MOVIDLE_PROGRAMADOR_AUTOMATICO = os.getenv("MOVIDLE_PROGRAMADOR", "") == "1"
+MOVIDLE_PROGRAMADOR_MINUTOS_ANTES = 5
+MOVIDLE_PROGRAMACION = {"dias": 7, "sin_repetir_dias": 365, "min_votos": 50_000}
+
+# Identificador del despliegue (p. ej. el SHA de git): invalida las páginas
+# cacheadas (moviegame/decorators.py) al desplegar una versión nueva
+MOVIDLE_DEPLOY_ID = os.getenv("MOVIDLE_DEPLOY_ID", "")
+
+# Pistas del solver por jugador y día (ver moviegame/services/solver.py)
+MOVIDLE_PISTAS_POR_DIA = 3
+
+# Archivo en frío de partidas antiguas (ver moviegame/services/archivo.py)
+MOVIDLE_ARCHIVO_DIR = Path(os.getenv("MOVIDLE_ARCHIVO_DIR", BASE_DIR / "archivo"))
+
+# Catálogo compilado y mapeado por todos los workers (ver
+# moviegame/services/snapshot_catalogo.py; se genera con compilar_catalogo).
+# Vacío = desactivado, el catálogo se carga de la BD en cada proceso.
+MOVIDLE_CATALOGO_SNAPSHOT = os.getenv("MOVIDLE_CATALOGO_SNAPSHOT", "")
+
+# Servicio de productos aliados (ver moviegame/services/aliados.py)
+MOVIDLE_ALIADOS_BASE = os.getenv("MOVIDLE_ALIADOS_BASE", "")
+
+# Detector de N+1 / consultas lentas (ver moviegame/services/query_profiler.py)
+MOVIDLE_PERFILADOR_CONSULTAS = os.getenv("MOVIDLE_PERFILADOR_CONSULTAS", "") == "1"
+MOVIDLE_PERFILADOR_REPETICIONES = 5
+MOVIDLE_PERFILADOR_LENTA_MS = 100
+
 
 # Application definition
 
@@ -56,6 +101,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "moviegame.middleware.MetricasMiddleware",
+    "moviegame.middleware.PerfiladorConsultasMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,6 +112,19 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Sesiones en caché con escritura diferida y usuario+jugador cacheados
+# (ver moviegame/sesiones.py y moviegame/backends.py). Solo con caché
+# compartida: con LocMem un logout o una invalidación no llegaría a los demás
+# workers, así que se quedan las sesiones en BD y ModelBackend. ModelBackend
+# sigue en la lista para no cerrar las sesiones abiertas con él.
+MOVIDLE_SESION_ESCRITURA_SEG = int(os.getenv("MOVIDLE_SESION_ESCRITURA_SEG", "60"))
+if MOVIDLE_CACHE_COMPARTIDA:
+    SESSION_ENGINE = "moviegame.sesiones"
+    AUTHENTICATION_BACKENDS = [
+        "moviegame.backends.BackendCacheado",
+        "django.contrib.auth.backends.ModelBackend",
+    ]
+
 ROOT_URLCONF = "movidle.urls"
 
 TEMPLATES = [
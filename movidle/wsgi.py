@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "movidle.settings")
 
 application = get_wsgi_application()
+
+# El programador en proceso solo arranca en el servidor (no en los comandos
+# de manage.py, que no cargan este módulo)
+from moviegame.services.scheduler import arrancar_si_procede  # noqa: E402
+
+arrancar_si_procede()
@@ -1,8 +1,59 @@
 from django.contrib import admin
-from .models import Pelicula, Jugador, Partida, Intento, Feedback, PeliculaDelDia
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min, QuerySet
+from django.utils.functional import cached_property
+from .models import Pelicula, Jugador, Partida, Intento, PeliculaDelDia
 from django.utils.html import format_html
 
 
+# =========================
+# Paginación barata para tablas grandes
+# =========================
+class EstimadoPaginator(Paginator):
+    """
+    Sin filtros, evita el COUNT(*) completo: usa la estimación del motor
+    (pg_class en PostgreSQL, rango de PK en SQLite). Con filtros cuenta de
+    verdad, apoyándose en los índices de fecha/estado.
+    """
+
+    umbral = 10_000  # por debajo, el COUNT real es barato y exacto
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if isinstance(qs, QuerySet) and not qs.query.where:
+            estimado = _estimar_filas(qs)
+            if estimado is not None and estimado > self.umbral:
+                return estimado
+        return super().count
+
+
+def _estimar_filas(qs: QuerySet) -> int | None:
+    conn = connections[qs.db]
+    if conn.vendor == "postgresql":
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [qs.model._meta.db_table],
+            )
+            row = cur.fetchone()
+        return int(row[0]) if row and row[0] > 0 else None
+    # MIN/MAX sobre la PK salen del índice: O(log n)
+    rango = qs.model._default_manager.using(qs.db).aggregate(a=Min("pk"), b=Max("pk"))
+    if rango["a"] is None:
+        return 0
+    return rango["b"] - rango["a"] + 1
+
+
+class HistorialAdmin(admin.ModelAdmin):
+    """Base para las tablas de historial (Partida/Intento)."""
+
+    paginator = EstimadoPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
 @admin.register(Pelicula)
 class PeliculaAdmin(admin.ModelAdmin):
     list_display = ("titulo", "anio", "director", "imdb_id")
@@ -20,36 +71,75 @@ class PeliculaAdmin(admin.ModelAdmin):
 @admin.register(Jugador)
 class JugadorAdmin(admin.ModelAdmin):
     list_display = ("user", "racha_actual", "racha_maxima")
+    list_select_related = ("user",)
     search_fields = ("user__username",)
 
 
+_CUADROS = {"VERDE": "🟩", "AMARILLO": "🟨", "GRIS": "⬜"}
+_FLECHAS = {"UP": "↑", "DOWN": "↓", "": ""}
+
+
+@admin.display(description="Feedback")
+def feedback_resumen(obj: Intento) -> str:
+    """Año, votos, géneros, duración, director, actores y rating como cuadros."""
+    fb = obj.feedback
+    if fb is None:
+        return "-"
+    cuadros = "".join(
+        _CUADROS[color] + _FLECHAS[flecha]
+        for color, flecha in (
+            (fb.color_anio, fb.flecha_anio),
+            (fb.color_popularidad, fb.flecha_popularidad),
+            (fb.color_genero, ""),
+            (fb.color_duracion, fb.flecha_duracion),
+            (fb.color_direccion, ""),
+            (fb.color_actores, ""),
+            (fb.color_rating, ""),
+        )
+    )
+    return f"{cuadros} {'✔' if fb.es_correcto else '✗'}"
+
+
 class IntentoInline(admin.TabularInline):
     model = Intento
     extra = 0
-    readonly_fields = ("numero_intento", "pelicula_adivinada", "creado_en")
+    readonly_fields = ("numero_intento", "pelicula_adivinada", feedback_resumen, "creado_en")
+    fields = readonly_fields
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("pelicula_adivinada")
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Partida)
-class PartidaAdmin(admin.ModelAdmin):
+class PartidaAdmin(HistorialAdmin):
     list_display = ("jugador", "fecha", "pelicula_secreta", "estado")
     list_filter = ("fecha", "estado")
+    list_select_related = ("jugador__user", "pelicula_secreta")
+    date_hierarchy = "fecha"
+    raw_id_fields = ("jugador", "pelicula_secreta")
     inlines = [IntentoInline]
 
 
-@admin.register(Feedback)
-class FeedbackAdmin(admin.ModelAdmin):
+@admin.register(Intento)
+class IntentoAdmin(HistorialAdmin):
     list_display = (
-        "intento",
-        "color_anio",
-        "color_genero",
-        "color_direccion",
-        "color_actores",
-        "es_correcto",
+        "partida", "numero_intento", "pelicula_adivinada", feedback_resumen, "creado_en"
     )
+    list_select_related = ("partida__jugador__user", "pelicula_adivinada")
+    raw_id_fields = ("partida", "pelicula_adivinada")
+    # El feedback lo escribe el juego, no el staff
+    readonly_fields = (feedback_resumen,)
+    exclude = ("feedback_code",)
 
 
 @admin.register(PeliculaDelDia)
 class PeliculaDelDiaAdmin(admin.ModelAdmin):
     list_display = ("fecha", "pelicula", "creado_en")
     list_filter = ("fecha",)
+    list_select_related = ("pelicula",)
     search_fields = ("pelicula__titulo",)
+    raw_id_fields = ("pelicula",)
@@ -0,0 +1,57 @@
+# moviegame/backends.py
+"""
+Backend de autenticación con el usuario (y su Jugador) en caché.
+
+AuthenticationMiddleware resuelve request.user con backend.get_user(id) en
+cada petición autenticada; aquí esa lectura sale de la caché, con el
+Jugador ya unido (select_related), así que request.user.jugador tampoco
+consulta. La comprobación del hash de sesión de Django se mantiene.
+
+Invalidación: señales de User y Jugador (save/delete) por usuario, y
+invalidar_usuarios() para los UPDATE masivos que no disparan señales
+(rachas nocturnas, recálculos). Como las sesiones, solo se activa con caché
+compartida (settings): con LocMem la invalidación no saldría del proceso.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USUARIOS_VERSION_KEY = "movidle:usuarios:version"
+USUARIO_TTL = 300
+
+
+def _version() -> int:
+    version = cache.get(USUARIOS_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(USUARIOS_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def _clave(user_id) -> str:
+    return f"movidle:usuario:{_version()}:{user_id}"
+
+
+def invalidar_usuario(user_id) -> None:
+    cache.delete(_clave(user_id))
+
+
+def invalidar_usuarios() -> None:
+    """Descarta todos los usuarios cacheados (en todos los procesos)."""
+    try:
+        cache.incr(USUARIOS_VERSION_KEY)
+    except ValueError:
+        cache.set(USUARIOS_VERSION_KEY, 2, timeout=None)
+
+
+class BackendCacheado(ModelBackend):
+    def get_user(self, user_id):
+        clave = _clave(user_id)
+        user = cache.get(clave)
+        if user is None:
+            User = get_user_model()
+            user = User._default_manager.select_related("jugador").filter(pk=user_id).first()
+            if user is None:
+                return None
+            cache.set(clave, user, USUARIO_TTL)
+        return user if self.user_can_authenticate(user) else None
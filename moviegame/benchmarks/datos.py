@@ -0,0 +1,177 @@
+# moviegame/benchmarks/datos.py
+"""
+Generador de datos sintéticos para los benchmarks: N películas, M jugadores
+y D días de historial (PeliculaDelDia + partidas + intentos con feedback).
+Escribe con bulk_create; pensado para correr sobre una BD de pruebas.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from ..models import (
+    EstadoPartida,
+    Intento,
+    Jugador,
+    Partida,
+    Pelicula,
+    PeliculaDelDia,
+    codificar_feedback,
+)
+from ..services import game_service as gs
+from ..services.catalog_cache import bump_catalog_version
+
+GENEROS = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Drama", "Fantasy",
+    "Horror", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western",
+]
+# Mezcla de nombres con y sin tildes (el coste de _norm depende de ello)
+NOMBRES = ["Penélope", "José", "Zoë", "Renée", "Ana", "John", "Björn", "Mary", "Chloë", "Iñaki"]
+PALABRAS = [
+    "Night", "Star", "Lost", "City", "Dark", "Blue", "Return", "King", "Secret",
+    "Last", "Red", "Love", "Road", "Dream", "Iron", "Ghost", "River", "Storm",
+]
+
+
+@dataclass
+class DatosSinteticos:
+    peliculas: list[int]
+    jugadores: list[int]
+    staff_id: int
+
+
+def peliculas_en_memoria(n: int, rnd: random.Random) -> list[Pelicula]:
+    """Películas sintéticas sin guardar (para microbenchmarks sin BD)."""
+    directores = [f"{rnd.choice(NOMBRES)} Director {i}" for i in range(max(10, n // 8))]
+    actores = [f"{rnd.choice(NOMBRES)} Actor {i}" for i in range(max(30, n // 2))]
+    objs = []
+    for i in range(n):
+        titulo = " ".join(rnd.sample(PALABRAS, rnd.randint(1, 3))) + f" {i}"
+        objs.append(
+            Pelicula(
+                titulo=titulo,
+                anio=rnd.randint(1950, 2024),
+                genero=", ".join(rnd.sample(GENEROS, rnd.randint(1, 3))),
+                director=rnd.choice(directores),
+                actores=", ".join(rnd.sample(actores, 4)),
+                duracion_min=rnd.randint(80, 200),
+                imdb_rating=Decimal(str(round(rnd.uniform(4.0, 9.5), 1))),
+                imdb_votes=int(rnd.lognormvariate(11, 1.5)),
+                imdb_id=f"tt9{i:07d}",
+                poster_url=f"https://example.org/p/{i}.jpg",
+            )
+        )
+    return objs
+
+
+def generar_peliculas(n: int, rnd: random.Random) -> list[Pelicula]:
+    Pelicula.objects.bulk_create(peliculas_en_memoria(n, rnd), batch_size=500)
+    return list(Pelicula.objects.order_by("id"))
+
+
+def _feedback_code(adiv: Pelicula, sec: Pelicula) -> int:
+    cA, aA = gs._color_anio(adiv, sec)
+    cP, aP = gs._color_popularidad_por_votos(adiv, sec)
+    cD, aD = gs._color_duracion(adiv, sec)
+    return codificar_feedback(
+        color_anio=cA,
+        flecha_anio=aA,
+        color_popularidad=cP,
+        flecha_popularidad=aP,
+        color_genero=gs._color_generos(adiv, sec),
+        color_duracion=cD,
+        flecha_duracion=aD,
+        color_direccion=gs._color_director(adiv, sec),
+        color_actores=gs._color_actores(adiv, sec),
+        color_rating=gs._color_rating(adiv, sec),
+        es_correcto=adiv.id == sec.id,
+    )
+
+
+def generar(
+    n_peliculas: int = 2000,
+    n_jugadores: int = 200,
+    n_dias: int = 30,
+    seed: int = 42,
+) -> DatosSinteticos:
+    rnd = random.Random(seed)
+    pelis = generar_peliculas(n_peliculas, rnd)
+    hoy = timezone.localdate()
+
+    # Calendario: D días de historial + hoy
+    secretas = {}
+    for d in range(n_dias, -1, -1):
+        secretas[hoy - timedelta(days=d)] = rnd.choice(pelis)
+    PeliculaDelDia.objects.bulk_create(
+        [PeliculaDelDia(fecha=f, pelicula=p) for f, p in secretas.items()]
+    )
+
+    # Jugadores (bulk_create no dispara la señal que crea el Jugador)
+    users = User.objects.bulk_create(
+        [User(username=f"bench{i}", password="!") for i in range(n_jugadores)]
+    )
+    users = list(User.objects.filter(username__startswith="bench").order_by("id"))
+    Jugador.objects.bulk_create([Jugador(user=u) for u in users])
+    jugadores = list(Jugador.objects.order_by("id"))
+    staff = User.objects.create(username="bench-staff", password="!", is_staff=True)
+
+    # Historial: cada jugador juega ~70% de los días pasados
+    for fecha, sec in secretas.items():
+        if fecha == hoy:
+            continue
+        partidas = [
+            Partida(
+                jugador=j,
+                pelicula_secreta=sec,
+                fecha=fecha,
+                intentos_maximos=gs.MAX_INTENTOS,
+            )
+            for j in jugadores
+            if rnd.random() < 0.7
+        ]
+        Partida.objects.bulk_create(partidas, batch_size=500)
+        partidas = list(Partida.objects.filter(fecha=fecha))
+
+        intentos = []
+        for p in partidas:
+            n = rnd.randint(1, gs.MAX_INTENTOS)
+            gana = rnd.random() < 0.6
+            elegidas = rnd.sample(pelis, n)
+            if gana:
+                elegidas = [e for e in elegidas if e.id != sec.id][: n - 1] + [sec]
+            p.estado = EstadoPartida.GANADA if gana else (
+                EstadoPartida.PERDIDA if n == gs.MAX_INTENTOS else EstadoPartida.EN_CURSO
+            )
+            if p.estado != EstadoPartida.EN_CURSO:
+                p.intentos_usados = n
+                p.terminado_en = datetime.combine(
+                    fecha, time(8), tzinfo=timezone.get_current_timezone()
+                ) + timedelta(seconds=rnd.randrange(14 * 3600))
+            for num, e in enumerate(elegidas, start=1):
+                intentos.append(
+                    Intento(
+                        partida=p,
+                        pelicula_adivinada=e,
+                        numero_intento=num,
+                        feedback_code=_feedback_code(e, sec),
+                    )
+                )
+        Partida.objects.bulk_update(
+            partidas, ["estado", "intentos_usados", "terminado_en"], batch_size=500
+        )
+        Intento.objects.bulk_create(intentos, batch_size=1000)
+
+    # bulk_create no dispara señales: invalidamos a mano
+    bump_catalog_version()
+    gs.invalidar_pelicula_diaria()
+
+    return DatosSinteticos(
+        peliculas=[p.id for p in pelis],
+        jugadores=[u.id for u in users],
+        staff_id=staff.id,
+    )
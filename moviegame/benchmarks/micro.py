@@ -0,0 +1,112 @@
+# moviegame/benchmarks/micro.py
+"""
+Microbenchmarks (estilo timeit) del camino caliente de un intento:
+normalización, perfiles, los 7 comparadores y el parseo de OMDb.
+Resultados en ns por operación, listos para volcar a JSON.
+"""
+from __future__ import annotations
+
+import random
+import statistics
+import timeit
+from typing import Callable
+
+from ..models import Pelicula
+from ..services import game_service as gs
+from ..services.omdb import mapear_a_pelicula_dict
+from .datos import peliculas_en_memoria
+
+
+def omdb_json_de(p: Pelicula) -> dict:
+    """JSON con el formato de OMDb equivalente a una película."""
+    return {
+        "Title": p.titulo,
+        "Year": str(p.anio),
+        "Genre": p.genero,
+        "Director": p.director,
+        "Actors": p.actores,
+        "imdbID": p.imdb_id,
+        "Poster": p.poster_url,
+        "Runtime": f"{p.duracion_min} min",
+        "imdbRating": str(p.imdb_rating),
+        "imdbVotes": f"{p.imdb_votes:,}",
+        "Response": "True",
+    }
+
+
+def _medir(fn: Callable[[], None], ops: int, repeat: int, number: int) -> dict:
+    tiempos = timeit.Timer(fn).repeat(repeat=repeat, number=number)
+    por_op = [t / number / ops * 1e9 for t in tiempos]
+    return {
+        "ns_por_op_min": round(min(por_op), 1),
+        "ns_por_op_mediana": round(statistics.median(por_op), 1),
+        "ops": ops * number,
+        "repeat": repeat,
+    }
+
+
+def ejecutar(
+    peliculas: list[Pelicula] | None = None,
+    n_peliculas: int = 2000,
+    pares: int = 2000,
+    repeat: int = 5,
+    number: int = 3,
+    seed: int = 7,
+    solo: list[str] | None = None,
+) -> dict:
+    rnd = random.Random(seed)
+    pelis = peliculas or peliculas_en_memoria(n_peliculas, rnd)
+    parejas = [(rnd.choice(pelis), rnd.choice(pelis)) for _ in range(pares)]
+    textos = [x for p in pelis for x in p.lista_generos() + p.lista_actores()]
+    omdb = [omdb_json_de(p) for p in pelis]
+
+    def cada_pareja(f):
+        def run():
+            for a, b in parejas:
+                f(a, b)
+        return run
+
+    def perfil_frio():
+        gs._perfiles.clear()
+        for p in pelis:
+            gs.perfil_pelicula(p)
+
+    def perfil_caliente():
+        for p in pelis:
+            gs.perfil_pelicula(p)
+
+    casos: dict[str, tuple[Callable[[], None], int]] = {
+        "_norm": (lambda: [gs._norm(t) for t in textos], len(textos)),
+        "lista_generos": (lambda: [p.lista_generos() for p in pelis], len(pelis)),
+        "lista_actores": (lambda: [p.lista_actores() for p in pelis], len(pelis)),
+        "perfil_pelicula_frio": (perfil_frio, len(pelis)),
+        "perfil_pelicula_caliente": (perfil_caliente, len(pelis)),
+        "_color_anio": (cada_pareja(gs._color_anio), pares),
+        "_color_popularidad_por_votos": (cada_pareja(gs._color_popularidad_por_votos), pares),
+        "_color_generos": (cada_pareja(gs._color_generos), pares),
+        "_color_duracion": (cada_pareja(gs._color_duracion), pares),
+        "_color_director": (cada_pareja(gs._color_director), pares),
+        "_color_actores": (cada_pareja(gs._color_actores), pares),
+        "_color_rating": (cada_pareja(gs._color_rating), pares),
+        "mapear_a_pelicula_dict": (
+            lambda: [mapear_a_pelicula_dict(j) for j in omdb], len(omdb)
+        ),
+    }
+    if solo:
+        casos = {k: v for k, v in casos.items() if k in solo}
+
+    # Los comparadores de texto se miden con perfiles ya calientes (caso real)
+    perfil_caliente()
+    resultados = {
+        nombre: _medir(fn, ops, repeat, number) for nombre, (fn, ops) in casos.items()
+    }
+    return {
+        "meta": {
+            "peliculas": len(pelis),
+            "pares": pares,
+            "repeat": repeat,
+            "number": number,
+            "origen": "bd" if peliculas else "sintetico",
+        },
+        "resultados": resultados,
+    }
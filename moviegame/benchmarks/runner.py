@@ -0,0 +1,229 @@
+# moviegame/benchmarks/runner.py
+"""
+Runner multihilo de escenarios HTTP sobre el Client de pruebas de Django.
+Mide throughput, latencias p50/p95/p99 y consultas SQL por petición.
+
+También puede ejecutar los mismos escenarios por la pila ASGI (AsyncClient,
+N corrutinas concurrentes en un único hilo) para compararla con WSGI.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .datos import DatosSinteticos
+
+# Una petición: recibe (client, rnd) y devuelve la respuesta (o, con
+# AsyncClient, una corrutina que la devuelve)
+Peticion = Callable[[Client, random.Random], object]
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    peticion: Peticion
+    login: str = "jugador"  # "jugador" | "staff" | "anonimo"
+
+
+@dataclass
+class Resultado:
+    nombre: str
+    latencias_ms: list[float] = field(default_factory=list)
+    consultas: list[int] = field(default_factory=list)
+    errores: int = 0
+    duracion_s: float = 0.0
+
+    def resumen(self) -> dict:
+        lat = sorted(self.latencias_ms)
+        total = len(lat) + self.errores
+
+        def pct(p: float) -> float:
+            if not lat:
+                return 0.0
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 3)
+
+        return {
+            "requests": total,
+            "errores": self.errores,
+            "throughput_rps": round(total / self.duracion_s, 1) if self.duracion_s else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "queries_media": round(statistics.fmean(self.consultas), 2) if self.consultas else 0,
+            "queries_max": max(self.consultas, default=0),
+        }
+
+
+def escenarios_por_defecto(datos: DatosSinteticos) -> list[Escenario]:
+    prefijos = ["Night", "Star", "Lost", "City", "Dark", "Re", "Ki", "Se", "Bl"]
+
+    def intentos(c: Client, rnd: random.Random):
+        return c.post(
+            reverse("moviegame:api_intentos"),
+            {"pelicula_id": rnd.choice(datos.peliculas)},
+        )
+
+    def autocomplete(c: Client, rnd: random.Random):
+        return c.get(reverse("moviegame:api_autocomplete"), {"q": rnd.choice(prefijos)})
+
+    def stats(c: Client, rnd: random.Random):
+        return c.get(reverse("moviegame:stats"))
+
+    def dashboard(c: Client, rnd: random.Random):
+        return c.get(reverse("moviegame:admin_dashboard"))
+
+    def public_movies(c: Client, rnd: random.Random):
+        return c.get(
+            reverse("moviegame:api_public_movies"),
+            {"q": rnd.choice(prefijos), "limit": 20},
+        )
+
+    return [
+        Escenario("api_intentos", intentos),
+        Escenario("api_autocomplete", autocomplete),
+        Escenario("stats_view", stats),
+        Escenario("admin_dashboard", dashboard, login="staff"),
+        Escenario("api_public_movies", public_movies, login="anonimo"),
+    ]
+
+
+def _cliente(
+    escenario: Escenario, datos: DatosSinteticos, rnd: random.Random, clase=Client
+) -> Client:
+    c = clase()
+    if escenario.login == "jugador":
+        c.force_login(User.objects.get(pk=rnd.choice(datos.jugadores)))
+    elif escenario.login == "staff":
+        c.force_login(User.objects.get(pk=datos.staff_id))
+    return c
+
+
+def ejecutar_escenario(
+    escenario: Escenario,
+    datos: DatosSinteticos,
+    peticiones: int = 200,
+    hilos: int = 4,
+    seed: int = 0,
+) -> Resultado:
+    res = Resultado(escenario.nombre)
+    lock = threading.Lock()
+    por_hilo = [peticiones // hilos + (1 if i < peticiones % hilos else 0) for i in range(hilos)]
+
+    def trabajador(i: int, n: int) -> None:
+        rnd = random.Random(seed * 1000 + i)
+        client = _cliente(escenario, datos, rnd)
+        lat, qs, err = [], [], 0
+        try:
+            for _ in range(n):
+                t0 = time.perf_counter()
+                try:
+                    with CaptureQueriesContext(connection) as ctx:
+                        resp = escenario.peticion(client, rnd)
+                    ok = resp.status_code < 500
+                except Exception:
+                    ok = False
+                if ok:
+                    lat.append((time.perf_counter() - t0) * 1000)
+                    qs.append(len(ctx))
+                else:
+                    err += 1
+        finally:
+            if hilos > 1:
+                connection.close()
+        with lock:
+            res.latencias_ms.extend(lat)
+            res.consultas.extend(qs)
+            res.errores += err
+
+    t0 = time.perf_counter()
+    if hilos == 1:
+        trabajador(0, peticiones)
+    else:
+        threads = [
+            threading.Thread(target=trabajador, args=(i, n)) for i, n in enumerate(por_hilo)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    res.duracion_s = time.perf_counter() - t0
+    return res
+
+
+async def aejecutar_escenario_asgi(
+    escenario: Escenario,
+    datos: DatosSinteticos,
+    peticiones: int = 200,
+    concurrencia: int = 16,
+    seed: int = 0,
+) -> Resultado:
+    """
+    Igual que ejecutar_escenario pero por la pila ASGI. Las consultas SQL no
+    se cuentan: el ORM corre en el hilo compartido de sync_to_async.
+    """
+    res = Resultado(escenario.nombre)
+    por_tarea = [
+        peticiones // concurrencia + (1 if i < peticiones % concurrencia else 0)
+        for i in range(concurrencia)
+    ]
+    rnds = [random.Random(seed * 1000 + i) for i in range(concurrencia)]
+    # El login de los clientes es síncrono (BD): se prepara antes de medir
+    clientes = [
+        await sync_to_async(_cliente)(escenario, datos, rnd, AsyncClient) for rnd in rnds
+    ]
+
+    async def tarea(client: AsyncClient, rnd: random.Random, n: int) -> None:
+        for _ in range(n):
+            t0 = time.perf_counter()
+            try:
+                resp = await escenario.peticion(client, rnd)
+                ok = resp.status_code < 500
+            except Exception:
+                ok = False
+            if ok:
+                res.latencias_ms.append((time.perf_counter() - t0) * 1000)
+            else:
+                res.errores += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(tarea(c, r, n) for c, r, n in zip(clientes, rnds, por_tarea)))
+    res.duracion_s = time.perf_counter() - t0
+    return res
+
+
+def ejecutar_escenario_asgi(*args, **kwargs) -> Resultado:
+    return asyncio.run(aejecutar_escenario_asgi(*args, **kwargs))
+
+
+def comparar(actual: dict, baseline: dict, tolerancia: float) -> list[str]:
+    """Lista de regresiones (p95 o consultas) respecto a un baseline guardado."""
+    regresiones = []
+    for nombre, r in actual["escenarios"].items():
+        b = baseline.get("escenarios", {}).get(nombre)
+        if not b:
+            continue
+        if b["p95_ms"] and r["p95_ms"] > b["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {b['p95_ms']} -> {r['p95_ms']} ms")
+        if r["queries_max"] > b["queries_max"]:
+            regresiones.append(
+                f"{nombre}: consultas {b['queries_max']} -> {r['queries_max']}"
+            )
+    return regresiones
+
+
+def guardar(informe: dict, ruta: str) -> None:
+    with open(ruta, "w", encoding="utf-8") as fh:
+        json.dump(informe, fh, indent=2, ensure_ascii=False)
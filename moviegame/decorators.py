@@ -0,0 +1,95 @@
+# moviegame/decorators.py
+from __future__ import annotations
+
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+from django.utils.http import urlencode
+
+_RE_CSRF = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _clave_pagina(request, parametros: tuple[str, ...]) -> str:
+    consulta = urlencode(sorted((k, v) for k in parametros for v in request.GET.getlist(k)))
+    return ":".join(
+        [
+            "movidle:pagina",
+            getattr(settings, "MOVIDLE_DEPLOY_ID", ""),
+            translation.get_language() or settings.LANGUAGE_CODE,
+            request.scheme,
+            request.get_host(),
+            request.path,
+            consulta,
+        ]
+    )
+
+
+def cache_pagina_anonima(timeout: int = 60 * 60, parametros: tuple[str, ...] = ()):
+    """
+    Cachea la página completa para visitantes anónimos (sin cookie de sesión),
+    por idioma, host y versión de despliegue (MOVIDLE_DEPLOY_ID).
+
+    La clave usa la ruta y solo los parámetros de `parametros`: una petición
+    con cualquier otro parámetro (?utm=..., ?x=...) se sirve sin caché, así
+    que no se pueden crear entradas sin límite ni cachear una página que
+    refleje una query ajena (p. ej. el "next" del selector de idioma).
+
+    El token CSRF de los formularios (p. ej. selector de idioma) se sustituye
+    en cada respuesta por uno del visitante, así que la página cacheada nunca
+    comparte tokens entre usuarios.
+    """
+
+    def deco(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cacheable = (
+                request.method in ("GET", "HEAD")
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES
+                and all(k in parametros for k in request.GET)
+            )
+            if not cacheable:
+                return view(request, *args, **kwargs)
+
+            key = _clave_pagina(request, parametros)
+            guardada = cache.get(key)
+            if guardada is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                cache.set(key, (response.content, response["Content-Type"]), timeout)
+            else:
+                contenido, content_type = guardada
+                token = get_token(request).encode()
+                response = HttpResponse(
+                    _RE_CSRF.sub(lambda m: m.group(1) + token + m.group(2), contenido),
+                    content_type=content_type,
+                )
+            patch_vary_headers(response, ("Accept-Language", "Cookie"))
+            return response
+
+        return wrapper
+
+    return deco
+
+
+def login_requerido_async(view):
+    """
+    login_required para vistas async (el de Django 5.0 solo envuelve vistas
+    síncronas). Usa request.auser() para no tocar la sesión de forma síncrona.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+
+    return wrapper
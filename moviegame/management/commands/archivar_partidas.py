@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from moviegame.services.archivo import LOTE, archivar, directorio_archivo, rehidratar
+
+"""
+Uso típico (p. ej. un cron mensual):
+  python manage.py archivar_partidas --dias 180 --vacuum
+  python manage.py archivar_partidas --antes-de 2025-01-01 --simular
+  python manage.py archivar_partidas --rehidratar 2024-11
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve las partidas antiguas (con sus intentos) a ficheros gzip JSONL "
+        "por mes y deja sus totales en ResumenArchivado; o restaura un mes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias", type=int, default=365,
+            help="Archiva las partidas de hace más de N días (por defecto una temporada)",
+        )
+        parser.add_argument("--antes-de", dest="antes_de", help="Fecha de corte YYYY-MM-DD")
+        parser.add_argument("--lote", type=int, default=LOTE)
+        parser.add_argument("--directorio", help="Por defecto settings.MOVIDLE_ARCHIVO_DIR")
+        parser.add_argument("--simular", action="store_true", help="Solo cuenta, no mueve nada")
+        parser.add_argument(
+            "--vacuum", action="store_true",
+            help="En SQLite, compacta la BD al terminar para devolver el espacio",
+        )
+        parser.add_argument(
+            "--rehidratar", metavar="AAAA-MM",
+            help="Devuelve a la BD las partidas archivadas de ese mes",
+        )
+
+    def handle(self, *args, **opts):
+        directorio = opts["directorio"] or directorio_archivo()
+        if opts["rehidratar"]:
+            try:
+                anio, mes = (int(x) for x in opts["rehidratar"].split("-"))
+            except ValueError:
+                raise CommandError("--rehidratar debe tener formato AAAA-MM")
+            inf = rehidratar(anio, mes, directorio)
+            self.stdout.write(
+                self.style.SUCCESS(f"{inf.restauradas} partidas restauradas de {anio:04d}-{mes:02d}.")
+            )
+            if inf.omitidas:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{inf.omitidas} partidas no se pudieron restaurar (jugador o películas "
+                        "borrados); siguen en el fichero."
+                    )
+                )
+            return
+
+        try:
+            if opts["antes_de"]:
+                corte = date.fromisoformat(opts["antes_de"])
+            else:
+                corte = timezone.localdate() - timedelta(days=opts["dias"])
+        except ValueError:
+            raise CommandError("--antes-de debe tener formato YYYY-MM-DD")
+        if corte > timezone.localdate() - timedelta(days=1):
+            raise CommandError("El corte debe ser anterior a ayer (las partidas de hoy están vivas).")
+
+        informe = archivar(corte, directorio, lote=opts["lote"], simular=opts["simular"])
+        verbo = "Se archivarían" if opts["simular"] else "Archivadas"
+        self.stdout.write(
+            f"{verbo} {informe.partidas} partidas y {informe.intentos} intentos anteriores a {corte}."
+        )
+        for nombre in sorted(informe.ficheros):
+            self.stdout.write(f"  {nombre}")
+        if opts["vacuum"] and not opts["simular"] and connection.vendor == "sqlite":
+            with connection.cursor() as cur:
+                cur.execute("VACUUM")
+            self.stdout.write("BD compactada.")
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from moviegame.benchmarks import micro
+from moviegame.models import Pelicula
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmarks de los comparadores de feedback, la normalización "
+        "y el parseo de OMDb. Imprime JSON (ns por operación)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde-bd",
+            dest="desde_bd",
+            action="store_true",
+            help="Usa el catálogo real en vez de uno sintético",
+        )
+        parser.add_argument("--peliculas", type=int, default=2000)
+        parser.add_argument("--pares", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--number", type=int, default=3)
+        parser.add_argument("--solo", nargs="*", help="Casos a medir (por nombre)")
+        parser.add_argument("--output", help="Además, guarda el JSON en esta ruta")
+
+    def handle(self, *args, **opts):
+        peliculas = None
+        if opts["desde_bd"]:
+            peliculas = list(Pelicula.objects.all()[: opts["peliculas"]])
+
+        informe = micro.ejecutar(
+            peliculas=peliculas,
+            n_peliculas=opts["peliculas"],
+            pares=opts["pares"],
+            repeat=opts["repeat"],
+            number=opts["number"],
+            solo=opts["solo"],
+        )
+        texto = json.dumps(informe, indent=2, ensure_ascii=False)
+        self.stdout.write(texto)
+        if opts["output"]:
+            with open(opts["output"], "w", encoding="utf-8") as fh:
+                fh.write(texto)
@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from moviegame.benchmarks import datos as datos_sinteticos
+from moviegame.benchmarks.runner import (
+    comparar,
+    ejecutar_escenario,
+    ejecutar_escenario_asgi,
+    escenarios_por_defecto,
+    guardar,
+)
+
+"""
+Benchmark de carga de los endpoints principales sobre una BD de pruebas
+desechable (nunca toca db.sqlite3).
+
+Uso típico:
+  python manage.py bench_load --output bench_baseline.json
+  python manage.py bench_load --baseline bench_baseline.json --tolerancia 0.25
+  python manage.py bench_load --modo ambos --concurrencia 32   # WSGI vs ASGI
+"""
+
+
+class Command(BaseCommand):
+    help = "Benchmark multihilo de api_intentos, autocomplete, stats, panel y API pública."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--peliculas", type=int, default=2000)
+        parser.add_argument("--jugadores", type=int, default=200)
+        parser.add_argument("--dias", type=int, default=30)
+        parser.add_argument("--requests", type=int, default=200, help="Peticiones por escenario")
+        parser.add_argument("--hilos", type=int, default=4)
+        parser.add_argument(
+            "--modo", choices=("wsgi", "asgi", "ambos"), default="wsgi",
+            help="Pila a medir; en ASGI los escenarios se informan como <nombre>@asgi",
+        )
+        parser.add_argument(
+            "--concurrencia", type=int, default=16,
+            help="Peticiones simultáneas (corrutinas) en modo ASGI",
+        )
+        parser.add_argument("--solo", nargs="*", help="Nombres de escenarios a ejecutar")
+        parser.add_argument("--output", help="Guarda el informe JSON en esta ruta")
+        parser.add_argument("--baseline", help="Informe JSON previo con el que comparar")
+        parser.add_argument(
+            "--tolerancia", type=float, default=0.2,
+            help="Empeoramiento relativo de p95 permitido frente al baseline",
+        )
+
+    def handle(self, *args, **opts):
+        baseline = None
+        if opts["baseline"]:
+            with open(opts["baseline"], encoding="utf-8") as fh:
+                baseline = json.load(fh)
+
+        # BD de pruebas en archivo: los hilos comparten la misma base
+        tmpdir = tempfile.mkdtemp(prefix="movidle-bench-")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(
+            tmpdir, "bench.sqlite3"
+        )
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            informe = self._ejecutar(opts)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(json.dumps(informe["escenarios"], indent=2))
+        if opts["output"]:
+            guardar(informe, opts["output"])
+            self.stdout.write(self.style.SUCCESS(f"Informe guardado en {opts['output']}"))
+
+        if baseline:
+            regresiones = comparar(informe, baseline, opts["tolerancia"])
+            if regresiones:
+                raise CommandError("Regresiones:\n  " + "\n  ".join(regresiones))
+            self.stdout.write(self.style.SUCCESS("Sin regresiones frente al baseline."))
+
+    def _ejecutar(self, opts) -> dict:
+        self.stdout.write("Generando datos sintéticos…")
+        datos = datos_sinteticos.generar(
+            n_peliculas=opts["peliculas"],
+            n_jugadores=opts["jugadores"],
+            n_dias=opts["dias"],
+        )
+        escenarios = escenarios_por_defecto(datos)
+        if opts["solo"]:
+            escenarios = [e for e in escenarios if e.nombre in opts["solo"]]
+
+        resultados = {}
+        for esc in escenarios:
+            if opts["modo"] in ("wsgi", "ambos"):
+                self.stdout.write(f"→ {esc.nombre}")
+                res = ejecutar_escenario(
+                    esc, datos, peticiones=opts["requests"], hilos=opts["hilos"]
+                )
+                resultados[esc.nombre] = res.resumen()
+            if opts["modo"] in ("asgi", "ambos"):
+                self.stdout.write(f"→ {esc.nombre}@asgi")
+                res = ejecutar_escenario_asgi(
+                    esc, datos, peticiones=opts["requests"],
+                    concurrencia=opts["concurrencia"],
+                )
+                resultados[f"{esc.nombre}@asgi"] = res.resumen()
+
+        return {
+            "meta": {
+                "peliculas": opts["peliculas"],
+                "jugadores": opts["jugadores"],
+                "dias": opts["dias"],
+                "requests": opts["requests"],
+                "hilos": opts["hilos"],
+                "modo": opts["modo"],
+                "concurrencia": opts["concurrencia"],
+                "vendor": connection.vendor,
+            },
+            "escenarios": resultados,
+        }
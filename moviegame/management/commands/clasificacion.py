@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from moviegame.services import clasificacion
+
+"""
+Uso típico (cron cada pocos minutos):
+  python manage.py clasificacion --snapshot
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Guarda un snapshot de las clasificaciones en memoria para que los "
+        "procesos arranquen sin recorrer el historial, o las reconstruye."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--snapshot", action="store_true", help="Guarda un snapshot")
+        parser.add_argument(
+            "--reconstruir", action="store_true",
+            help="Ignora snapshots y reconstruye desde la BD (p. ej. tras recalcular_rachas --completo)",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["reconstruir"]:
+            clasificacion.reiniciar(recargar=True)
+        c = clasificacion.clasificaciones()
+        for tipo in clasificacion.TIPOS:
+            t = c.tablero(tipo)
+            self.stdout.write(f"{tipo}: {len(t) if t else 0} jugadores")
+        if opts["snapshot"] or opts["reconstruir"]:
+            snap = clasificacion.guardar_snapshot()
+            self.stdout.write(self.style.SUCCESS(f"Snapshot guardado ({len(snap.datos)} bytes)."))
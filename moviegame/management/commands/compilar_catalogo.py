@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from moviegame.services import snapshot_catalogo
+
+"""
+Uso típico (tras cargar películas o en el despliegue):
+  MOVIDLE_CATALOGO_SNAPSHOT=/srv/movidle/catalogo.bin python manage.py compilar_catalogo
+Los workers mapean el fichero nuevo en su siguiente acceso.
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compila el catálogo a un fichero binario versionado que los procesos "
+        "mapean en solo lectura, y lo publica de forma atómica."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ruta", help="Destino (por defecto MOVIDLE_CATALOGO_SNAPSHOT)")
+        parser.add_argument(
+            "--comprobar", action="store_true",
+            help="Solo indica si el snapshot publicado corresponde a la versión actual",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["comprobar"]:
+            snap = snapshot_catalogo.cargar()
+            if snap is None:
+                raise CommandError("No hay snapshot publicado.")
+            estado = "vigente" if snapshot_catalogo.vigente() else "antiguo"
+            self.stdout.write(f"{snap.ruta}: versión {snap.version}, {snap.n} películas ({estado})")
+            return
+        try:
+            inf = snapshot_catalogo.compilar(Path(opts["ruta"]) if opts["ruta"] else None)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{inf.ruta}: versión {inf.version}, {inf.peliculas} películas "
+                f"({inf.jugables} jugables), {inf.bytes} bytes en {inf.segundos}s."
+            )
+        )
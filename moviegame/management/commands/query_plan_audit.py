@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from moviegame.services.query_plans import FORMAS, auditar
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN (QUERY PLAN) sobre cada forma de consulta caliente "
+        "registrada y falla si alguna recorre una tabla completa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--solo", nargs="*", choices=sorted(FORMAS), help="Formas a auditar")
+
+    def handle(self, *args, **opts):
+        fallos = []
+        for a in auditar(opts["solo"]):
+            estilo = self.style.SUCCESS if a.ok else self.style.ERROR
+            self.stdout.write(estilo(f"{'OK ' if a.ok else 'SCAN'} {a.nombre}"))
+            for linea in a.plan:
+                self.stdout.write(f"     {linea}")
+            if not a.ok:
+                fallos.append(a.nombre)
+
+        if fallos:
+            raise CommandError("Escaneo completo en: " + ", ".join(fallos))
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from moviegame.services.rachas import LOTE, cerrar_dia, recalcular_todas
+
+"""
+Uso típico:
+  python manage.py recalcular_rachas             # cron nocturno (cierra ayer)
+  python manage.py recalcular_rachas --completo  # reconstrucción desde el historial
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantiene las rachas de los jugadores: cierre nocturno incremental "
+        "(por defecto) o recálculo completo desde las partidas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--completo", action="store_true",
+            help="Recalcula racha actual y máxima de todos los jugadores",
+        )
+        parser.add_argument(
+            "--fecha",
+            help="Modo nocturno: día a cerrar (por defecto ayer). "
+            "Modo completo: día de referencia (por defecto hoy). YYYY-MM-DD",
+        )
+        parser.add_argument("--lote", type=int, default=LOTE, help="Jugadores por lote")
+
+    def handle(self, *args, **opts):
+        try:
+            fecha = date.fromisoformat(opts["fecha"]) if opts["fecha"] else None
+        except ValueError:
+            raise CommandError("--fecha debe tener formato YYYY-MM-DD")
+
+        if opts["completo"]:
+            informe = recalcular_todas(hoy=fecha, lote=opts["lote"])
+            self.stdout.write(self.style.SUCCESS(
+                f"{informe.jugadores} jugadores revisados, {informe.actualizados} actualizados."
+            ))
+        else:
+            n = cerrar_dia(fecha)
+            self.stdout.write(self.style.SUCCESS(f"{n} rachas cortadas."))
@@ -0,0 +1,61 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from moviegame.models import Partida
+from moviegame.services import solver
+from moviegame.services.game_service import MAX_INTENTOS, seleccionar_pelicula_diaria
+
+
+class Command(BaseCommand):
+    help = (
+        "Solver de Movidle: candidatas y sugerencias para una partida, o "
+        "comprueba que el puzzle de una fecha se resuelve en el máximo de intentos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--partida", type=int, help="Id de la partida a analizar")
+        parser.add_argument(
+            "--fecha", help="Simula el puzzle de esta fecha YYYY-MM-DD (por defecto hoy)"
+        )
+        parser.add_argument("--sugerencias", type=int, default=5)
+        parser.add_argument("--max-intentos", dest="max_intentos", type=int, default=MAX_INTENTOS)
+
+    def handle(self, *args, **opts):
+        if opts["partida"]:
+            self._partida(opts["partida"], opts["sugerencias"])
+        else:
+            self._simular(opts["fecha"], opts["max_intentos"])
+
+    def _partida(self, partida_id: int, n: int) -> None:
+        partida = Partida.objects.filter(pk=partida_id).first()
+        if partida is None:
+            raise CommandError(f"No existe la partida {partida_id}")
+        cat = solver.catalogo()
+        pistas = solver.pistas_de_partida(partida)
+        bits = solver.candidatos(cat, pistas)
+        self.stdout.write(f"{partida}: {len(pistas)} intentos, {bits.bit_count()} candidatas")
+        if bits.bit_count() <= 10:
+            for i in solver.indices(bits):
+                self.stdout.write(f"  · {cat.titulos[i]} ({cat.anios[i]})")
+        for s in solver.sugerir(cat, bits, excluir={pid for pid, _ in pistas}, n=n):
+            marca = "*" if s.es_candidata else " "
+            self.stdout.write(f"  {marca} {s.titulo}  {s.bits:.2f} bits")
+
+    def _simular(self, fecha_txt: str | None, max_intentos: int) -> None:
+        try:
+            fecha = date.fromisoformat(fecha_txt) if fecha_txt else timezone.localdate()
+        except ValueError:
+            raise CommandError("--fecha debe tener formato YYYY-MM-DD")
+        try:
+            secreta = seleccionar_pelicula_diaria(fecha)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        jugadas = solver.simular(secreta.id, max_intentos=max_intentos)
+        for n, (sug, quedan) in enumerate(jugadas, 1):
+            self.stdout.write(f"{n:>2}. {sug.titulo}  ({sug.bits:.2f} bits) -> {quedan} candidatas")
+        if not jugadas or jugadas[-1][0].pelicula_id != secreta.id:
+            raise CommandError(f"{fecha}: no resuelto en {max_intentos} intentos ({secreta})")
+        self.stdout.write(self.style.SUCCESS(f"{fecha}: resuelto en {len(jugadas)} intentos"))
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from moviegame.services.scheduler import (
+    ReglasProgramacion,
+    planificar_dias,
+    precalentar,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Programa la película del día para una ventana rodante de días futuros "
+        "(sin repetir y priorizando popularidad) y precalienta las cachés de mañana."
+    )
+
+    def add_arguments(self, parser):
+        defaults = ReglasProgramacion.desde_settings()
+        parser.add_argument("--dias", type=int, default=defaults.dias)
+        parser.add_argument(
+            "--sin-repetir",
+            dest="sin_repetir",
+            type=int,
+            default=defaults.sin_repetir_dias,
+            help="Días mínimos entre dos apariciones de la misma película",
+        )
+        parser.add_argument("--min-votos", dest="min_votos", type=int, default=defaults.min_votos)
+        parser.add_argument("--top", type=int, default=defaults.top, help="Tamaño del pool por votos")
+        parser.add_argument("--desde", help="Fecha inicial YYYY-MM-DD (por defecto hoy)")
+        parser.add_argument(
+            "--precalentar",
+            action="store_true",
+            help="Además, deja calientes las cachés del día siguiente",
+        )
+
+    def handle(self, *args, **opts):
+        try:
+            desde = date.fromisoformat(opts["desde"]) if opts["desde"] else None
+        except ValueError:
+            raise CommandError("--desde debe tener formato YYYY-MM-DD")
+
+        reglas = ReglasProgramacion(
+            dias=opts["dias"],
+            sin_repetir_dias=opts["sin_repetir"],
+            min_votos=opts["min_votos"],
+            top=opts["top"],
+        )
+        creadas = planificar_dias(desde=desde, reglas=reglas)
+        for sel in creadas:
+            self.stdout.write(self.style.SUCCESS(f"+ {sel}"))
+        self.stdout.write(f"Días programados: {len(creadas)}")
+
+        if opts["precalentar"]:
+            manana = timezone.localdate() + timedelta(days=1)
+            secreta = precalentar(manana)
+            if secreta is None:
+                self.stdout.write(self.style.WARNING(f"{manana}: sin película"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Precalentado {manana} → {secreta}"))
@@ -0,0 +1,97 @@
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from moviegame.models import PeliculaDelDia
+from moviegame.services.dificultad import MODELOS, evaluar_en_paralelo
+from moviegame.services.game_service import MAX_INTENTOS
+from moviegame.services.solver import catalogo
+
+"""
+Dificultad estimada de películas candidatas a secreta.
+
+Uso típico:
+  python manage.py simular_dificultad --pelicula 42 --pelicula 77
+  python manage.py simular_dificultad --fecha 2025-06-01
+  python manage.py simular_dificultad --todas --partidas 50 --output dificultad.json
+"""
+
+
+class Command(BaseCommand):
+    help = "Simula partidas contra películas candidatas y estima su dificultad."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pelicula", type=int, action="append", default=[])
+        parser.add_argument("--fecha", action="append", default=[],
+                            help="Película programada para esa fecha YYYY-MM-DD")
+        parser.add_argument("--todas", action="store_true", help="Todo el catálogo")
+        parser.add_argument("--modelos", nargs="*", choices=MODELOS, default=list(MODELOS))
+        parser.add_argument("--partidas", type=int, default=1000,
+                            help="Partidas por película y modelo (el solver juega 1)")
+        parser.add_argument("--procesos", type=int, default=None,
+                            help="Workers (por defecto, nº de CPUs)")
+        parser.add_argument("--max-intentos", dest="max_intentos", type=int, default=MAX_INTENTOS)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Guarda los resultados en JSON")
+
+    def handle(self, *args, **opts):
+        cat = catalogo()
+        ids = list(opts["pelicula"])
+        for txt in opts["fecha"]:
+            try:
+                f = date.fromisoformat(txt)
+            except ValueError:
+                raise CommandError("--fecha debe tener formato YYYY-MM-DD")
+            sel = PeliculaDelDia.objects.filter(fecha=f).first()
+            if sel is None:
+                raise CommandError(f"No hay película programada para {f}")
+            ids.append(sel.pelicula_id)
+        if opts["todas"]:
+            ids = list(cat.ids)
+        if not ids:
+            raise CommandError("Indica --pelicula, --fecha o --todas")
+        desconocidas = [i for i in ids if i not in cat.fila_de]
+        if desconocidas:
+            raise CommandError(f"Películas inexistentes: {desconocidas}")
+
+        t0 = time.perf_counter()
+        resultados = evaluar_en_paralelo(
+            ids,
+            modelos=tuple(opts["modelos"]),
+            partidas=opts["partidas"],
+            procesos=opts["procesos"],
+            seed=opts["seed"],
+            max_intentos=opts["max_intentos"],
+            cat=cat,
+        )
+        resumenes = [d.resumen() for d in resultados]
+
+        if not opts["todas"]:
+            for r in resumenes:
+                self.stdout.write(
+                    f"{r['titulo']} [{r['modelo']}]: media {r['media_intentos']} "
+                    f"intentos, derrota {r['tasa_perdida']:.1%}, {r['distribucion']}"
+                )
+        self.stdout.write(
+            f"{len(ids)} películas × {len(opts['modelos'])} modelos "
+            f"en {time.perf_counter() - t0:.1f}s"
+        )
+        if opts["output"]:
+            with open(opts["output"], "w", encoding="utf-8") as fh:
+                json.dump(
+                    {
+                        "meta": {
+                            "catalogo_version": cat.version,
+                            "partidas": opts["partidas"],
+                            "max_intentos": opts["max_intentos"],
+                            "seed": opts["seed"],
+                        },
+                        "resultados": resumenes,
+                    },
+                    fh,
+                    indent=2,
+                    ensure_ascii=False,
+                )
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {opts['output']}"))
@@ -0,0 +1,128 @@
+# moviegame/middleware.py
+from __future__ import annotations
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .services import query_profiler
+from .services.metrics import registro
+
+
+class _ContadorBD:
+    """execute_wrapper que acumula nº de consultas y tiempo en BD."""
+
+    __slots__ = ("consultas", "segundos")
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - t0
+            self.consultas += 1
+
+
+class MetricasMiddleware:
+    """
+    Registra por vista: tiempo total, nº de consultas, tiempo en BD y tamaño
+    de la respuesta. Se expone en /metrics/ (solo staff).
+
+    Es compatible con ASGI para no forzar a las vistas async a un hilo. En
+    modo async el ORM corre en el hilo compartido de sync_to_async y no se
+    puede atribuir a una petición, así que solo se miden tiempo y tamaño.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        bd = _ContadorBD()
+        t0 = time.perf_counter()
+        with connection.execute_wrapper(bd):
+            response = self.get_response(request)
+        self._observar(
+            request,
+            response,
+            (
+                ("movidle_request_seconds", time.perf_counter() - t0),
+                ("movidle_db_queries", bd.consultas),
+                ("movidle_db_seconds", bd.segundos),
+            ),
+        )
+        return response
+
+    async def __acall__(self, request):
+        t0 = time.perf_counter()
+        response = await self.get_response(request)
+        self._observar(
+            request, response, (("movidle_request_seconds", time.perf_counter() - t0),)
+        )
+        return response
+
+    @staticmethod
+    def _observar(request, response, valores) -> None:
+        match = getattr(request, "resolver_match", None)
+        vista = match.view_name if match else "<sin_ruta>"
+        if not response.streaming:
+            valores += (("movidle_response_bytes", len(response.content)),)
+        registro.observar_lote(vista, valores)
+
+
+class PerfiladorConsultasMiddleware:
+    """
+    Registra N+1 y consultas lentas por petición si MOVIDLE_PERFILADOR_CONSULTAS.
+
+    Como MetricasMiddleware, es compatible con ASGI: en modo async las
+    consultas corren en el hilo de sync_to_async, fuera del execute_wrapper
+    de la petición, así que se deja pasar sin perfilar.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "MOVIDLE_PERFILADOR_CONSULTAS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.umbral_repeticiones = getattr(
+            settings,
+            "MOVIDLE_PERFILADOR_REPETICIONES",
+            query_profiler.UMBRAL_REPETICIONES,
+        )
+        self.umbral_lenta_ms = getattr(
+            settings, "MOVIDLE_PERFILADOR_LENTA_MS", query_profiler.UMBRAL_LENTA_MS
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with query_profiler.perfilar(
+            umbral_repeticiones=self.umbral_repeticiones,
+            umbral_lenta_ms=self.umbral_lenta_ms,
+        ) as perfil:
+            response = self.get_response(request)
+        for h in perfil.hallazgos():
+            query_profiler.logger.warning("%s %s", request.path, h)
+        if settings.DEBUG and perfil.grupos:
+            response["X-Movidle-Queries"] = str(perfil.total)
+        return response
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
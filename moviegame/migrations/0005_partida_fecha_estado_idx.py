@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviegame', '0004_feedback_color_duracion_feedback_color_popularidad_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='partida',
+            index=models.Index(fields=['fecha', 'estado'], name='partida_fecha_estado_idx'),
+        ),
+    ]
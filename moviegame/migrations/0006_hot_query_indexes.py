@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviegame', '0005_partida_fecha_estado_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='intento',
+            index=models.Index(fields=['partida', 'pelicula_adivinada'], name='intento_partida_peli_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pelicula',
+            index=models.Index(condition=models.Q(('imdb_votes__isnull', False)), fields=['-imdb_votes', '-imdb_rating'], name='pelicula_votos_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pelicula',
+            index=models.Index(fields=['-imdb_rating'], name='pelicula_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.0.7 on 2026-10-19 09:12
+
+from django.db import migrations, models, transaction
+
+# Copia congelada del codec de moviegame.models (las migraciones no deben
+# depender del código actual de la app).
+COLOR = {"GRIS": 0, "AMARILLO": 1, "VERDE": 2}
+FLECHA = {"": 0, "UP": 1, "DOWN": 2}
+CAMPOS = (
+    ("color_anio", COLOR),
+    ("flecha_anio", FLECHA),
+    ("color_popularidad", COLOR),
+    ("flecha_popularidad", FLECHA),
+    ("color_genero", COLOR),
+    ("color_duracion", COLOR),
+    ("flecha_duracion", FLECHA),
+    ("color_direccion", COLOR),
+    ("color_actores", COLOR),
+    ("color_rating", COLOR),
+)
+CORRECTO = 1 << 20
+LOTE = 5000
+
+
+def codificar(fila: dict) -> int:
+    code = CORRECTO if fila["es_correcto"] else 0
+    for k, (nombre, tabla) in enumerate(CAMPOS):
+        code |= tabla.get(fila[nombre] or "", 0) << (2 * k)
+    return code
+
+
+def backfill(apps, schema_editor):
+    """
+    Copia Feedback -> Intento.feedback_code por lotes de PK, cada lote en su
+    propia transacción (migración no atómica): no bloquea la tabla entera y
+    se puede reanudar. Dentro de un lote, un UPDATE por código distinto.
+    """
+    Feedback = apps.get_model("moviegame", "Feedback")
+    Intento = apps.get_model("moviegame", "Intento")
+    campos = ["intento_id", "es_correcto", *(n for n, _ in CAMPOS)]
+    ultimo = 0
+    while True:
+        filas = list(
+            Feedback.objects.filter(pk__gt=ultimo).order_by("pk").values("pk", *campos)[:LOTE]
+        )
+        if not filas:
+            break
+        por_codigo: dict[int, list[int]] = {}
+        for f in filas:
+            por_codigo.setdefault(codificar(f), []).append(f["intento_id"])
+        with transaction.atomic():
+            for code, ids in por_codigo.items():
+                Intento.objects.filter(pk__in=ids, feedback_code__isnull=True).update(
+                    feedback_code=code
+                )
+        ultimo = filas[-1]["pk"]
+
+
+def restaurar(apps, schema_editor):
+    """Inverso: recrea las filas de Feedback desde feedback_code."""
+    Feedback = apps.get_model("moviegame", "Feedback")
+    Intento = apps.get_model("moviegame", "Intento")
+    ultimo = 0
+    while True:
+        filas = list(
+            Intento.objects.filter(pk__gt=ultimo, feedback_code__isnull=False)
+            .order_by("pk")
+            .values_list("pk", "feedback_code")[:LOTE]
+        )
+        if not filas:
+            break
+        nuevos = []
+        for pk, code in filas:
+            valores = {}
+            for k, (nombre, tabla) in enumerate(CAMPOS):
+                bits = (code >> (2 * k)) & 3
+                valores[nombre] = next(v for v, b in tabla.items() if b == bits)
+            nuevos.append(Feedback(intento_id=pk, es_correcto=code >= CORRECTO, **valores))
+        with transaction.atomic():
+            Feedback.objects.bulk_create(nuevos, ignore_conflicts=True)
+        ultimo = filas[-1][0]
+
+
+class Migration(migrations.Migration):
+    # Los lotes hacen commit por separado (ver backfill)
+    atomic = False
+
+    dependencies = [
+        ('moviegame', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='intento',
+            name='feedback_code',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill, restaurar, elidable=True),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.0.7 on 2026-10-19 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviegame', '0007_intento_feedback_code'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Feedback',
+        ),
+    ]
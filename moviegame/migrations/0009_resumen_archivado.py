@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviegame', '0008_delete_feedback'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partidas', models.PositiveIntegerField(default=0)),
+                ('ganadas', models.PositiveIntegerField(default=0)),
+                ('perdidas', models.PositiveIntegerField(default=0)),
+                ('distribucion', models.JSONField(default=dict)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('jugador', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_archivado', to='moviegame.jugador')),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-19 05:01
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def rellenar_terminadas(apps, schema_editor):
+    """Partidas ya terminadas: nº de intentos y hora del último (un único UPDATE)."""
+    Partida = apps.get_model("moviegame", "Partida")
+    Intento = apps.get_model("moviegame", "Intento")
+    ultimos = (
+        Intento.objects.filter(partida=OuterRef("pk"))
+        .values("partida")
+        .annotate(n=Max("numero_intento"), t=Max("creado_en"))
+    )
+    Partida.objects.filter(estado__in=("GANADA", "PERDIDA")).update(
+        intentos_usados=Subquery(ultimos.values("n")),
+        terminado_en=Subquery(ultimos.values("t")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviegame', '0009_resumen_archivado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotClasificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('marca', models.DateTimeField()),
+                ('datos', models.BinaryField()),
+            ],
+            options={
+                'ordering': ['-creado_en'],
+                'get_latest_by': 'creado_en',
+            },
+        ),
+        migrations.AddField(
+            model_name='partida',
+            name='intentos_usados',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='partida',
+            name='terminado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(rellenar_terminadas, migrations.RunPython.noop, elidable=True),
+        migrations.AddIndex(
+            model_name='partida',
+            index=models.Index(fields=['terminado_en'], name='partida_terminado_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.7 on 2026-10-19 05:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviegame', '0010_clasificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Repeticion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(choices=[('EN_CURSO', 'En curso'), ('GANADA', 'Ganada'), ('PERDIDA', 'Perdida')], default='EN_CURSO', max_length=12)),
+                ('intentos_maximos', models.PositiveIntegerField(default=10)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+                ('jugador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='repeticiones', to='moviegame.jugador')),
+                ('pelicula_secreta', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='moviegame.pelicula')),
+            ],
+            options={
+                'ordering': ['-fecha'],
+                'unique_together': {('jugador', 'fecha')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IntentoRepeticion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_intento', models.PositiveIntegerField()),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('feedback_code', models.PositiveIntegerField()),
+                ('pelicula_adivinada', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='moviegame.pelicula')),
+                ('repeticion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='intentos', to='moviegame.repeticion')),
+            ],
+            options={
+                'ordering': ['numero_intento'],
+                'unique_together': {('repeticion', 'numero_intento')},
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 # moviegame/models.py
 from __future__ import annotations
+from dataclasses import dataclass
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -58,6 +60,16 @@ class Pelicula(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["titulo", "anio"], name="uniq_titulo_anio"),
         ]
+        indexes = [
+            # Autocompletar, home y panel: solo películas con votos, más votadas primero
+            models.Index(
+                fields=["-imdb_votes", "-imdb_rating"],
+                condition=models.Q(imdb_votes__isnull=False),
+                name="pelicula_votos_rating_idx",
+            ),
+            # API pública: ordenada por rating
+            models.Index(fields=["-imdb_rating"], name="pelicula_rating_idx"),
+        ]
 
     def __str__(self):
         return f"{self.titulo} ({self.anio})"
@@ -98,18 +110,150 @@ class Partida(models.Model):
     )
     intentos_maximos = models.PositiveIntegerField(default=10)  # “10 guesses”
     creado_en = models.DateTimeField(auto_now_add=True)
+    # Al terminar (ganada o perdida): para las clasificaciones
+    intentos_usados = models.PositiveSmallIntegerField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = [("jugador", "fecha")]  # una partida por día por jugador
         ordering = ["-fecha", "-creado_en"]
+        indexes = [
+            # list_filter del admin y tasa de acierto del panel
+            models.Index(fields=["fecha", "estado"], name="partida_fecha_estado_idx"),
+            # Sincronización incremental de las clasificaciones
+            models.Index(fields=["terminado_en"], name="partida_terminado_idx"),
+        ]
 
     def __str__(self):
         return f"Partida {self.jugador} {self.fecha} ({self.estado})"
 
 
+class ResumenArchivado(models.Model):
+    """
+    Totales de las partidas de un jugador que ya se movieron al archivo
+    (services/archivo.py). Las estadísticas suman esto a lo que queda en la BD.
+    """
+
+    jugador = models.OneToOneField(
+        Jugador, on_delete=models.CASCADE, related_name="resumen_archivado"
+    )
+    partidas = models.PositiveIntegerField(default=0)
+    ganadas = models.PositiveIntegerField(default=0)
+    perdidas = models.PositiveIntegerField(default=0)
+    # Victorias por nº de intentos: {"3": 12, "4": 7, ...}
+    distribucion = models.JSONField(default=dict)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Archivo de {self.jugador} ({self.partidas} partidas)"
+
+
+class SnapshotClasificacion(models.Model):
+    """
+    Copia de las clasificaciones en memoria (services/clasificacion.py) para
+    reconstruirlas al arrancar sin recorrer todo el historial.
+    """
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+    # Partidas terminadas hasta aquí ya están incluidas en `datos`
+    marca = models.DateTimeField()
+    datos = models.BinaryField()  # JSON comprimido con zlib
+
+    class Meta:
+        ordering = ["-creado_en"]
+        get_latest_by = "creado_en"
+
+    def __str__(self):
+        return f"Clasificación {self.marca:%Y-%m-%d %H:%M}"
+
+
+# =========================
+# Feedback compacto
+# =========================
+# El feedback de un intento cabe en un entero (21 bits) guardado en
+# Intento.feedback_code: 2 bits por color y por flecha, del bit 0 hacia
+# arriba en el orden de CAMPOS_FEEDBACK, y es_correcto en el bit 20 (el más
+# alto: "acertó" es simplemente feedback_code >= FEEDBACK_CORRECTO).
+# Claves str (no el enum): el hash de DireccionFlecha.NONE no es el de ""
+COLOR_A_BITS = {
+    ColorCategoria.GRIS.value: 0,
+    ColorCategoria.AMARILLO.value: 1,
+    ColorCategoria.VERDE.value: 2,
+}
+FLECHA_A_BITS = {
+    DireccionFlecha.NONE.value: 0,
+    DireccionFlecha.UP.value: 1,
+    DireccionFlecha.DOWN.value: 2,
+}
+BITS_A_COLOR = {v: k for k, v in COLOR_A_BITS.items()}
+BITS_A_FLECHA = {v: k for k, v in FLECHA_A_BITS.items()}
+
+CAMPOS_FEEDBACK = (
+    ("color_anio", COLOR_A_BITS),
+    ("flecha_anio", FLECHA_A_BITS),
+    ("color_popularidad", COLOR_A_BITS),
+    ("flecha_popularidad", FLECHA_A_BITS),
+    ("color_genero", COLOR_A_BITS),
+    ("color_duracion", COLOR_A_BITS),
+    ("flecha_duracion", FLECHA_A_BITS),
+    ("color_direccion", COLOR_A_BITS),
+    ("color_actores", COLOR_A_BITS),
+    ("color_rating", COLOR_A_BITS),
+)
+FEEDBACK_CORRECTO = 1 << (2 * len(CAMPOS_FEEDBACK))
+
+
+@dataclass(frozen=True)
+class Feedback:
+    """
+    Feedback de un intento (colores, flechas y acierto). Ya no es una tabla:
+    se decodifica de Intento.feedback_code y conserva los nombres de campo
+    del antiguo modelo para los lectores existentes.
+    """
+
+    color_anio: str
+    flecha_anio: str
+    color_popularidad: str
+    flecha_popularidad: str
+    color_genero: str
+    color_duracion: str
+    flecha_duracion: str
+    color_direccion: str
+    color_actores: str
+    color_rating: str
+    es_correcto: bool
+
+
+def codificar_feedback(es_correcto: bool = False, **campos: str) -> int:
+    """Campos omitidos = GRIS / sin flecha (los defaults del antiguo modelo)."""
+    code = FEEDBACK_CORRECTO if es_correcto else 0
+    for k, (nombre, tabla) in enumerate(CAMPOS_FEEDBACK):
+        valor = campos.pop(nombre, None)
+        if valor:
+            code |= tabla[valor] << (2 * k)
+    if campos:
+        raise TypeError(f"Campos de feedback desconocidos: {sorted(campos)}")
+    return code
+
+
+def decodificar_feedback(code: int) -> Feedback:
+    return Feedback(
+        *(
+            (BITS_A_COLOR if tabla is COLOR_A_BITS else BITS_A_FLECHA)[(code >> (2 * k)) & 3]
+            for k, (_, tabla) in enumerate(CAMPOS_FEEDBACK)
+        ),
+        es_correcto=code >= FEEDBACK_CORRECTO,
+    )
+
+
 # =========================
 # Intento
 # =========================
+class IntentoQuerySet(models.QuerySet):
+    def correctos(self):
+        return self.filter(feedback_code__gte=FEEDBACK_CORRECTO)
+
+
 class Intento(models.Model):
     partida = models.ForeignKey(
         Partida, on_delete=models.CASCADE, related_name="intentos"
@@ -119,82 +263,86 @@ class Intento(models.Model):
     )
     numero_intento = models.PositiveIntegerField()
     creado_en = models.DateTimeField(auto_now_add=True)
+    # Feedback empaquetado (ver codificar_feedback); null solo en datos antiguos
+    feedback_code = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = IntentoQuerySet.as_manager()
 
     class Meta:
         unique_together = [("partida", "numero_intento")]
         ordering = ["numero_intento"]
+        indexes = [
+            # "Ya intentaste esa película en esta partida"
+            models.Index(
+                fields=["partida", "pelicula_adivinada"],
+                name="intento_partida_peli_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Intento {self.numero_intento} de {self.partida}"
 
+    @property
+    def feedback(self) -> Feedback | None:
+        if self.feedback_code is None:
+            return None
+        return decodificar_feedback(self.feedback_code)
+
 
 # =========================
-# Feedback (1 a 1 con Intento)
+# Repeticiones (modo archivo: días pasados)
 # =========================
-class Feedback(models.Model):
-    intento = models.OneToOneField(
-        Intento, on_delete=models.CASCADE, related_name="feedback"
-    )
+class Repeticion(models.Model):
+    """
+    Partida de un día pasado. Va aparte de Partida para no contar en
+    estadísticas, rachas ni clasificaciones del juego diario.
+    """
 
-    # 1) Año (color + flecha)
-    color_anio = models.CharField(
-        max_length=10, choices=ColorCategoria.choices, default=ColorCategoria.GRIS
-    )
-    flecha_anio = models.CharField(
-        max_length=4,
-        choices=DireccionFlecha.choices,
-        blank=True,
-        default=DireccionFlecha.NONE,
+    jugador = models.ForeignKey(
+        Jugador, on_delete=models.CASCADE, related_name="repeticiones"
     )
-
-    # 2) Popularidad por votos (color + flecha) — usamos imdb_votes
-    color_popularidad = models.CharField(
-        max_length=10, choices=ColorCategoria.choices, default=ColorCategoria.GRIS
+    pelicula_secreta = models.ForeignKey(
+        Pelicula, on_delete=models.PROTECT, related_name="+"
     )
-    flecha_popularidad = models.CharField(
-        max_length=4,
-        choices=DireccionFlecha.choices,
-        blank=True,
-        default=DireccionFlecha.NONE,
+    fecha = models.DateField()  # día del puzzle que se repite
+    estado = models.CharField(
+        max_length=12, choices=EstadoPartida.choices, default=EstadoPartida.EN_CURSO
     )
+    intentos_maximos = models.PositiveIntegerField(default=10)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
 
-    # 3) Géneros (verde si comparte alguno de los 3; si no, gris)
-    color_genero = models.CharField(
-        max_length=10, choices=ColorCategoria.choices, default=ColorCategoria.GRIS
-    )
+    class Meta:
+        unique_together = [("jugador", "fecha")]
+        ordering = ["-fecha"]
 
-    # 4) Duración en minutos (color + flecha)
-    color_duracion = models.CharField(
-        max_length=10, choices=ColorCategoria.choices, default=ColorCategoria.GRIS
-    )
-    flecha_duracion = models.CharField(
-        max_length=4,
-        choices=DireccionFlecha.choices,
-        blank=True,
-        default=DireccionFlecha.NONE,
-    )
+    def __str__(self):
+        return f"Repetición {self.jugador} {self.fecha} ({self.estado})"
 
-    # 5) Director (solo gris/verde)
-    color_direccion = models.CharField(
-        max_length=10, choices=ColorCategoria.choices, default=ColorCategoria.GRIS
-    )
 
-    # 6) Actores (verde si coincide alguno de los 3; si no, gris)
-    color_actores = models.CharField(
-        max_length=10, choices=ColorCategoria.choices, default=ColorCategoria.GRIS
+class IntentoRepeticion(models.Model):
+    repeticion = models.ForeignKey(
+        Repeticion, on_delete=models.CASCADE, related_name="intentos"
     )
-
-    # 7) IMDb Rating (verde exacto; amarillo si |diff| ≤ 1.0; gris si > 1.0)
-    color_rating = models.CharField(
-        max_length=10, choices=ColorCategoria.choices, default=ColorCategoria.GRIS
+    pelicula_adivinada = models.ForeignKey(
+        Pelicula, on_delete=models.PROTECT, related_name="+"
     )
+    numero_intento = models.PositiveIntegerField()
+    creado_en = models.DateTimeField(auto_now_add=True)
+    feedback_code = models.PositiveIntegerField()
+
+    objects = IntentoQuerySet.as_manager()
 
-    es_correcto = models.BooleanField(default=False)
+    class Meta:
+        unique_together = [("repeticion", "numero_intento")]
+        ordering = ["numero_intento"]
 
     def __str__(self):
-        return (
-            f"Feedback intento {self.intento_id} ({'✔' if self.es_correcto else '✗'})"
-        )
+        return f"Intento {self.numero_intento} de {self.repeticion}"
+
+    @property
+    def feedback(self) -> Feedback:
+        return decodificar_feedback(self.feedback_code)
 
 
 # =========================
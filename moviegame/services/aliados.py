@@ -0,0 +1,268 @@
+# moviegame/services/aliados.py
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import medir
+
+"""
+Proxy de productos aliados (ctrlstore) con caché stale-while-revalidate y
+circuit breaker, para que un aliado lento no bloquee los workers:
+
+- Copia fresca (< FRESCO_SEG): se sirve sin llamar al servicio.
+- Copia obsoleta: se sirve al momento y se refresca en un hilo aparte.
+- Sin copia: una única llamada síncrona con timeout corto.
+- Tras FALLOS_PARA_ABRIR errores seguidos el circuito se abre y no se llama
+  al servicio durante ABIERTO_SEG; luego se deja pasar una llamada de prueba.
+
+Las vistas async usan aobtener_productos: la descarga en frío se hace con
+httpx sin ocupar un hilo; el refresco en segundo plano es el mismo para ambas.
+
+La última copia buena también se guarda en la caché compartida para que
+otros procesos (o un reinicio) puedan servirla mientras el aliado falla.
+"""
+
+logger = logging.getLogger(__name__)
+
+API_BASE_DEFECTO = "https://ctrlstore-service-420478585093.us-central1.run.app"
+TIMEOUT_SEG = 3
+FRESCO_SEG = 5 * 60
+RETENER_SEG = 24 * 60 * 60  # cuánto se guarda la última copia buena
+FALLOS_PARA_ABRIR = 3
+ABIERTO_SEG = 60
+MAX_PRODUCTOS = 100
+
+
+def api_base() -> str:
+    return getattr(settings, "MOVIDLE_ALIADOS_BASE", "") or API_BASE_DEFECTO
+
+
+# =========================
+# Circuit breaker
+# =========================
+class CircuitoAbierto(RuntimeError):
+    """El aliado ha fallado demasiadas veces seguidas; no se le llama."""
+
+
+class Circuito:
+    def __init__(self, fallos_para_abrir: int = FALLOS_PARA_ABRIR, abierto_seg: float = ABIERTO_SEG):
+        self.fallos_para_abrir = fallos_para_abrir
+        self.abierto_seg = abierto_seg
+        self._lock = threading.Lock()
+        self.fallos = 0
+        self.abierto_hasta = 0.0
+        self._probando = False
+
+    @property
+    def estado(self) -> str:
+        if self.fallos < self.fallos_para_abrir:
+            return "cerrado"
+        return "abierto" if time.monotonic() < self.abierto_hasta else "semiabierto"
+
+    def permitir(self) -> None:
+        """Lanza CircuitoAbierto si no se debe llamar (en semiabierto pasa una sola)."""
+        with self._lock:
+            if self.fallos < self.fallos_para_abrir:
+                return
+            if time.monotonic() < self.abierto_hasta or self._probando:
+                raise CircuitoAbierto("Servicio de aliados no disponible")
+            self._probando = True
+
+    def exito(self) -> None:
+        with self._lock:
+            self.fallos = 0
+            self._probando = False
+
+    def fallo(self) -> None:
+        with self._lock:
+            self.fallos += 1
+            self._probando = False
+            if self.fallos >= self.fallos_para_abrir:
+                self.abierto_hasta = time.monotonic() + self.abierto_seg
+
+    def soltar(self) -> None:
+        """Llamada interrumpida (cancelación, error inesperado): no cuenta, pero libera la sonda."""
+        with self._lock:
+            self._probando = False
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.fallos = 0
+            self.abierto_hasta = 0.0
+            self._probando = False
+
+
+circuito = Circuito()
+
+
+# =========================
+# Caché SWR
+# =========================
+@dataclass(frozen=True)
+class Copia:
+    productos: list[dict]
+    obtenido_en: float  # time.time(): comparable entre procesos
+
+    @property
+    def edad(self) -> float:
+        return time.time() - self.obtenido_en
+
+
+_local: dict[bool, Copia] = {}
+_refrescos: dict[bool, threading.Thread] = {}
+_lock = threading.Lock()
+
+
+def _clave(destacados: bool) -> str:
+    return f"movidle:aliados:{int(destacados)}"
+
+
+# Errores del aliado (red, HTTP o JSON inesperado) que cuentan para el circuito
+ERRORES_ALIADO = (requests.RequestException, httpx.HTTPError, ValueError, AttributeError)
+ERRORES = (CircuitoAbierto, *ERRORES_ALIADO)
+
+
+def _peticion(destacados: bool) -> tuple[str, dict]:
+    params = {"featured": "true"} if destacados else {}
+    return f"{api_base()}/api/products/in-stock/", params
+
+
+def _procesar(datos: dict) -> list[dict]:
+    base = api_base()
+    productos = datos.get("results", [])[:MAX_PRODUCTOS]
+    for p in productos:
+        p["detail_absolute"] = f"{base}{p.get('detail_url') or ''}"
+    return productos
+
+
+def _descargar(destacados: bool) -> list[dict]:
+    circuito.permitir()
+    url, params = _peticion(destacados)
+    try:
+        with medir("aliados"):
+            r = requests.get(url, params=params, timeout=TIMEOUT_SEG)
+            r.raise_for_status()
+            productos = _procesar(r.json())
+    except ERRORES_ALIADO:
+        circuito.fallo()
+        raise
+    except BaseException:
+        # Sin esto la sonda del semiabierto quedaría tomada y el circuito
+        # no volvería a cerrarse
+        circuito.soltar()
+        raise
+    circuito.exito()
+    return productos
+
+
+async def _adescargar(destacados: bool) -> list[dict]:
+    circuito.permitir()
+    url, params = _peticion(destacados)
+    try:
+        with medir("aliados"):
+            async with httpx.AsyncClient(timeout=TIMEOUT_SEG) as client:
+                r = await client.get(url, params=params)
+            r.raise_for_status()
+            productos = _procesar(r.json())
+    except ERRORES_ALIADO:
+        circuito.fallo()
+        raise
+    except BaseException:  # CancelledError: el cliente cortó la conexión
+        circuito.soltar()
+        raise
+    circuito.exito()
+    return productos
+
+
+def refrescar(destacados: bool) -> Copia:
+    """Descarga y guarda una copia nueva (lanza si el aliado falla)."""
+    copia = Copia(_descargar(destacados), time.time())
+    _local[destacados] = copia
+    cache.set(_clave(destacados), copia, RETENER_SEG)
+    return copia
+
+
+def _refrescar_en_segundo_plano(destacados: bool) -> None:
+    def trabajo():
+        try:
+            refrescar(destacados)
+        except ERRORES as e:
+            logger.warning("Aliados: no se pudo refrescar (%s); se mantiene la copia.", e)
+        finally:
+            with _lock:
+                _refrescos.pop(destacados, None)
+
+    with _lock:
+        if destacados in _refrescos:  # ya hay uno en curso
+            return
+        hilo = _refrescos[destacados] = threading.Thread(target=trabajo, daemon=True)
+    hilo.start()
+
+
+def _mas_reciente(destacados: bool, compartida: Copia | None) -> Copia | None:
+    copia = _local.get(destacados)
+    if compartida is not None and (copia is None or compartida.obtenido_en > copia.obtenido_en):
+        copia = _local[destacados] = compartida
+    return copia
+
+
+def _servir(destacados: bool, copia: Copia) -> tuple[list[dict], bool]:
+    if copia.edad >= FRESCO_SEG:
+        _refrescar_en_segundo_plano(destacados)
+        return copia.productos, True
+    return copia.productos, False
+
+
+def obtener_productos(destacados: bool = False) -> tuple[list[dict] | None, bool]:
+    """
+    (productos, obsoletos). productos es None solo si nunca hubo una copia
+    buena y el aliado no responde.
+    """
+    copia = _mas_reciente(destacados, cache.get(_clave(destacados)))
+    if copia is not None:
+        return _servir(destacados, copia)
+    try:
+        return refrescar(destacados).productos, False
+    except ERRORES as e:
+        logger.warning("Aliados: sin copia y el servicio falla (%s).", e)
+        return None, True
+
+
+async def aobtener_productos(destacados: bool = False) -> tuple[list[dict] | None, bool]:
+    """Versión async de obtener_productos (misma caché y mismo circuito)."""
+    copia = _mas_reciente(destacados, await cache.aget(_clave(destacados)))
+    if copia is not None:
+        return _servir(destacados, copia)
+    try:
+        productos = await _adescargar(destacados)
+    except ERRORES as e:
+        logger.warning("Aliados: sin copia y el servicio falla (%s).", e)
+        return None, True
+    copia = Copia(productos, time.time())
+    _local[destacados] = copia
+    await cache.aset(_clave(destacados), copia, RETENER_SEG)
+    return copia.productos, False
+
+
+def esperar_refrescos(timeout: float = 5.0) -> None:
+    """Espera a que terminen los refrescos en segundo plano (tests, comandos)."""
+    with _lock:
+        hilos = list(_refrescos.values())
+    for hilo in hilos:
+        hilo.join(timeout)
+
+
+def reiniciar() -> None:
+    esperar_refrescos()
+    _local.clear()
+    for destacados in (False, True):
+        cache.delete(_clave(destacados))
+    circuito.reiniciar()
@@ -0,0 +1,419 @@
+# moviegame/services/archivo.py
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from ..models import (
+    FEEDBACK_CORRECTO,
+    EstadoPartida,
+    Intento,
+    Jugador,
+    Partida,
+    Pelicula,
+    ResumenArchivado,
+)
+
+logger = logging.getLogger(__name__)
+
+"""
+Archivo en frío de partidas antiguas.
+
+Las partidas (con sus intentos) anteriores a una fecha de corte salen de la
+BD hacia ficheros gzip JSONL particionados por mes:
+
+  <MOVIDLE_ARCHIVO_DIR>/partidas-AAAA-MM.jsonl.gz
+
+una línea por partida:
+
+  {"id": 1, "jugador": 7, "secreta": 42, "fecha": "2025-01-31",
+   "estado": "GANADA", "max": 10, "creado": "...",
+   "intentos": [[pelicula_id, numero, feedback_code, creado], ...]}
+
+Cada lote añade un miembro gzip al fichero del mes (gzip admite
+concatenación), así que nunca se reescribe lo ya archivado.
+
+Orden de seguridad por lote: primero se escribe y sincroniza el fichero;
+después, en una transacción, se suman los totales a ResumenArchivado y se
+borran las filas. Si el proceso muere entre ambos pasos, la siguiente
+ejecución vuelve a escribir esas partidas: los lectores deduplican por id
+y los resúmenes solo cambian junto con el borrado, así que las
+estadísticas nunca cuentan doble.
+"""
+
+LOTE = 1000
+
+
+def directorio_archivo() -> Path:
+    return Path(getattr(settings, "MOVIDLE_ARCHIVO_DIR", settings.BASE_DIR / "archivo"))
+
+
+def _fichero(directorio: Path, anio: int, mes: int) -> Path:
+    return directorio / f"partidas-{anio:04d}-{mes:02d}.jsonl.gz"
+
+
+def _mes_de_fichero(ruta: Path) -> tuple[int, int] | None:
+    try:
+        anio, mes = ruta.name[len("partidas-") : -len(".jsonl.gz")].split("-")
+        return int(anio), int(mes)
+    except ValueError:
+        return None
+
+
+@dataclass
+class InformeArchivo:
+    partidas: int = 0
+    intentos: int = 0
+    ficheros: set[str] = field(default_factory=set)
+
+
+@dataclass
+class InformeRehidratacion:
+    restauradas: int = 0
+    omitidas: int = 0  # jugador o películas ya no existen: siguen en el fichero
+
+
+# =========================
+# Escritura
+# =========================
+def _lotes(antes_de: date, lote: int) -> Iterator[tuple[int, int, list[dict]]]:
+    """(pk_desde, pk_hasta, filas) de partidas anteriores al corte, por keyset sobre pk."""
+    ultimo = 0
+    while True:
+        filas = list(
+            Partida.objects.filter(fecha__lt=antes_de, pk__gt=ultimo)
+            .order_by("pk")
+            .values(
+                "id", "jugador_id", "pelicula_secreta_id", "fecha",
+                "estado", "intentos_maximos", "creado_en",
+                "intentos_usados", "terminado_en",
+            )[:lote]
+        )
+        if not filas:
+            return
+        yield ultimo, filas[-1]["id"], filas
+        ultimo = filas[-1]["id"]
+
+
+def _registros(filas: list[dict]) -> list[dict]:
+    ids = {f["id"] for f in filas}
+    intentos = defaultdict(list)
+    # Por rango de pk (sin listas IN enormes); se descartan las partidas fuera del lote
+    for pid, peli, n, code, creado in (
+        Intento.objects.filter(partida_id__gte=filas[0]["id"], partida_id__lte=filas[-1]["id"])
+        .order_by("partida_id", "numero_intento")
+        .values_list("partida_id", "pelicula_adivinada_id", "numero_intento", "feedback_code", "creado_en")
+    ):
+        if pid in ids:
+            intentos[pid].append([peli, n, code, creado.isoformat()])
+    return [
+        {
+            "id": f["id"],
+            "jugador": f["jugador_id"],
+            "secreta": f["pelicula_secreta_id"],
+            "fecha": f["fecha"].isoformat(),
+            "estado": f["estado"],
+            "max": f["intentos_maximos"],
+            "creado": f["creado_en"].isoformat(),
+            "usados": f["intentos_usados"],
+            "terminado": f["terminado_en"].isoformat() if f["terminado_en"] else None,
+            "intentos": intentos[f["id"]],
+        }
+        for f in filas
+    ]
+
+
+def _escribir(directorio: Path, registros: list[dict]) -> set[str]:
+    por_mes = defaultdict(list)
+    for r in registros:
+        por_mes[r["fecha"][:7]].append(r)
+    escritos = set()
+    for _, regs in sorted(por_mes.items()):
+        d = date.fromisoformat(regs[0]["fecha"])
+        ruta = _fichero(directorio, d.year, d.month)
+        datos = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in regs)
+        with open(ruta, "ab") as fh:
+            with gzip.GzipFile(fileobj=fh, mode="wb") as gz:
+                gz.write(datos.encode("utf-8"))
+            fh.flush()
+            os.fsync(fh.fileno())
+        escritos.add(ruta.name)
+    return escritos
+
+
+def _contribucion(registros: Iterable[dict]) -> dict[int, dict]:
+    """Totales por jugador de unas partidas archivadas (lo que suman al resumen)."""
+    totales: dict[int, dict] = defaultdict(
+        lambda: {"partidas": 0, "ganadas": 0, "perdidas": 0, "distribucion": Counter()}
+    )
+    for r in registros:
+        t = totales[r["jugador"]]
+        t["partidas"] += 1
+        if r["estado"] == EstadoPartida.GANADA:
+            t["ganadas"] += 1
+        elif r["estado"] == EstadoPartida.PERDIDA:
+            t["perdidas"] += 1
+        for _, n, code, _ in r["intentos"]:
+            if code is not None and code >= FEEDBACK_CORRECTO:
+                t["distribucion"][str(n)] += 1
+    return totales
+
+
+def _aplicar_resumenes(totales: dict[int, dict], signo: int) -> None:
+    existentes = {
+        r.jugador_id: r
+        for r in ResumenArchivado.objects.select_for_update().filter(jugador_id__in=totales)
+    }
+    nuevos, cambiados = [], []
+    for jid, t in totales.items():
+        r = existentes.get(jid)
+        if r is None:
+            r = ResumenArchivado(jugador_id=jid)
+            nuevos.append(r)
+        else:
+            cambiados.append(r)
+        r.partidas += signo * t["partidas"]
+        r.ganadas += signo * t["ganadas"]
+        r.perdidas += signo * t["perdidas"]
+        dist = Counter(r.distribucion)
+        dist.update({k: signo * v for k, v in t["distribucion"].items()})
+        r.distribucion = {k: v for k, v in dist.items() if v > 0}
+    ResumenArchivado.objects.bulk_create(nuevos)
+    ResumenArchivado.objects.bulk_update(
+        cambiados, ["partidas", "ganadas", "perdidas", "distribucion"]
+    )
+
+
+def archivar(
+    antes_de: date,
+    directorio: Path | None = None,
+    lote: int = LOTE,
+    simular: bool = False,
+) -> InformeArchivo:
+    """
+    Mueve al archivo las partidas con fecha < antes_de, en lotes de `lote`.
+    Con simular=True solo cuenta lo que se movería.
+    """
+    directorio = Path(directorio or directorio_archivo())
+    if not simular:
+        directorio.mkdir(parents=True, exist_ok=True)
+    informe = InformeArchivo()
+    for desde, hasta, filas in _lotes(antes_de, lote):
+        registros = _registros(filas)
+        informe.partidas += len(registros)
+        informe.intentos += sum(len(r["intentos"]) for r in registros)
+        if simular:
+            continue
+        informe.ficheros |= _escribir(directorio, registros)
+        with transaction.atomic():
+            jugadores = {r["jugador"] for r in registros}
+            totales = _contribucion(registros)
+            # Un jugador borrado entre la lectura y aquí ya no necesita resumen
+            vivos = set(Jugador.objects.filter(pk__in=jugadores).values_list("pk", flat=True))
+            _aplicar_resumenes({j: t for j, t in totales.items() if j in vivos}, +1)
+            Partida.objects.filter(fecha__lt=antes_de, pk__gt=desde, pk__lte=hasta).delete()
+        logger.info("Archivadas %d partidas (hasta pk %d)", len(registros), hasta)
+    return informe
+
+
+# =========================
+# Lectura
+# =========================
+def _leer_fichero(ruta: Path) -> list[dict]:
+    """Partidas de un fichero mensual, sin duplicados y en orden (fecha, id)."""
+    por_id = {}
+    with gzip.open(ruta, "rt", encoding="utf-8") as fh:
+        for linea in fh:
+            r = json.loads(linea)
+            por_id[r["id"]] = r
+    return sorted(por_id.values(), key=lambda r: (r["fecha"], r["id"]))
+
+
+def leer_archivo(
+    jugador_id: int | None = None,
+    desde: date | None = None,
+    hasta: date | None = None,
+    directorio: Path | None = None,
+) -> Iterator[dict]:
+    """
+    Partidas archivadas (en el formato del fichero) en orden de fecha,
+    opcionalmente de un jugador y dentro de [desde, hasta]. Solo abre los
+    ficheros de los meses que caen en el rango.
+    """
+    directorio = Path(directorio or directorio_archivo())
+    if not directorio.is_dir():
+        return
+    for ruta in sorted(directorio.glob("partidas-*.jsonl.gz")):
+        mes = _mes_de_fichero(ruta)
+        if mes is None:
+            continue
+        if desde and mes < (desde.year, desde.month):
+            continue
+        if hasta and mes > (hasta.year, hasta.month):
+            continue
+        for r in _leer_fichero(ruta):
+            if jugador_id is not None and r["jugador"] != jugador_id:
+                continue
+            if desde and r["fecha"] < desde.isoformat():
+                continue
+            if hasta and r["fecha"] > hasta.isoformat():
+                continue
+            yield r
+
+
+def historial_jugador(jugador: Jugador, incluir_archivo: bool = False) -> list[dict]:
+    """
+    Partidas de un jugador, de la más reciente a la más antigua:
+    [{"fecha", "estado", "intentos", "secreta_id", "archivada"}].
+    Las archivadas solo se leen si se piden (abren ficheros del disco).
+    """
+    hot = [
+        {
+            "fecha": p["fecha"].isoformat(),
+            "estado": p["estado"],
+            "intentos": p["n"],
+            "secreta_id": p["pelicula_secreta_id"],
+            "archivada": False,
+        }
+        for p in jugador.partidas.order_by("-fecha")
+        .annotate(n=Count("intentos"))
+        .values("fecha", "estado", "n", "pelicula_secreta_id")
+    ]
+    if not incluir_archivo:
+        return hot
+    archivadas = [
+        {
+            "fecha": r["fecha"],
+            "estado": r["estado"],
+            "intentos": len(r["intentos"]),
+            "secreta_id": r["secreta"],
+            "archivada": True,
+        }
+        for r in leer_archivo(jugador_id=jugador.pk)
+    ]
+    archivadas.reverse()
+    return hot + archivadas
+
+
+# =========================
+# Rehidratación
+# =========================
+def _reescribir(ruta: Path, registros: list[dict]) -> None:
+    """Sustituye el fichero por uno con solo `registros` (temporal + os.replace)."""
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    datos = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in registros)
+    with open(tmp, "wb") as fh:
+        with gzip.GzipFile(fileobj=fh, mode="wb") as gz:
+            gz.write(datos.encode("utf-8"))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, ruta)
+
+
+def _cierre(r: dict) -> dict:
+    """
+    intentos_usados y terminado_en de una partida archivada. Los ficheros
+    anteriores a estos campos no los traen: en las terminadas se deducen de
+    los intentos, como hizo la migración 0010.
+    """
+    usados, terminado = r.get("usados"), r.get("terminado")
+    if "usados" not in r and r["estado"] != EstadoPartida.EN_CURSO and r["intentos"]:
+        usados = max(i[1] for i in r["intentos"])
+        terminado = max(i[3] for i in r["intentos"])
+    return {
+        "intentos_usados": usados,
+        "terminado_en": datetime.fromisoformat(terminado) if terminado else None,
+    }
+
+
+def rehidratar(anio: int, mes: int, directorio: Path | None = None) -> InformeRehidratacion:
+    """
+    Devuelve a la BD las partidas de un mes archivado y descuenta su
+    contribución de los resúmenes. Las partidas que siguen en la BD
+    (archivado interrumpido) no se duplican ni descuentan. El fichero se
+    borra solo si no queda nada por restaurar; si alguna partida no se pudo
+    restaurar (su jugador o sus películas ya no existen), se reescribe con
+    ellas para no perderlas.
+    """
+    ruta = _fichero(Path(directorio or directorio_archivo()), anio, mes)
+    if not ruta.exists():
+        return InformeRehidratacion()
+    registros = _leer_fichero(ruta)
+    with transaction.atomic():
+        ya = set(
+            Partida.objects.filter(pk__in=[r["id"] for r in registros]).values_list("pk", flat=True)
+        )
+        jugadores = set(
+            Jugador.objects.filter(pk__in={r["jugador"] for r in registros}).values_list("pk", flat=True)
+        )
+        pelis_ref = {r["secreta"] for r in registros} | {
+            i[0] for r in registros for i in r["intentos"]
+        }
+        pelis = set(Pelicula.objects.filter(pk__in=pelis_ref).values_list("pk", flat=True))
+        restaurar, pendientes = [], []
+        for r in registros:
+            if r["id"] in ya:
+                continue
+            if (
+                r["jugador"] in jugadores
+                and r["secreta"] in pelis
+                and all(i[0] in pelis for i in r["intentos"])
+            ):
+                restaurar.append(r)
+            else:
+                pendientes.append(r)
+        partidas = [
+            Partida(
+                id=r["id"],
+                jugador_id=r["jugador"],
+                pelicula_secreta_id=r["secreta"],
+                fecha=date.fromisoformat(r["fecha"]),
+                estado=r["estado"],
+                intentos_maximos=r["max"],
+                **_cierre(r),
+            )
+            for r in restaurar
+        ]
+        intentos = [
+            Intento(
+                partida_id=r["id"],
+                pelicula_adivinada_id=peli,
+                numero_intento=n,
+                feedback_code=code,
+            )
+            for r in restaurar
+            for peli, n, code, _ in r["intentos"]
+        ]
+        Partida.objects.bulk_create(partidas)
+        Intento.objects.bulk_create(intentos)
+        # auto_now_add pisa creado_en al insertar: se restaura el original
+        for p, r in zip(partidas, restaurar):
+            p.creado_en = datetime.fromisoformat(r["creado"])
+        creados = iter(datetime.fromisoformat(i[3]) for r in restaurar for i in r["intentos"])
+        for it in intentos:
+            it.creado_en = next(creados)
+        Partida.objects.bulk_update(partidas, ["creado_en"], batch_size=LOTE)
+        Intento.objects.bulk_update(
+            [it for it in intentos if it.pk], ["creado_en"], batch_size=LOTE
+        )
+        _aplicar_resumenes(_contribucion(restaurar), -1)
+        if pendientes:
+            transaction.on_commit(lambda: _reescribir(ruta, pendientes))
+            logger.warning(
+                "Rehidratación %04d-%02d: %d partidas sin jugador o películas siguen archivadas",
+                anio, mes, len(pendientes),
+            )
+        else:
+            transaction.on_commit(ruta.unlink)
+    return InformeRehidratacion(restauradas=len(restaurar), omitidas=len(pendientes))
@@ -0,0 +1,137 @@
+# moviegame/services/catalog_cache.py
+from __future__ import annotations
+
+import json
+import threading
+from typing import Iterable
+
+from django.core.cache import cache
+
+from ..models import Pelicula
+
+# Clave compartida (cache de Django) con la versión del catálogo. Cada proceso
+# compara su copia local contra esta versión para saber si debe descartarla.
+# Solo llega a los demás workers si la caché es compartida (MOVIDLE_REDIS_URL
+# en settings); con LocMem cada proceso tiene su propia versión.
+VERSION_KEY = "movidle:catalogo:version"
+
+# Máximo de ids (o imdb_ids) aceptados por consulta en lote
+MAX_LOTE = 300
+
+_lock = threading.Lock()
+_version_local: int | None = None
+_por_id: dict[int, str] = {}
+_por_imdb: dict[str, int] = {}
+
+
+# =========================
+# Versión del catálogo
+# =========================
+def catalog_version() -> int:
+    """Versión actual del catálogo (cambia cada vez que se guarda una película)."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(VERSION_KEY, version, timeout=None)
+    return version
+
+
+async def acatalog_version() -> int:
+    """catalog_version() para vistas async (no bloquea el bucle de eventos)."""
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        version = 1
+        await cache.aadd(VERSION_KEY, version, timeout=None)
+    return version
+
+
+def bump_catalog_version() -> int:
+    """Invalida las copias en memoria de todos los procesos."""
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        version = 2
+        cache.set(VERSION_KEY, version, timeout=None)
+    _limpiar_local()
+    return version
+
+
+def _limpiar_local() -> None:
+    global _version_local
+    with _lock:
+        _por_id.clear()
+        _por_imdb.clear()
+        _version_local = None
+
+
+def _sincronizar_version() -> None:
+    global _version_local
+    version = catalog_version()
+    if _version_local != version:
+        with _lock:
+            _por_id.clear()
+            _por_imdb.clear()
+            _version_local = version
+
+
+# =========================
+# Serialización
+# =========================
+def pelicula_a_dict(m: Pelicula) -> dict:
+    """Representación pública de una película (sin URLs dependientes del host)."""
+    return {
+        "id": m.id,
+        "imdb_id": m.imdb_id,
+        "title": m.titulo,
+        "year": m.anio,
+        "genres": ", ".join(m.lista_generos()),
+        "runtime_min": int(m.duracion_min or 0),
+        "imdb_rating": float(m.imdb_rating) if m.imdb_rating is not None else None,
+        "popularity_votes": int(m.imdb_votes or 0),
+        "poster_url": m.poster_url,
+    }
+
+
+def _serializar(m: Pelicula) -> str:
+    return json.dumps(pelicula_a_dict(m), ensure_ascii=False)
+
+
+# =========================
+# Consulta en lote
+# =========================
+def peliculas_en_lote(
+    ids: Iterable[int] = (), imdb_ids: Iterable[str] = ()
+) -> tuple[list[str], list[str]]:
+    """
+    Devuelve (fragmentos_json, faltantes) para los ids / imdb_ids pedidos,
+    respetando el orden de la petición y sin duplicados.
+    Solo consulta la BD por lo que no esté ya en la caché del proceso.
+    """
+    _sincronizar_version()
+    ids = list(dict.fromkeys(ids))
+    imdb_ids = list(dict.fromkeys(imdb_ids))
+
+    faltan_ids = [i for i in ids if i not in _por_id]
+    faltan_imdb = [t for t in imdb_ids if t not in _por_imdb]
+    if faltan_ids or faltan_imdb:
+        qs = Pelicula.objects.filter(id__in=faltan_ids) | Pelicula.objects.filter(
+            imdb_id__in=faltan_imdb
+        )
+        with _lock:
+            for m in qs.order_by():
+                _por_id[m.id] = _serializar(m)
+                if m.imdb_id:
+                    _por_imdb[m.imdb_id] = m.id
+
+    fragmentos: list[str] = []
+    faltantes: list[str] = []
+    vistos: set[int] = set()
+    pedidos = [(str(i), i) for i in ids] + [(t, _por_imdb.get(t)) for t in imdb_ids]
+    for clave, pk in pedidos:
+        frag = _por_id.get(pk) if pk is not None else None
+        if frag is None:
+            faltantes.append(clave)
+        elif pk not in vistos:
+            vistos.add(pk)
+            fragmentos.append(frag)
+    return fragmentos, faltantes
@@ -0,0 +1,401 @@
+# moviegame/services/clasificacion.py
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import zlib
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ..models import (
+    EstadoPartida,
+    Jugador,
+    Partida,
+    ResumenArchivado,
+    SnapshotClasificacion,
+)
+
+logger = logging.getLogger(__name__)
+
+"""
+Clasificaciones en memoria (por proceso), sin ORDER BY sobre Partida.
+
+- diaria (hoy y ayer): menos intentos y, a igualdad, quien terminó antes;
+  las perdidas van detrás de todas las ganadas.
+- rachas: racha máxima histórica.
+- victorias: tasa de victorias (mínimo MIN_PARTIDAS_TASA terminadas).
+
+Cada tablero es una ListaOrdenada: posición de un jugador, top y vecinos en
+O(log n), altas y cambios en O(log n) + un memmove de ~CARGA elementos.
+
+Fuente de verdad: Partida.terminado_en / intentos_usados (los fija
+registrar_intento). Cada proceso:
+- aplica al momento las partidas que termina él (partida_terminada, al
+  hacer commit), si ya tiene las clasificaciones cargadas;
+- cada SINCRONIZAR_SEG, al consultar, lee las terminadas por otros procesos
+  desde su marca (índice sobre terminado_en). Se relee un SOLAPE hacia
+  atrás por los commits que llegan tarde; los ids ya aplicados se ignoran.
+
+Al arrancar se parte del último SnapshotClasificacion (comando
+`clasificacion --snapshot`) y solo se aplica lo posterior; sin snapshot se
+reconstruye desde la BD (incluidos los totales archivados).
+"""
+
+CARGA = 512
+DIAS_DIARIA = 2  # hoy y ayer
+MIN_PARTIDAS_TASA = 10
+SINCRONIZAR_SEG = 2.0
+SOLAPE = timedelta(seconds=30)
+SNAPSHOTS_GUARDADOS = 3
+PERDIDA = 1_000  # "intentos" de una perdida en la clave diaria
+
+TIPOS = ("diaria", "rachas", "victorias")
+
+
+# =========================
+# Estructura ordenada
+# =========================
+class ListaOrdenada:
+    """
+    Lista ordenada en cubos de hasta 2*CARGA elementos con un árbol de
+    Fenwick sobre sus tamaños (posición y k-ésimo en O(log n)).
+    """
+
+    def __init__(self, valores: Iterable = ()):
+        v = sorted(valores)
+        self._cubos = [v[i : i + CARGA] for i in range(0, len(v), CARGA)]
+        self._reindexar()
+
+    def _reindexar(self) -> None:
+        self._maximos = [c[-1] for c in self._cubos]
+        arbol = [0] * (len(self._cubos) + 1)
+        for i, c in enumerate(self._cubos, start=1):
+            arbol[i] += len(c)
+            j = i + (i & -i)
+            if j < len(arbol):
+                arbol[j] += arbol[i]
+        self._arbol = arbol
+        self._len = sum(map(len, self._cubos))
+
+    def _sumar(self, cubo: int, delta: int) -> None:
+        i = cubo + 1
+        while i < len(self._arbol):
+            self._arbol[i] += delta
+            i += i & -i
+
+    def _prefijo(self, cubos: int) -> int:
+        s, i = 0, cubos
+        while i:
+            s += self._arbol[i]
+            i -= i & -i
+        return s
+
+    def __len__(self) -> int:
+        return self._len
+
+    def agregar(self, x) -> None:
+        if not self._cubos:
+            self._cubos = [[x]]
+            self._reindexar()
+            return
+        i = min(bisect_left(self._maximos, x), len(self._cubos) - 1)
+        c = self._cubos[i]
+        insort(c, x)
+        self._maximos[i] = c[-1]
+        self._len += 1
+        if len(c) > 2 * CARGA:
+            self._cubos[i : i + 1] = [c[:CARGA], c[CARGA:]]
+            self._reindexar()
+        else:
+            self._sumar(i, 1)
+
+    def quitar(self, x) -> None:
+        i = bisect_left(self._maximos, x)
+        c = self._cubos[i] if i < len(self._cubos) else []
+        k = bisect_left(c, x)
+        if k == len(c) or c[k] != x:
+            raise ValueError(f"{x!r} no está en la lista")
+        del c[k]
+        self._len -= 1
+        if not c:
+            del self._cubos[i]
+            self._reindexar()
+        else:
+            self._maximos[i] = c[-1]
+            self._sumar(i, -1)
+
+    def posicion(self, x) -> int:
+        """Nº de elementos menores que x."""
+        i = bisect_left(self._maximos, x)
+        if i == len(self._cubos):
+            return self._len
+        return self._prefijo(i) + bisect_left(self._cubos[i], x)
+
+    def __getitem__(self, k: int):
+        if not 0 <= k < self._len:
+            raise IndexError(k)
+        # Descenso por el Fenwick: último cubo cuyo prefijo no pasa de k
+        cubo, resto = 0, k
+        paso = 1 << (len(self._arbol) - 1).bit_length()
+        while paso:
+            j = cubo + paso
+            if j < len(self._arbol) and self._arbol[j] <= resto:
+                cubo = j
+                resto -= self._arbol[j]
+            paso >>= 1
+        return self._cubos[cubo][resto]
+
+
+class Tablero:
+    """Clasificación de jugadores por una clave (tupla, menor = mejor)."""
+
+    def __init__(self, claves: dict[int, tuple] | None = None):
+        self._claves = dict(claves or {})
+        self._orden = ListaOrdenada((*c, jid) for jid, c in self._claves.items())
+
+    def __len__(self) -> int:
+        return len(self._orden)
+
+    def poner(self, jugador_id: int, clave: tuple | None) -> None:
+        """Alta, cambio o (con None) baja del jugador."""
+        vieja = self._claves.pop(jugador_id, None)
+        if vieja is not None:
+            self._orden.quitar((*vieja, jugador_id))
+        if clave is not None:
+            self._claves[jugador_id] = clave
+            self._orden.agregar((*clave, jugador_id))
+
+    def clave(self, jugador_id: int) -> tuple | None:
+        return self._claves.get(jugador_id)
+
+    def posicion(self, jugador_id: int) -> int | None:
+        """Puesto (desde 1) o None si no está."""
+        c = self._claves.get(jugador_id)
+        return None if c is None else self._orden.posicion((*c, jugador_id)) + 1
+
+    def tramo(self, desde: int, hasta: int) -> list[tuple[int, int, tuple]]:
+        """[(puesto, jugador_id, clave)] de los puestos desde..hasta (desde 1)."""
+        res = []
+        for k in range(max(desde, 1) - 1, min(hasta, len(self))):
+            *clave, jid = self._orden[k]
+            res.append((k + 1, jid, tuple(clave)))
+        return res
+
+    def claves(self) -> dict[int, tuple]:
+        return dict(self._claves)
+
+
+# =========================
+# Claves
+# =========================
+def _clave_diaria(estado: str, intentos: int | None, terminado: datetime) -> tuple:
+    n = intentos if estado == EstadoPartida.GANADA and intentos else PERDIDA
+    return (n, terminado.timestamp())
+
+
+def _clave_rachas(racha_maxima: int) -> tuple | None:
+    return (-racha_maxima,) if racha_maxima else None
+
+
+def _clave_victorias(ganadas: int, jugadas: int) -> tuple | None:
+    if jugadas < MIN_PARTIDAS_TASA:
+        return None
+    return (-ganadas / jugadas, -ganadas)
+
+
+# =========================
+# Estado por proceso
+# =========================
+_CAMPOS = ("id", "jugador_id", "fecha", "estado", "intentos_usados", "terminado_en", "jugador__racha_maxima")
+
+
+class Clasificaciones:
+    def __init__(self, base: datetime):
+        self.lock = threading.RLock()
+        self.diarias: dict[date, Tablero] = {}
+        self.rachas = Tablero()
+        self.victorias = Tablero()
+        self.totales: dict[int, list[int]] = {}  # jugador -> [ganadas, jugadas]
+        # Todo lo terminado antes de `base` está incluido; lo posterior ya
+        # aplicado está en `aplicadas` (id -> terminado_en)
+        self.base = base
+        self.aplicadas: dict[int, datetime] = {}
+        self.sincronizado = 0.0
+
+    def tablero(self, tipo: str, fecha: date | None = None) -> Tablero | None:
+        if tipo == "diaria":
+            return self.diarias.get(fecha or timezone.localdate())
+        return self.rachas if tipo == "rachas" else self.victorias
+
+    def aplicar(self, p: dict) -> None:
+        """Partida terminada (dict con _CAMPOS). Idempotente."""
+        if p["id"] in self.aplicadas or p["terminado_en"] < self.base:
+            return
+        self.aplicadas[p["id"]] = p["terminado_en"]
+        jid = p["jugador_id"]
+        if p["fecha"] > timezone.localdate() - timedelta(days=DIAS_DIARIA):
+            self.diarias.setdefault(p["fecha"], Tablero()).poner(
+                jid, _clave_diaria(p["estado"], p["intentos_usados"], p["terminado_en"])
+            )
+        tot = self.totales.setdefault(jid, [0, 0])
+        tot[0] += p["estado"] == EstadoPartida.GANADA
+        tot[1] += 1
+        self.victorias.poner(jid, _clave_victorias(*tot))
+        self.rachas.poner(jid, _clave_rachas(p["jugador__racha_maxima"]))
+
+    def sincronizar(self, forzar: bool = False) -> None:
+        ahora = time.monotonic()
+        if not forzar and ahora - self.sincronizado < SINCRONIZAR_SEG:
+            return
+        self.sincronizado = ahora
+        nuevas = list(
+            Partida.objects.filter(terminado_en__gte=self.base)
+            .exclude(pk__in=list(self.aplicadas))
+            .values(*_CAMPOS)
+        )
+        for p in sorted(nuevas, key=lambda p: p["terminado_en"]):
+            self.aplicar(p)
+        self._podar()
+
+    def _podar(self) -> None:
+        if self.aplicadas:
+            base = max(self.aplicadas.values()) - SOLAPE
+            if base > self.base:
+                self.base = base
+                self.aplicadas = {i: t for i, t in self.aplicadas.items() if t >= base}
+        limite = timezone.localdate() - timedelta(days=DIAS_DIARIA)
+        for fecha in [f for f in self.diarias if f <= limite]:
+            del self.diarias[fecha]
+
+    # --- snapshot ---
+    def a_bytes(self) -> bytes:
+        datos = {
+            "base": self.base.isoformat(),
+            "aplicadas": {str(i): t.isoformat() for i, t in self.aplicadas.items()},
+            "totales": self.totales,
+            "rachas": {j: -c[0] for j, c in self.rachas.claves().items()},
+            "diarias": {
+                f.isoformat(): {j: list(c) for j, c in t.claves().items()}
+                for f, t in self.diarias.items()
+            },
+        }
+        return zlib.compress(json.dumps(datos, separators=(",", ":")).encode())
+
+    @classmethod
+    def desde_bytes(cls, crudo: bytes) -> "Clasificaciones":
+        datos = json.loads(zlib.decompress(crudo))
+        c = cls(datetime.fromisoformat(datos["base"]))
+        c.aplicadas = {int(i): datetime.fromisoformat(t) for i, t in datos["aplicadas"].items()}
+        c.totales = {int(j): t for j, t in datos["totales"].items()}
+        c.victorias = Tablero(
+            {j: k for j, t in c.totales.items() if (k := _clave_victorias(*t))}
+        )
+        c.rachas = Tablero({int(j): (-r,) for j, r in datos["rachas"].items()})
+        c.diarias = {
+            date.fromisoformat(f): Tablero({int(j): tuple(k) for j, k in t.items()})
+            for f, t in datos["diarias"].items()
+        }
+        return c
+
+
+def reconstruir() -> Clasificaciones:
+    """Clasificaciones completas desde la BD (y los totales archivados)."""
+    c = Clasificaciones(timezone.now() - SOLAPE)
+    terminadas = Partida.objects.filter(
+        estado__in=(EstadoPartida.GANADA, EstadoPartida.PERDIDA)
+    ).exclude(terminado_en__gte=c.base)
+    for jid, g, n in (
+        terminadas.values("jugador_id")
+        .annotate(g=Count("id", filter=Q(estado=EstadoPartida.GANADA)), n=Count("id"))
+        .values_list("jugador_id", "g", "n")
+        .order_by()
+    ):
+        c.totales[jid] = [g, n]
+    for jid, g, p in ResumenArchivado.objects.values_list("jugador_id", "ganadas", "perdidas"):
+        tot = c.totales.setdefault(jid, [0, 0])
+        tot[0] += g
+        tot[1] += g + p
+    c.victorias = Tablero({j: k for j, t in c.totales.items() if (k := _clave_victorias(*t))})
+    c.rachas = Tablero(
+        {j: (-r,) for j, r in Jugador.objects.filter(racha_maxima__gt=0).values_list("pk", "racha_maxima")}
+    )
+    desde = timezone.localdate() - timedelta(days=DIAS_DIARIA - 1)
+    por_dia: dict[date, dict[int, tuple]] = {}
+    for jid, fecha, estado, n, t in terminadas.filter(
+        fecha__gte=desde, terminado_en__isnull=False
+    ).values_list("jugador_id", "fecha", "estado", "intentos_usados", "terminado_en"):
+        por_dia.setdefault(fecha, {})[jid] = _clave_diaria(estado, n, t)
+    c.diarias = {f: Tablero(claves) for f, claves in por_dia.items()}
+    c.sincronizar(forzar=True)
+    return c
+
+
+# =========================
+# API del módulo
+# =========================
+_estado: Clasificaciones | None = None
+_lock_carga = threading.Lock()
+
+
+def _cargar() -> Clasificaciones:
+    snap = SnapshotClasificacion.objects.only("datos").first()
+    if snap is None:
+        return reconstruir()
+    c = Clasificaciones.desde_bytes(bytes(snap.datos))
+    c.sincronizar(forzar=True)
+    return c
+
+
+def clasificaciones() -> Clasificaciones:
+    """Estado del proceso: se carga la primera vez y se sincroniza cada SINCRONIZAR_SEG."""
+    global _estado
+    if _estado is None:
+        with _lock_carga:
+            if _estado is None:
+                _estado = _cargar()
+    with _estado.lock:
+        _estado.sincronizar()
+    return _estado
+
+
+def partida_terminada(partida: Partida, racha_maxima: int) -> None:
+    """Tras el commit de registrar_intento. No carga nada si el proceso aún no lo tenía."""
+    if _estado is None:
+        return
+    with _estado.lock:
+        _estado.aplicar(
+            {
+                "id": partida.pk,
+                "jugador_id": partida.jugador_id,
+                "fecha": partida.fecha,
+                "estado": partida.estado,
+                "intentos_usados": partida.intentos_usados,
+                "terminado_en": partida.terminado_en,
+                "jugador__racha_maxima": racha_maxima,
+            }
+        )
+
+
+def guardar_snapshot() -> SnapshotClasificacion:
+    c = clasificaciones()
+    with c.lock:
+        c.sincronizar(forzar=True)
+        crudo = c.a_bytes()
+        marca = max(c.aplicadas.values(), default=c.base)
+    snap = SnapshotClasificacion.objects.create(marca=marca, datos=crudo)
+    viejos = SnapshotClasificacion.objects.values_list("pk", flat=True)[SNAPSHOTS_GUARDADOS:]
+    SnapshotClasificacion.objects.filter(pk__in=list(viejos)).delete()
+    return snap
+
+
+def reiniciar(recargar: bool = False) -> None:
+    """Descarta el estado del proceso (tests, o tras recalcular_rachas --completo)."""
+    global _estado
+    with _lock_carga:
+        _estado = reconstruir() if recargar else None
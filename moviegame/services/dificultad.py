@@ -0,0 +1,175 @@
+# moviegame/services/dificultad.py
+from __future__ import annotations
+
+import multiprocessing as mp
+import random
+import statistics
+from bisect import bisect
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import accumulate
+
+from django.db import connections
+
+from .game_service import MAX_INTENTOS
+from ..models import Feedback
+from .solver import CatalogoCompilado, catalogo, indices, sugerir
+
+"""
+Estimación de dificultad de una película como secreta: se juegan partidas
+sintéticas contra ella con varios modelos de jugador y las reglas de
+game_service (las del solver compilado), y se resume la distribución de
+intentos y la tasa de derrota a MAX_INTENTOS.
+
+Modelos (todos respetan las pistas recibidas, como un jugador atento):
+- aleatorio:   intenta una candidata compatible al azar.
+- popularidad: candidata compatible al azar ponderada por votos (los
+               jugadores piensan antes en películas conocidas).
+- solver:      la mejor sugerencia del solver (determinista: 1 partida).
+
+El reparto en procesos usa fork: los workers heredan el catálogo compilado
+sin serializarlo ni tocar la BD. Donde no hay fork se ejecuta en serie.
+"""
+
+MODELOS = ("aleatorio", "popularidad", "solver")
+UMBRAL_LISTA = 256  # por debajo, filtrar una lista es más barato que un bitset
+
+
+@dataclass
+class Dificultad:
+    pelicula_id: int
+    titulo: str
+    modelo: str
+    intentos: Counter = field(default_factory=Counter)  # nº de intentos -> partidas ganadas
+    perdidas: int = 0
+
+    @property
+    def partidas(self) -> int:
+        return sum(self.intentos.values()) + self.perdidas
+
+    def resumen(self) -> dict:
+        ganadas = list(self.intentos.elements())
+        return {
+            "pelicula_id": self.pelicula_id,
+            "titulo": self.titulo,
+            "modelo": self.modelo,
+            "partidas": self.partidas,
+            "distribucion": {str(k): self.intentos[k] for k in sorted(self.intentos)},
+            "media_intentos": round(statistics.fmean(ganadas), 2) if ganadas else None,
+            "tasa_perdida": round(self.perdidas / self.partidas, 4) if self.partidas else 0.0,
+        }
+
+
+def _elegir(cat: CatalogoCompilado, filas: list[int], modelo: str, rnd: random.Random) -> int:
+    if modelo == "aleatorio":
+        return rnd.choice(filas)
+    # popularidad: ruleta por votos (+1 para que las sin votos no sean imposibles)
+    acumulados = list(accumulate(cat.votos[i] + 1 for i in filas))
+    return filas[bisect(acumulados, rnd.random() * acumulados[-1])]
+
+
+def jugar(
+    cat: CatalogoCompilado,
+    secreta: int,
+    modelo: str,
+    rnd: random.Random,
+    max_intentos: int = MAX_INTENTOS,
+) -> int | None:
+    """Juega una partida contra la fila `secreta`; nº de intentos o None si pierde."""
+    if modelo == "solver":
+        bits, intentadas = cat.todos, set()
+        for n in range(1, max_intentos + 1):
+            sug = sugerir(cat, bits, excluir=intentadas, n=1)[0]
+            g = cat.fila_de[sug.pelicula_id]
+            if g == secreta:
+                return n
+            intentadas.add(sug.pelicula_id)
+            bits &= cat.mascara(g, Feedback(*cat.patron(g, secreta)))
+        return None
+
+    bits: int | None = cat.todos
+    filas: list[int] = []
+    for n in range(1, max_intentos + 1):
+        if bits is not None:
+            filas = indices(bits)
+        g = _elegir(cat, filas, modelo, rnd)
+        if g == secreta:
+            return n
+        patron = cat.patron(g, secreta)
+        if bits is not None and len(filas) > UMBRAL_LISTA:
+            bits &= cat.mascara(g, Feedback(*patron))
+        else:
+            bits = None
+            filas = [t for t in filas if t != g and cat.patron(g, t) == patron]
+    return None
+
+
+def evaluar(
+    cat: CatalogoCompilado,
+    pelicula_ids: list[int],
+    modelos: tuple[str, ...] = MODELOS,
+    partidas: int = 1000,
+    seed: int = 0,
+    max_intentos: int = MAX_INTENTOS,
+) -> list[Dificultad]:
+    res = []
+    for pid in pelicula_ids:
+        s = cat.fila_de[pid]
+        for modelo in modelos:
+            d = Dificultad(pid, cat.titulos[s], modelo)
+            rnd = random.Random(f"{seed}:{pid}:{modelo}")
+            for _ in range(1 if modelo == "solver" else partidas):
+                n = jugar(cat, s, modelo, rnd, max_intentos)
+                if n is None:
+                    d.perdidas += 1
+                else:
+                    d.intentos[n] += 1
+            res.append(d)
+    return res
+
+
+# Catálogo heredado por los workers (fork)
+_cat_worker: CatalogoCompilado | None = None
+
+
+def _evaluar_lote(pelicula_ids, modelos, partidas, seed, max_intentos) -> list[Dificultad]:
+    return evaluar(_cat_worker, pelicula_ids, modelos, partidas, seed, max_intentos)
+
+
+def evaluar_en_paralelo(
+    pelicula_ids: list[int],
+    modelos: tuple[str, ...] = MODELOS,
+    partidas: int = 1000,
+    procesos: int | None = None,
+    seed: int = 0,
+    max_intentos: int = MAX_INTENTOS,
+    cat: CatalogoCompilado | None = None,
+) -> list[Dificultad]:
+    """
+    Igual que evaluar() repartiendo las películas entre `procesos` workers.
+    El resultado no depende del número de procesos (semilla por película).
+    """
+    global _cat_worker
+    cat = cat or catalogo()
+    procesos = procesos or mp.cpu_count()
+    if procesos <= 1 or len(pelicula_ids) <= 1 or "fork" not in mp.get_all_start_methods():
+        return evaluar(cat, pelicula_ids, modelos, partidas, seed, max_intentos)
+
+    # Lotes pequeños para repartir bien la carga (unas películas cuestan más)
+    tam = max(1, min(50, len(pelicula_ids) // (procesos * 4)))
+    lotes = [pelicula_ids[i : i + tam] for i in range(0, len(pelicula_ids), tam)]
+    _cat_worker = cat
+    # Los hijos no deben heredar conexiones abiertas (salvo una transacción en curso)
+    for conexion in connections.all(initialized_only=True):
+        if not conexion.in_atomic_block:
+            conexion.close()
+    try:
+        with ProcessPoolExecutor(procesos, mp_context=mp.get_context("fork")) as pool:
+            futuros = [
+                pool.submit(_evaluar_lote, lote, modelos, partidas, seed, max_intentos)
+                for lote in lotes
+            ]
+            return [d for f in futuros for d in f.result()]
+    finally:
+        _cat_worker = None
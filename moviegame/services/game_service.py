@@ -1,20 +1,26 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime, time, timedelta
+import threading
 import unicodedata
 
-from django.db import transaction
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.utils import timezone
 
+from . import clasificacion
+from .metrics import medir
+from .rachas import gano_el_dia
 from ..models import (
     Pelicula,
     Jugador,
     Partida,
     Intento,
-    Feedback,
     PeliculaDelDia,
     ColorCategoria,
     EstadoPartida,
+    codificar_feedback,
 )
 
 # =========================
@@ -55,6 +61,9 @@ class ResultadoIntento:
     estado_partida: str
     intentos_restantes: int
 
+    # La secreta de la partida (para revelarla sin volver a consultar)
+    pelicula_secreta: Pelicula | None = None
+
 
 # =========================
 # Utilidades
@@ -65,6 +74,35 @@ def _norm(s: str | None) -> str:
     return s.strip().lower()
 
 
+@dataclass(frozen=True)
+class PerfilPelicula:
+    """Atributos de texto ya normalizados (lo que comparan géneros/director/actores)."""
+
+    generos: frozenset[str]
+    actores: frozenset[str]
+    director: str
+
+
+# Memo por contenido crudo: si la película cambia, cambia la clave
+_perfiles: dict[tuple[str, str, str], PerfilPelicula] = {}
+_MAX_PERFILES = 50_000
+
+
+def perfil_pelicula(peli: Pelicula) -> PerfilPelicula:
+    key = (peli.genero, peli.actores, peli.director)
+    perfil = _perfiles.get(key)
+    if perfil is None:
+        if len(_perfiles) >= _MAX_PERFILES:
+            _perfiles.clear()
+        perfil = PerfilPelicula(
+            generos=frozenset(_norm(x) for x in peli.lista_generos()),
+            actores=frozenset(_norm(x) for x in peli.lista_actores()),
+            director=_norm(peli.director),
+        )
+        _perfiles[key] = perfil
+    return perfil
+
+
 def _arrow(a: int | float | None, b: int | float | None) -> str:
     # retorna "UP" si debes SUBIR para llegar a b, "DOWN" si debes BAJAR
     if a is None or b is None:
@@ -87,21 +125,82 @@ def _band_color(diff: float, band: float) -> ColorCategoria:
 # =========================
 # Selección de la película (admin)
 # =========================
-def seleccionar_pelicula_diaria(fecha: date | None = None) -> Pelicula:
-    """
-    Devuelve la película que el ADMIN fijó para la fecha.
-    Si hoy no hay, usa la última seleccionada para no bloquear el juego.
-    """
-    fecha = fecha or timezone.localdate()
+# La película del día es el dato más leído del juego: se memoriza por fecha
+# en el proceso y en la caché compartida de Django hasta la medianoche local.
+# Una versión global (en la caché compartida) permite invalidar todo de golpe.
+DIARIA_VERSION_KEY = "movidle:diaria:version"
+_diaria_local: dict[date, tuple[int, datetime, Pelicula]] = {}
+_MAX_DIARIAS_LOCAL = 64  # hoy y mañana + fechas sueltas (repeticiones, panel)
+
+
+def fin_del_dia(fecha: date) -> datetime:
+    """Medianoche local (según TIME_ZONE) al terminar `fecha`."""
+    return timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+
+
+def _version_diaria() -> int:
+    version = cache.get(DIARIA_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(DIARIA_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def invalidar_pelicula_diaria() -> None:
+    """Descarta la película del día memorizada (en este y en los demás procesos)."""
+    try:
+        cache.incr(DIARIA_VERSION_KEY)
+    except ValueError:
+        cache.set(DIARIA_VERSION_KEY, 2, timeout=None)
+    _diaria_local.clear()
+
+
+def _pelicula_diaria_bd(fecha: date) -> Pelicula:
     sel = PeliculaDelDia.objects.filter(fecha=fecha).select_related("pelicula").first()
     if sel:
         return sel.pelicula
-    last = PeliculaDelDia.objects.order_by("-fecha").select_related("pelicula").first()
+    # Con días ya programados a futuro, la "última" es la más reciente hasta
+    # hoy; nunca una futura (revelaría un puzzle que aún no ha salido)
+    previas = PeliculaDelDia.objects.filter(fecha__lte=fecha)
+    last = previas.order_by("-fecha").select_related("pelicula").first()
     if last:
         return last.pelicula
     raise RuntimeError("El administrador debe seleccionar una película en el panel.")
 
 
+def seleccionar_pelicula_diaria(fecha: date | None = None) -> Pelicula:
+    """
+    Devuelve la película que el ADMIN fijó para la fecha.
+    Si hoy no hay, usa la última seleccionada para no bloquear el juego.
+    El resultado queda memorizado hasta la medianoche local o hasta que se
+    llame a invalidar_pelicula_diaria().
+    """
+    fecha = fecha or timezone.localdate()
+    ahora = timezone.now()
+    version = _version_diaria()
+
+    local = _diaria_local.get(fecha)
+    if local and local[0] == version and local[1] > ahora:
+        return local[2]
+
+    # Fechas pasadas: caché corta (su selección ya no cambia sola)
+    expira = max(fin_del_dia(fecha), ahora + timedelta(seconds=60))
+    key = f"movidle:diaria:{version}:{fecha.isoformat()}"
+    peli = cache.get(key)
+    if peli is None:
+        peli = _pelicula_diaria_bd(fecha)
+        cache.set(key, peli, timeout=int((expira - ahora).total_seconds()))
+
+    if len(_diaria_local) >= _MAX_DIARIAS_LOCAL:
+        # Se descartan las caducadas; si aun así está lleno, se vacía
+        for f in [f for f, (_, exp, _) in _diaria_local.items() if exp <= ahora]:
+            del _diaria_local[f]
+        if len(_diaria_local) >= _MAX_DIARIAS_LOCAL:
+            _diaria_local.clear()
+    _diaria_local[fecha] = (version, expira, peli)
+    return peli
+
+
 # =========================
 # Comparadores (7 bloques)
 # =========================
@@ -119,20 +218,21 @@ def _color_popularidad_por_votos(
     return color, _arrow(va, vb)
 
 
-def _color_generos(adiv: Pelicula, sec: Pelicula) -> ColorCategoria:
-    a = set(_norm(x) for x in adiv.lista_generos())
-    b = set(_norm(x) for x in sec.lista_generos())
-
+def _color_conjuntos(a: frozenset[str], b: frozenset[str]) -> ColorCategoria:
     inter = a & b
     if not inter:
         return ColorCategoria.GRIS
-    # VERDE solo si TODOS los géneros coinciden (conjuntos iguales)
+    # VERDE solo si TODOS coinciden (conjuntos iguales)
     if a == b:
         return ColorCategoria.VERDE
     # Comparten al menos uno pero no todos -> AMARILLO
     return ColorCategoria.AMARILLO
 
 
+def _color_generos(adiv: Pelicula, sec: Pelicula) -> ColorCategoria:
+    return _color_conjuntos(perfil_pelicula(adiv).generos, perfil_pelicula(sec).generos)
+
+
 def _color_duracion(adiv: Pelicula, sec: Pelicula) -> tuple[ColorCategoria, str]:
     da = adiv.duracion_min or 0
     db = sec.duracion_min or 0
@@ -143,26 +243,22 @@ def _color_duracion(adiv: Pelicula, sec: Pelicula) -> tuple[ColorCategoria, str]
 def _color_director(adiv: Pelicula, sec: Pelicula) -> ColorCategoria:
     return (
         ColorCategoria.VERDE
-        if _norm(adiv.director) == _norm(sec.director)
+        if perfil_pelicula(adiv).director == perfil_pelicula(sec).director
         else ColorCategoria.GRIS
     )
 
 
 def _color_actores(adiv: Pelicula, sec: Pelicula) -> ColorCategoria:
-    a = set(_norm(x) for x in adiv.lista_actores())
-    b = set(_norm(x) for x in sec.lista_actores())
-
-    inter = a & b
-    if not inter:
-        return ColorCategoria.GRIS
-    if a == b:
-        return ColorCategoria.VERDE
-    return ColorCategoria.AMARILLO
+    return _color_conjuntos(perfil_pelicula(adiv).actores, perfil_pelicula(sec).actores)
 
 
 def _color_rating(adiv: Pelicula, sec: Pelicula) -> ColorCategoria:
     ra = float(adiv.imdb_rating) if adiv.imdb_rating is not None else None
     rb = float(sec.imdb_rating) if sec.imdb_rating is not None else None
+    return _color_rating_valores(ra, rb)
+
+
+def _color_rating_valores(ra: float | None, rb: float | None) -> ColorCategoria:
     if ra is None or rb is None:
         return ColorCategoria.GRIS
     if abs(ra - rb) == 0:
@@ -175,18 +271,101 @@ def _color_rating(adiv: Pelicula, sec: Pelicula) -> ColorCategoria:
 # =========================
 # Registrar intento
 # =========================
-@transaction.atomic
+# Serialización por jugador dentro del proceso (doble clic, dos pestañas).
+# Entre procesos la garantiza el SELECT ... FOR UPDATE sobre el Jugador.
+_LOCKS_JUGADOR = [threading.Lock() for _ in range(64)]
+
+
+def _lock_jugador(jugador_id: int) -> threading.Lock:
+    return _LOCKS_JUGADOR[jugador_id % len(_LOCKS_JUGADOR)]
+
+
+def obtener_partida(jugador: Jugador, fecha: date, secreta: Pelicula) -> Partida:
+    """
+    get_or_create de la partida del día tolerante a inserciones concurrentes:
+    si otra petición la creó entre medias, se recupera la existente.
+    """
+    partida = (
+        Partida.objects.filter(jugador=jugador, fecha=fecha)
+        .select_related("pelicula_secreta")
+        .first()
+    )
+    if partida is not None:
+        return partida
+    try:
+        with transaction.atomic():
+            return Partida.objects.create(
+                jugador=jugador,
+                fecha=fecha,
+                pelicula_secreta=secreta,
+                intentos_maximos=MAX_INTENTOS,
+            )
+    except IntegrityError:
+        return Partida.objects.select_related("pelicula_secreta").get(
+            jugador=jugador, fecha=fecha
+        )
+
+
+def resultado_desde_patron(
+    patron: tuple,
+    *,
+    intento_id: int,
+    numero_intento: int,
+    intentos_maximos: int,
+    estado: str,
+    secreta: Pelicula | None = None,
+) -> ResultadoIntento:
+    """ResultadoIntento a partir de CatalogoCompilado.patron (modos archivo y práctica)."""
+    cA, aA, cP, aP, cG, cD, aD, cDir, cAct, cR, es_ok = patron
+    return ResultadoIntento(
+        intento_id=intento_id,
+        numero_intento=numero_intento,
+        color_anio=cA,
+        arrow_anio=aA,
+        color_popularidad=cP,
+        arrow_popularidad=aP,
+        color_genero=cG,
+        color_duracion=cD,
+        arrow_duracion=aD,
+        color_direccion=cDir,
+        color_actores=cAct,
+        color_rating=cR,
+        es_correcto=es_ok,
+        estado_partida=estado,
+        intentos_restantes=max(0, intentos_maximos - numero_intento),
+        pelicula_secreta=secreta,
+    )
+
+
 def registrar_intento(
     jugador: Jugador, pelicula_adivinada: Pelicula
 ) -> ResultadoIntento:
+    with medir("registrar_intento"), _lock_jugador(jugador.pk):
+        return _registrar_intento(jugador, pelicula_adivinada)
+
+
+def _bloquear_jugador(jugador: Jugador) -> None:
+    """Bloqueo de escritura sobre el jugador; de paso refresca sus rachas."""
+    Jugador.objects.filter(pk=jugador.pk).update(racha_actual=F("racha_actual"))
+    jugador.racha_actual, jugador.racha_maxima = Jugador.objects.values_list(
+        "racha_actual", "racha_maxima"
+    ).get(pk=jugador.pk)
+
+
+@transaction.atomic
+def _registrar_intento(
+    jugador: Jugador, pelicula_adivinada: Pelicula
+) -> ResultadoIntento:
+    # Bloquea al jugador: creación de partida y numeración quedan en serie.
+    # SELECT ... FOR UPDATE no existe en SQLite, así que se escribe la fila
+    # (UPDATE sin cambios) como PRIMERA sentencia de la transacción: en SQLite
+    # toma el bloqueo de escritura de la BD (los demás esperan el timeout en
+    # vez de fallar al promocionar una lectura) y en PostgreSQL bloquea la fila.
+    _bloquear_jugador(jugador)
     fecha = timezone.localdate()
     secreta = seleccionar_pelicula_diaria(fecha)
 
-    partida, _ = Partida.objects.get_or_create(
-        jugador=jugador,
-        fecha=fecha,
-        defaults={"pelicula_secreta": secreta, "intentos_maximos": MAX_INTENTOS},
-    )
+    partida = obtener_partida(jugador, fecha, secreta)
 
     # si ya terminó, no permitir más
     if partida.estado != EstadoPartida.EN_CURSO:
@@ -203,10 +382,6 @@ def registrar_intento(
         partida.save(update_fields=["estado"])
         raise ValueError("Se alcanzó el máximo de intentos.")
 
-    intento = Intento.objects.create(
-        partida=partida, pelicula_adivinada=pelicula_adivinada, numero_intento=num
-    )
-
     # Colores y flechas (7 bloques)
     cA, aA = _color_anio(pelicula_adivinada, secreta)
     cP, aP = _color_popularidad_por_votos(pelicula_adivinada, secreta)
@@ -219,26 +394,34 @@ def registrar_intento(
     # Correcto solo si es EXACTAMENTE la película secreta
     es_ok = pelicula_adivinada.id == secreta.id
 
-    # Guardar feedback
-    Feedback.objects.create(
-        intento=intento,
-        color_anio=cA,
-        flecha_anio=aA,
-        color_popularidad=cP,
-        flecha_popularidad=aP,
-        color_genero=cG,
-        color_duracion=cD,
-        flecha_duracion=aD,
-        color_direccion=cDir,
-        color_actores=cAct,
-        color_rating=cR,
-        es_correcto=es_ok,
+    # Intento con su feedback empaquetado: un único INSERT
+    intento = Intento.objects.create(
+        partida=partida,
+        pelicula_adivinada=pelicula_adivinada,
+        numero_intento=num,
+        feedback_code=codificar_feedback(
+            color_anio=cA,
+            flecha_anio=aA,
+            color_popularidad=cP,
+            flecha_popularidad=aP,
+            color_genero=cG,
+            color_duracion=cD,
+            flecha_duracion=aD,
+            color_direccion=cDir,
+            color_actores=cAct,
+            color_rating=cR,
+            es_correcto=es_ok,
+        ),
     )
 
     # Actualizar estado y rachas
     if es_ok:
         partida.estado = EstadoPartida.GANADA
-        jugador.racha_actual += 1
+        # La racha sigue solo si ayer también ganó (un día sin jugar la corta)
+        if jugador.racha_actual and gano_el_dia(jugador.pk, fecha - timedelta(days=1)):
+            jugador.racha_actual += 1
+        else:
+            jugador.racha_actual = 1
         jugador.racha_maxima = max(jugador.racha_maxima, jugador.racha_actual)
         jugador.save(update_fields=["racha_actual", "racha_maxima"])
     elif num >= partida.intentos_maximos:
@@ -246,7 +429,16 @@ def registrar_intento(
         jugador.racha_actual = 0
         jugador.save(update_fields=["racha_actual"])
 
-    partida.save(update_fields=["estado"])
+    if partida.estado != EstadoPartida.EN_CURSO:
+        partida.intentos_usados = num
+        partida.terminado_en = timezone.now()
+        partida.save(update_fields=["estado", "intentos_usados", "terminado_en"])
+        racha_maxima = jugador.racha_maxima
+        transaction.on_commit(
+            lambda: clasificacion.partida_terminada(partida, racha_maxima)
+        )
+    else:
+        partida.save(update_fields=["estado"])
 
     return ResultadoIntento(
         intento_id=intento.id,
@@ -264,4 +456,5 @@ def registrar_intento(
         es_correcto=es_ok,
         estado_partida=partida.estado,
         intentos_restantes=max(0, partida.intentos_maximos - num),
+        pelicula_secreta=partida.pelicula_secreta,
     )
@@ -0,0 +1,77 @@
+# moviegame/services/home_cache.py
+from __future__ import annotations
+
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import translation
+
+from ..models import Pelicula
+from .catalog_cache import catalog_version
+
+"""
+Grid de "posters famosos" de la home, precalculado y cacheado.
+
+- Un pool con las POOL más conocidas (con poster) por versión de catálogo.
+- ROTACIONES variantes del grid (LIMITE posters cada una) por idioma, ya
+  renderizadas. Cada visita toma una al azar: la página varía sin consultas.
+- Guardar o borrar una Pelicula cambia la versión y con ella todas las claves.
+"""
+
+LIMITE = 12
+POOL = 36
+ROTACIONES = 6
+TIMEOUT = 60 * 60 * 24
+
+
+def pool_famosas() -> list[dict]:
+    key = f"movidle:home:pool:{catalog_version()}"
+    pool = cache.get(key)
+    if pool is None:
+        qs = (
+            Pelicula.objects.filter(
+                ~Q(poster_url__isnull=True),
+                ~Q(poster_url__exact=""),
+                imdb_votes__isnull=False,
+            )
+            .order_by("-imdb_votes", "-imdb_rating")
+            .values_list("titulo", "anio", "poster_url")[:POOL]
+        )
+        pool = [{"title": t, "year": a, "poster_url": p} for t, a, p in qs]
+        cache.set(key, pool, TIMEOUT)
+    return pool
+
+
+def _variante(pool: list[dict], rotacion: int) -> list[dict]:
+    """La rotación 0 son las LIMITE más famosas; el resto, muestras estables del pool."""
+    if rotacion == 0 or len(pool) <= LIMITE:
+        return pool[:LIMITE]
+    idx = sorted(random.Random(rotacion).sample(range(len(pool)), LIMITE))
+    return [pool[i] for i in idx]
+
+
+def grid_famosas(rotacion: int | None = None) -> str:
+    """HTML del grid para el idioma activo (una variante al azar si no se indica)."""
+    if rotacion is None:
+        rotacion = random.randrange(ROTACIONES)
+    idioma = translation.get_language() or settings.LANGUAGE_CODE
+    key = f"movidle:home:grid:{catalog_version()}:{idioma}:{rotacion}"
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            "moviegame/_famous_grid.html",
+            {"famous_movies": _variante(pool_famosas(), rotacion)},
+        )
+        cache.set(key, html, TIMEOUT)
+    return html
+
+
+def precalentar_home() -> None:
+    """Renderiza todas las variantes en todos los idiomas del sitio."""
+    for codigo, _ in settings.LANGUAGES:
+        with translation.override(codigo):
+            for rot in range(ROTACIONES):
+                grid_famosas(rot)
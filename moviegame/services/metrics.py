@@ -0,0 +1,112 @@
+# moviegame/services/metrics.py
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+"""
+Registro de métricas en memoria (por proceso) con histogramas de buckets
+fijos. Se exporta en formato de texto de Prometheus desde /metrics/.
+
+Cada observación es un bisect + dos sumas bajo un lock: unos pocos µs.
+"""
+
+# Buckets (segundos) para tiempos; bytes para tamaños de respuesta
+BUCKETS_TIEMPO = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    __slots__ = ("buckets", "cuentas", "suma", "total")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.cuentas = [0] * (len(buckets) + 1)  # último = +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.cuentas[bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # nombre_metrica -> (buckets, ayuda, nombre_etiqueta, {etiqueta: Histograma})
+        self._metricas: dict[
+            str, tuple[tuple[float, ...], str, str, dict[str, Histograma]]
+        ] = {}
+
+    def definir(
+        self, nombre: str, buckets: tuple[float, ...], ayuda: str, etiqueta: str = "view"
+    ) -> None:
+        self._metricas.setdefault(nombre, (buckets, ayuda, etiqueta, {}))
+
+    def observar(self, nombre: str, etiqueta: str, valor: float) -> None:
+        buckets, _, _, series = self._metricas[nombre]
+        with self._lock:
+            h = series.get(etiqueta)
+            if h is None:
+                h = series[etiqueta] = Histograma(buckets)
+            h.observar(valor)
+
+    def observar_lote(self, etiqueta: str, valores: tuple[tuple[str, float], ...]) -> None:
+        """Varias métricas con la misma etiqueta tomando el lock una sola vez."""
+        with self._lock:
+            for nombre, valor in valores:
+                buckets, _, _, series = self._metricas[nombre]
+                h = series.get(etiqueta)
+                if h is None:
+                    h = series[etiqueta] = Histograma(buckets)
+                h.observar(valor)
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            for *_, series in self._metricas.values():
+                series.clear()
+
+    def exportar(self) -> str:
+        """Texto en formato de exposición de Prometheus (histogramas)."""
+        lineas: list[str] = []
+        with self._lock:
+            for nombre, (buckets, ayuda, clave, series) in sorted(self._metricas.items()):
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} histogram")
+                for etiqueta, h in sorted(series.items()):
+                    lbl = etiqueta.replace("\\", "\\\\").replace('"', '\\"')
+                    acumulado = 0
+                    for le, n in zip(buckets, h.cuentas):
+                        acumulado += n
+                        lineas.append(f'{nombre}_bucket{{{clave}="{lbl}",le="{le}"}} {acumulado}')
+                    lineas.append(f'{nombre}_bucket{{{clave}="{lbl}",le="+Inf"}} {h.total}')
+                    lineas.append(f'{nombre}_sum{{{clave}="{lbl}"}} {h.suma}')
+                    lineas.append(f'{nombre}_count{{{clave}="{lbl}"}} {h.total}')
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+registro.definir("movidle_request_seconds", BUCKETS_TIEMPO, "Tiempo total por vista")
+registro.definir("movidle_db_queries", BUCKETS_CONSULTAS, "Consultas SQL por petición")
+registro.definir("movidle_db_seconds", BUCKETS_TIEMPO, "Tiempo en BD por petición")
+registro.definir("movidle_response_bytes", BUCKETS_BYTES, "Tamaño de la respuesta")
+registro.definir(
+    "movidle_section_seconds",
+    BUCKETS_TIEMPO,
+    "Tiempo dentro de secciones instrumentadas",
+    etiqueta="section",
+)
+
+
+@contextmanager
+def medir(seccion: str):
+    """Mide el bloque como sección (p. ej. 'registrar_intento', 'omdb')."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.observar("movidle_section_seconds", seccion, time.perf_counter() - t0)
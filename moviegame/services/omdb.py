@@ -5,6 +5,8 @@ from decimal import Decimal
 import requests
 from django.conf import settings
 
+from .metrics import medir
+
 BASE_URL = "https://www.omdbapi.com/"
 
 
@@ -26,9 +28,10 @@ class OMDbClient:
 
     def _get(self, params: dict) -> dict:
         params = {"apikey": self.api_key, **params}
-        r = requests.get(BASE_URL, params=params, timeout=self.timeout)
-        r.raise_for_status()
-        data = r.json()
+        with medir("omdb"):
+            r = requests.get(BASE_URL, params=params, timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
         if data.get("Response") == "False":
             # OMDb devuelve "Response: False" y un "Error"
             raise OMDbError(data.get("Error", "OMDb devolvió Response=False"))
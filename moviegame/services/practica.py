@@ -0,0 +1,199 @@
+# moviegame/services/practica.py
+from __future__ import annotations
+
+import random
+import secrets
+import threading
+from dataclasses import dataclass, field
+
+from django.core import signing
+from django.utils.crypto import salted_hmac
+
+from ..models import EstadoPartida, Pelicula
+from . import solver
+from .game_service import MAX_INTENTOS, ResultadoIntento, resultado_desde_patron
+from .scheduler import ReglasProgramacion
+
+"""
+Modo práctica ilimitado y sin estado en el servidor.
+
+La partida viaja en un token firmado (django.core.signing, HMAC con
+SECRET_KEY y marca de tiempo) que guarda el cliente: un nonce, la secreta
+enmascarada y los ids intentados. Cada intento valida el token, calcula el
+feedback con el catálogo compilado del solver y devuelve un token nuevo.
+No se escribe ni se lee nada de la BD por partida.
+
+- La firma impide alterar la secreta o el historial; la máscara
+  (HMAC del nonce) impide leer la secreta del token, que no va cifrado.
+- Reenviar un token anterior "deshace" intentos: en práctica no importa.
+- Las secretas se sortean por votos con el método alias (O(1) por sorteo)
+  entre las películas que podrían ser del día (ReglasProgramacion).
+"""
+
+SALT = "movidle.practica"
+DURACION_SEG = 24 * 3600
+_MASCARA_BYTES = 6
+
+
+class TokenInvalido(ValueError):
+    pass
+
+
+# =========================
+# Muestreo por alias (Vose)
+# =========================
+class Alias:
+    """Muestreo ponderado en O(1) tras una preparación O(n)."""
+
+    def __init__(self, pesos: list[float]):
+        n = len(pesos)
+        total = sum(pesos)
+        escalados = [p * n / total for p in pesos]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        pequenos = [i for i, p in enumerate(escalados) if p < 1.0]
+        grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+        while pequenos and grandes:
+            s, g = pequenos.pop(), grandes.pop()
+            self.prob[s] = escalados[s]
+            self.alias[s] = g
+            escalados[g] -= 1.0 - escalados[s]
+            (pequenos if escalados[g] < 1.0 else grandes).append(g)
+        # Los restantes quedan con prob 1 (errores de redondeo)
+
+    def muestra(self, rnd: random.Random) -> int:
+        i = rnd.randrange(len(self.prob))
+        return i if rnd.random() < self.prob[i] else self.alias[i]
+
+
+# =========================
+# Catálogo de práctica
+# =========================
+_FICHA = (
+    "id", "titulo", "anio", "genero", "director", "actores",
+    "duracion_min", "imdb_rating", "imdb_votes", "poster_url",
+)
+
+
+@dataclass
+class CatalogoPractica:
+    version: int
+    secretas: list[int]  # ids sorteables
+    alias: Alias
+    fichas: dict[int, tuple] = field(repr=False)  # id -> valores de _FICHA
+
+    def pelicula(self, pid: int) -> Pelicula:
+        """Pelicula sin guardar (no toca la BD) para pintar valores y revelación."""
+        return Pelicula(**dict(zip(_FICHA, self.fichas[pid])))
+
+
+_catalogo: CatalogoPractica | None = None
+_lock = threading.Lock()
+
+
+def _compilar(version: int) -> CatalogoPractica:
+    reglas = ReglasProgramacion.desde_settings()
+    fichas = {f[0]: f for f in Pelicula.objects.values_list(*_FICHA)}
+    candidatas = [
+        (pid, f[8]) for pid, f in fichas.items()
+        if f[7] is not None and (f[8] or 0) >= reglas.min_votos
+    ] or [(pid, f[8]) for pid, f in fichas.items()]
+    return CatalogoPractica(
+        version=version,
+        secretas=[pid for pid, _ in candidatas],
+        alias=Alias([(v or 0) + 1 for _, v in candidatas]),
+        fichas=fichas,
+    )
+
+
+def catalogo_practica() -> CatalogoPractica:
+    """Se compila una vez por versión del catálogo (como solver.catalogo)."""
+    global _catalogo
+    version = solver.catalogo().version
+    cat = _catalogo
+    if cat is not None and cat.version == version:
+        return cat
+    with _lock:
+        if _catalogo is None or _catalogo.version != version:
+            _catalogo = _compilar(version)
+        return _catalogo
+
+
+# =========================
+# Token
+# =========================
+@dataclass
+class EstadoPractica:
+    nonce: str
+    secreta_id: int
+    intentos: list[int]
+
+    @property
+    def estado(self) -> str:
+        if self.intentos and self.intentos[-1] == self.secreta_id:
+            return EstadoPartida.GANADA
+        if len(self.intentos) >= MAX_INTENTOS:
+            return EstadoPartida.PERDIDA
+        return EstadoPartida.EN_CURSO
+
+
+def _mascara(nonce: str) -> int:
+    digest = salted_hmac(SALT, nonce, algorithm="sha256").digest()
+    return int.from_bytes(digest[:_MASCARA_BYTES], "big")
+
+
+def firmar(estado: EstadoPractica) -> str:
+    return signing.dumps(
+        {"n": estado.nonce, "s": estado.secreta_id ^ _mascara(estado.nonce), "i": estado.intentos},
+        salt=SALT,
+        compress=True,
+    )
+
+
+def leer(token: str) -> EstadoPractica:
+    try:
+        datos = signing.loads(token, salt=SALT, max_age=DURACION_SEG)
+        return EstadoPractica(datos["n"], datos["s"] ^ _mascara(datos["n"]), list(datos["i"]))
+    except signing.SignatureExpired:
+        raise TokenInvalido("La partida de práctica caducó.")
+    except (signing.BadSignature, KeyError, TypeError):
+        raise TokenInvalido("Token de práctica inválido.")
+
+
+# =========================
+# API
+# =========================
+def nueva_partida(rnd: random.Random | None = None) -> str:
+    """Token de una partida nueva; ValueError si el catálogo está vacío."""
+    cat = catalogo_practica()
+    if not cat.secretas:
+        raise ValueError("No hay películas para practicar.")
+    rnd = rnd or random.SystemRandom()
+    secreta = cat.secretas[cat.alias.muestra(rnd)]
+    return firmar(EstadoPractica(secrets.token_hex(8), secreta, []))
+
+
+def intentar(token: str, pelicula_id: int) -> tuple[ResultadoIntento, str, Pelicula]:
+    """(resultado, token nuevo, película intentada). ValueError si no se puede."""
+    estado = leer(token)
+    if estado.estado != EstadoPartida.EN_CURSO:
+        raise ValueError("La partida de práctica ya terminó.")
+    if pelicula_id in estado.intentos:
+        raise ValueError("Ya intentaste esa película en esta partida.")
+
+    practica = catalogo_practica()
+    cat = solver.catalogo()
+    if pelicula_id not in cat.fila_de or estado.secreta_id not in cat.fila_de:
+        raise ValueError("Película no encontrada")
+    patron = cat.patron(cat.fila_de[pelicula_id], cat.fila_de[estado.secreta_id])
+    estado.intentos.append(pelicula_id)
+    fin = estado.estado
+    res = resultado_desde_patron(
+        patron,
+        intento_id=0,  # sin fila en la BD
+        numero_intento=len(estado.intentos),
+        intentos_maximos=MAX_INTENTOS,
+        estado=fin,
+        secreta=practica.pelicula(estado.secreta_id) if fin != EstadoPartida.EN_CURSO else None,
+    )
+    return res, firmar(estado), practica.pelicula(pelicula_id)
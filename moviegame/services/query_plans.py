@@ -0,0 +1,99 @@
+# moviegame/services/query_plans.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable
+
+from django.db import connections
+from django.db.models import Count, Q, QuerySet
+
+from ..models import EstadoPartida, Intento, Partida, Pelicula, PeliculaDelDia
+
+"""
+Registro de las formas de consulta "calientes" del juego y auditoría de su
+plan de ejecución (EXPLAIN QUERY PLAN en SQLite, EXPLAIN en PostgreSQL).
+Si cambias una de estas consultas en las vistas, actualízala aquí también.
+"""
+
+_HOY = date(2024, 1, 1)  # los valores concretos no cambian el plan
+
+FORMAS: dict[str, Callable[[], QuerySet]] = {
+    # views.api_autocomplete
+    "autocomplete_empieza": lambda: Pelicula.objects.filter(
+        imdb_votes__isnull=False, imdb_rating__isnull=False, titulo__istartswith="a"
+    ).order_by("-imdb_votes").values("id", "titulo", "anio")[:20],
+    # views.home_view
+    "home_famosas": lambda: Pelicula.objects.filter(
+        ~Q(poster_url__isnull=True), ~Q(poster_url__exact=""), imdb_votes__isnull=False
+    ).order_by("-imdb_votes", "-imdb_rating")[:12],
+    # views.api_public_movies
+    "public_movies": lambda: Pelicula.objects.order_by("-imdb_rating")[:20],
+    # views.admin_dashboard
+    "panel_intentos_hoy": lambda: Intento.objects.filter(partida__fecha=_HOY),
+    "panel_partidas_ganadas": lambda: Partida.objects.filter(
+        fecha=_HOY, estado=EstadoPartida.GANADA
+    ),
+    "panel_top_pelis": lambda: Intento.objects.filter(partida__fecha=_HOY)
+    .values("pelicula_adivinada__titulo")
+    .annotate(cnt=Count("id"))
+    .order_by("-cnt")[:10],
+    # services.game_service
+    "pelicula_del_dia": lambda: PeliculaDelDia.objects.filter(fecha=_HOY),
+    "partida_del_dia": lambda: Partida.objects.filter(jugador_id=1, fecha=_HOY),
+    "intento_repetido": lambda: Intento.objects.filter(
+        partida_id=1, pelicula_adivinada_id=1
+    ),
+    "intentos_de_partida": lambda: Intento.objects.filter(partida_id=1)
+    .select_related("pelicula_adivinada")
+    .order_by("numero_intento"),
+    # views.stats_view
+    "stats_partidas": lambda: Partida.objects.filter(
+        jugador_id=1, estado=EstadoPartida.GANADA
+    ),
+    "stats_distribucion": lambda: Intento.objects.correctos()
+    .filter(partida__jugador_id=1)
+    .values("numero_intento")
+    .annotate(cnt=Count("id")),
+}
+
+
+@dataclass
+class Auditoria:
+    nombre: str
+    plan: list[str]
+    escaneos: list[str]
+
+    @property
+    def ok(self) -> bool:
+        return not self.escaneos
+
+
+def _plan(qs: QuerySet) -> list[str]:
+    conn = connections[qs.db]
+    sql, params = qs.query.sql_with_params()
+    with conn.cursor() as cur:
+        if conn.vendor == "sqlite":
+            cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cur.fetchall()]
+        cur.execute("EXPLAIN " + sql, params)
+        return [row[0] for row in cur.fetchall()]
+
+
+def es_escaneo_completo(linea: str) -> bool:
+    """Recorrido de tabla sin índice (SQLite: 'SCAN t'; PostgreSQL: 'Seq Scan')."""
+    if "Seq Scan" in linea:
+        return True
+    if linea.startswith("SCAN "):
+        return "USING" not in linea and "CONSTANT ROW" not in linea
+    return False
+
+
+def auditar(nombres: list[str] | None = None) -> list[Auditoria]:
+    res = []
+    for nombre, forma in FORMAS.items():
+        if nombres and nombre not in nombres:
+            continue
+        plan = _plan(forma())
+        res.append(Auditoria(nombre, plan, [l for l in plan if es_escaneo_completo(l)]))
+    return res
@@ -0,0 +1,137 @@
+# moviegame/services/query_profiler.py
+from __future__ import annotations
+
+import logging
+import re
+import time
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.db import connection
+
+"""
+Perfilador de consultas (opt-in): agrupa el SQL de una petición por plantilla
+normalizada y señala patrones N+1 (la misma plantilla repetida muchas veces)
+y consultas lentas, con el origen en nuestro código.
+
+- En producción/desarrollo: moviegame.middleware.PerfiladorConsultasMiddleware
+  con MOVIDLE_PERFILADOR_CONSULTAS = True.
+- En tests: `with sin_n_mas_1(): ...` falla si aparece un N+1.
+"""
+
+logger = logging.getLogger("moviegame.consultas")
+
+UMBRAL_REPETICIONES = 5  # misma plantilla >= N veces en una petición -> N+1
+UMBRAL_LENTA_MS = 100.0
+
+_APP = Path(__file__).resolve().parent.parent
+_RAIZ = str(_APP.parent)
+# Frames que no cuentan como origen: el propio perfilador y los middlewares
+_EXCLUIDOS = {str(Path(__file__).resolve()), str(_APP / "middleware.py")}
+
+_RE_CADENA = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA_IN = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql: str) -> str:
+    """Plantilla de la consulta: sin literales y con las listas IN colapsadas."""
+    sql = _RE_CADENA.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_LISTA_IN.sub("IN (...)", sql)
+    return _RE_ESPACIOS.sub(" ", sql).strip()
+
+
+def _origen() -> str:
+    """Frame más interno de nuestro código (fuera de site-packages y del perfilador)."""
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        archivo = frame.filename
+        if (
+            archivo.startswith(_RAIZ)
+            and archivo not in _EXCLUIDOS
+            and "site-packages" not in archivo
+        ):
+            return f"{archivo[len(_RAIZ) + 1:]}:{frame.lineno} in {frame.name}"
+    return "<desconocido>"
+
+
+@dataclass
+class Grupo:
+    plantilla: str
+    veces: int = 0
+    ms_total: float = 0.0
+    ms_max: float = 0.0
+    origen: str = ""
+
+
+@dataclass
+class Hallazgo:
+    tipo: str  # "n+1" | "lenta"
+    plantilla: str
+    veces: int
+    ms: float
+    origen: str
+
+    def __str__(self):
+        return f"[{self.tipo}] x{self.veces} {self.ms:.1f}ms @ {self.origen}: {self.plantilla[:200]}"
+
+
+@dataclass
+class PerfilConsultas:
+    umbral_repeticiones: int = UMBRAL_REPETICIONES
+    umbral_lenta_ms: float = UMBRAL_LENTA_MS
+    grupos: dict[str, Grupo] = field(default_factory=dict)
+    lentas: list[Hallazgo] = field(default_factory=list)
+
+    def __call__(self, execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            plantilla = normalizar_sql(sql)
+            g = self.grupos.get(plantilla)
+            if g is None:
+                # El stack solo se captura la primera vez (es lo caro)
+                g = self.grupos[plantilla] = Grupo(plantilla, origen=_origen())
+            g.veces += 1
+            g.ms_total += ms
+            g.ms_max = max(g.ms_max, ms)
+            if ms >= self.umbral_lenta_ms:
+                self.lentas.append(Hallazgo("lenta", plantilla, 1, ms, _origen()))
+
+    @property
+    def total(self) -> int:
+        return sum(g.veces for g in self.grupos.values())
+
+    def hallazgos(self) -> list[Hallazgo]:
+        res = [
+            Hallazgo("n+1", g.plantilla, g.veces, g.ms_total, g.origen)
+            for g in self.grupos.values()
+            if g.veces >= self.umbral_repeticiones
+        ]
+        return res + self.lentas
+
+
+@contextmanager
+def perfilar(conexion=None, **kwargs):
+    perfil = PerfilConsultas(**kwargs)
+    with (conexion or connection).execute_wrapper(perfil):
+        yield perfil
+
+
+@contextmanager
+def sin_n_mas_1(umbral_repeticiones: int = UMBRAL_REPETICIONES, umbral_lenta_ms: float = 1e9):
+    """Aserción para tests: falla si el bloque produce un patrón N+1."""
+    with perfilar(
+        umbral_repeticiones=umbral_repeticiones, umbral_lenta_ms=umbral_lenta_ms
+    ) as perfil:
+        yield perfil
+    hallazgos = perfil.hallazgos()
+    if hallazgos:
+        raise AssertionError(
+            "Consultas problemáticas detectadas:\n  " + "\n  ".join(map(str, hallazgos))
+        )
@@ -0,0 +1,128 @@
+# moviegame/services/rachas.py
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from ..backends import invalidar_usuarios
+from ..models import EstadoPartida, Jugador, Partida
+
+logger = logging.getLogger(__name__)
+
+"""
+Rachas de victorias diarias.
+
+Una racha son días consecutivos con la partida GANADA; la actual es la que
+termina hoy o ayer (la partida de hoy en curso no la rompe todavía). Un día
+sin jugar, sin terminar o perdido la corta.
+
+- registrar_intento la mantiene al ganar/perder (ver gano_el_dia).
+- cerrar_dia: pasada nocturna incremental; un único UPDATE que pone a 0 la
+  racha de quien tenía racha y no ganó ayer (ni ha ganado ya hoy).
+- recalcular_todas: reconstrucción completa desde el historial de Partida,
+  por lotes de jugadores (keyset sobre pk) con memoria acotada. Solo
+  escribe los jugadores cuyo valor cambia.
+
+Las partidas archivadas (services/archivo.py) ya no están en la BD: para
+esos jugadores la racha máxima guardada se conserva si es mayor.
+"""
+
+LOTE = 1000
+
+
+@dataclass
+class InformeRachas:
+    jugadores: int = 0
+    actualizados: int = 0
+
+
+def gano_el_dia(jugador_id: int, fecha: date) -> bool:
+    return Partida.objects.filter(
+        jugador_id=jugador_id, fecha=fecha, estado=EstadoPartida.GANADA
+    ).exists()
+
+
+def calcular(partidas: Iterable[tuple[date, str]], hoy: date) -> tuple[int, int]:
+    """(actual, máxima) a partir de las partidas (fecha, estado) en orden de fecha."""
+    racha = maxima = 0
+    ultima_ganada = None
+    for fecha, estado in partidas:
+        if estado == EstadoPartida.GANADA:
+            seguida = ultima_ganada is not None and fecha - ultima_ganada == timedelta(days=1)
+            racha = racha + 1 if seguida and racha else 1
+            ultima_ganada = fecha
+            maxima = max(maxima, racha)
+        elif estado == EstadoPartida.EN_CURSO and fecha == hoy:
+            continue
+        else:
+            racha = 0
+    if not racha or ultima_ganada < hoy - timedelta(days=1):
+        return 0, maxima
+    return racha, maxima
+
+
+def _lote_jugadores(desde_pk: int, lote: int) -> list[tuple[int, int, int, int | None]]:
+    return list(
+        Jugador.objects.filter(pk__gt=desde_pk)
+        .order_by("pk")
+        .values_list("pk", "racha_actual", "racha_maxima", "resumen_archivado__partidas")[:lote]
+    )
+
+
+def recalcular_todas(hoy: date | None = None, lote: int = LOTE) -> InformeRachas:
+    """Recalcula racha_actual/racha_maxima de todos los jugadores desde Partida."""
+    hoy = hoy or timezone.localdate()
+    informe = InformeRachas()
+    ultimo = 0
+    while jugadores := _lote_jugadores(ultimo, lote):
+        primero, ultimo = jugadores[0][0], jugadores[-1][0]
+        filas = (
+            Partida.objects.filter(jugador_id__gte=primero, jugador_id__lte=ultimo, fecha__lte=hoy)
+            .order_by("jugador_id", "fecha")
+            .values_list("jugador_id", "fecha", "estado")
+        )
+        calculadas = {
+            jid: calcular(((f, e) for _, f, e in grupo), hoy)
+            for jid, grupo in groupby(filas, key=lambda fila: fila[0])
+        }
+        cambiados = []
+        for jid, actual_bd, maxima_bd, archivadas in jugadores:
+            actual, maxima = calculadas.get(jid, (0, 0))
+            if archivadas:
+                maxima = max(maxima, maxima_bd)
+            if (actual, maxima) != (actual_bd, maxima_bd):
+                cambiados.append(Jugador(pk=jid, racha_actual=actual, racha_maxima=maxima))
+        with transaction.atomic():
+            Jugador.objects.bulk_update(cambiados, ["racha_actual", "racha_maxima"])
+        informe.jugadores += len(jugadores)
+        informe.actualizados += len(cambiados)
+    if informe.actualizados:
+        invalidar_usuarios()
+    logger.info("Rachas recalculadas: %d jugadores, %d cambios", informe.jugadores, informe.actualizados)
+    return informe
+
+
+def cerrar_dia(dia: date | None = None) -> int:
+    """
+    Cierre nocturno del día `dia` (por defecto ayer): racha a 0 para quien
+    tenía racha y no ganó ese día. Quien ya ganó el día siguiente conserva la
+    suya (registrar_intento la reinició a 1). Devuelve los jugadores tocados.
+    """
+    dia = dia or timezone.localdate() - timedelta(days=1)
+    ganadas = Partida.objects.filter(jugador=OuterRef("pk"), estado=EstadoPartida.GANADA)
+    cortadas = (
+        Jugador.objects.filter(racha_actual__gt=0)
+        .exclude(Exists(ganadas.filter(fecha=dia)))
+        .exclude(Exists(ganadas.filter(fecha=dia + timedelta(days=1))))
+        .update(racha_actual=0)
+    )
+    if cortadas:
+        invalidar_usuarios()  # el UPDATE no dispara señales
+    return cortadas
@@ -0,0 +1,125 @@
+# moviegame/services/repeticiones.py
+from __future__ import annotations
+
+import threading
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    CAMPOS_FEEDBACK,
+    EstadoPartida,
+    Jugador,
+    Pelicula,
+    PeliculaDelDia,
+    Repeticion,
+    codificar_feedback,
+)
+from . import solver
+from .game_service import (
+    MAX_INTENTOS,
+    ResultadoIntento,
+    _lock_jugador,
+    _version_diaria,
+    resultado_desde_patron,
+)
+from .metrics import medir
+
+"""
+Modo archivo: jugar el puzzle de cualquier día pasado.
+
+- El calendario completo fecha -> secreta se memoriza en el proceso (una
+  consulta) y se invalida con la misma versión que la película del día
+  (señales de PeliculaDelDia).
+- El feedback sale del catálogo compilado del solver (patron), sin cargar
+  la secreta ni tocar los comparadores sobre modelos.
+- Las partidas van a Repeticion/IntentoRepeticion: no tocan Partida, rachas
+  ni clasificaciones, así que no cargan el camino del juego diario.
+"""
+
+_calendario: tuple[int, dict[date, int]] | None = None
+_lock = threading.Lock()
+_NOMBRES = tuple(nombre for nombre, _ in CAMPOS_FEEDBACK)
+
+
+def calendario() -> dict[date, int]:
+    """{fecha: pelicula_id} de todos los días programados."""
+    global _calendario
+    version = _version_diaria()
+    memo = _calendario
+    if memo is not None and memo[0] == version:
+        return memo[1]
+    with _lock:
+        if _calendario is None or _calendario[0] != version:
+            _calendario = (version, dict(PeliculaDelDia.objects.values_list("fecha", "pelicula_id")))
+        return _calendario[1]
+
+
+def fechas_jugables(hoy: date | None = None) -> list[date]:
+    hoy = hoy or timezone.localdate()
+    return sorted(f for f in calendario() if f < hoy)
+
+
+def secreta_de(fecha: date) -> int:
+    """Id de la secreta de un día pasado; ValueError si no se puede repetir."""
+    if fecha >= timezone.localdate():
+        raise ValueError("Solo se pueden repetir días pasados.")
+    pid = calendario().get(fecha)
+    if pid is None:
+        raise ValueError("Ese día no tuvo película.")
+    return pid
+
+
+def registrar_intento_repeticion(
+    jugador: Jugador, fecha: date, pelicula_adivinada: Pelicula
+) -> ResultadoIntento:
+    with medir("registrar_intento_repeticion"), _lock_jugador(jugador.pk):
+        return _registrar(jugador, fecha, pelicula_adivinada)
+
+
+@transaction.atomic
+def _registrar(jugador: Jugador, fecha: date, pelicula_adivinada: Pelicula) -> ResultadoIntento:
+    secreta_id = secreta_de(fecha)
+    rep, _ = Repeticion.objects.select_for_update().get_or_create(
+        jugador=jugador,
+        fecha=fecha,
+        defaults={"pelicula_secreta_id": secreta_id, "intentos_maximos": MAX_INTENTOS},
+    )
+    if rep.estado != EstadoPartida.EN_CURSO:
+        raise ValueError("Ya terminaste ese día.")
+
+    previas = list(rep.intentos.values_list("pelicula_adivinada_id", flat=True))
+    if pelicula_adivinada.id in previas:
+        raise ValueError("Ya intentaste esa película en esta partida.")
+    num = len(previas) + 1
+
+    cat = solver.catalogo()
+    if pelicula_adivinada.id not in cat.fila_de or rep.pelicula_secreta_id not in cat.fila_de:
+        raise ValueError("Película no encontrada")
+    patron = cat.patron(cat.fila_de[pelicula_adivinada.id], cat.fila_de[rep.pelicula_secreta_id])
+    es_ok = patron[-1]
+    intento = rep.intentos.create(
+        pelicula_adivinada=pelicula_adivinada,
+        numero_intento=num,
+        feedback_code=codificar_feedback(es_correcto=es_ok, **dict(zip(_NOMBRES, patron))),
+    )
+
+    if es_ok:
+        rep.estado = EstadoPartida.GANADA
+    elif num >= rep.intentos_maximos:
+        rep.estado = EstadoPartida.PERDIDA
+    secreta = None
+    if rep.estado != EstadoPartida.EN_CURSO:
+        rep.terminado_en = timezone.now()
+        rep.save(update_fields=["estado", "terminado_en"])
+        secreta = pelicula_adivinada if es_ok else Pelicula.objects.get(pk=rep.pelicula_secreta_id)
+
+    return resultado_desde_patron(
+        patron,
+        intento_id=intento.id,
+        numero_intento=num,
+        intentos_maximos=rep.intentos_maximos,
+        estado=rep.estado,
+        secreta=secreta,
+    )
@@ -0,0 +1,183 @@
+# moviegame/services/scheduler.py
+from __future__ import annotations
+
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from ..models import Pelicula, PeliculaDelDia
+from .catalog_cache import peliculas_en_lote
+from .home_cache import precalentar_home
+from .game_service import (
+    fin_del_dia,
+    perfil_pelicula,
+    seleccionar_pelicula_diaria,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# Reglas de programación
+# =========================
+@dataclass
+class ReglasProgramacion:
+    dias: int = 7  # ventana rodante hacia adelante (incluye hoy)
+    sin_repetir_dias: int = 365  # una película no se repite dentro de este margen
+    min_votos: int = 50_000  # solo películas conocidas
+    top: int = 1_000  # pool: las N más votadas que cumplan lo anterior
+
+    @classmethod
+    def desde_settings(cls) -> "ReglasProgramacion":
+        return cls(**getattr(settings, "MOVIDLE_PROGRAMACION", {}))
+
+
+def _candidatas(reglas: ReglasProgramacion) -> list[tuple[int, int]]:
+    """[(pelicula_id, votos)] jugables, de más a menos votadas."""
+    return list(
+        Pelicula.objects.filter(
+            imdb_votes__gte=reglas.min_votos, imdb_rating__isnull=False
+        )
+        .order_by("-imdb_votes")
+        .values_list("id", "imdb_votes")[: reglas.top]
+    )
+
+
+def planificar_dias(
+    desde: date | None = None, reglas: ReglasProgramacion | None = None
+) -> list[PeliculaDelDia]:
+    """
+    Rellena las fechas sin PeliculaDelDia en [desde, desde + dias).
+    Nunca toca las fechas que ya fijó un admin. La elección se pondera por
+    votos y es determinística por fecha (reejecutar da el mismo calendario).
+    """
+    reglas = reglas or ReglasProgramacion.desde_settings()
+    desde = desde or timezone.localdate()
+    hasta = desde + timedelta(days=reglas.dias - 1)
+    margen = timedelta(days=reglas.sin_repetir_dias)
+
+    candidatas = _candidatas(reglas)
+    if not candidatas:
+        logger.warning("Programador: no hay películas que cumplan las reglas.")
+        return []
+
+    usadas: dict[int, list[date]] = {}
+    ocupadas: set[date] = set()
+    for pid, f in PeliculaDelDia.objects.filter(
+        fecha__gte=desde - margen, fecha__lte=hasta + margen
+    ).values_list("pelicula_id", "fecha"):
+        usadas.setdefault(pid, []).append(f)
+        ocupadas.add(f)
+
+    creadas: list[PeliculaDelDia] = []
+    fecha = desde
+    while fecha <= hasta:
+        if fecha not in ocupadas:
+            libres = [
+                (pid, votos)
+                for pid, votos in candidatas
+                if all(abs(f - fecha) > margen for f in usadas.get(pid, ()))
+            ]
+            if not libres:
+                logger.warning("Programador: sin candidatas libres para %s", fecha)
+                break
+            rnd = random.Random(fecha.toordinal())
+            pid = rnd.choices(
+                [p for p, _ in libres], weights=[v for _, v in libres], k=1
+            )[0]
+            try:
+                with transaction.atomic():
+                    creadas.append(
+                        PeliculaDelDia.objects.create(fecha=fecha, pelicula_id=pid)
+                    )
+            except IntegrityError:
+                # Otro proceso (o un admin) la fijó entre medias
+                pass
+            usadas.setdefault(pid, []).append(fecha)
+        fecha += timedelta(days=1)
+    return creadas
+
+
+# =========================
+# Precalentado
+# =========================
+def precalentar(fecha: date) -> Pelicula | None:
+    """
+    Deja listas las cachés de `fecha`: la película secreta (memo local y
+    caché compartida), su perfil normalizado y su JSON en la caché de catálogo,
+    además del grid de la home.
+    """
+    precalentar_home()
+    try:
+        secreta = seleccionar_pelicula_diaria(fecha)
+    except RuntimeError:
+        return None
+    perfil_pelicula(secreta)
+    peliculas_en_lote([secreta.id])
+    return secreta
+
+
+# =========================
+# Temporizador en proceso (opcional)
+# =========================
+# Se activa con MOVIDLE_PROGRAMADOR_AUTOMATICO = True y solo arranca en los
+# procesos del servidor (wsgi.py/asgi.py), no en los comandos. Unos minutos
+# antes de la medianoche local planifica la ventana y precalienta el día
+# siguiente. Alternativa sin temporizador: schedule_daily desde cron.
+_timer: threading.Timer | None = None
+_timer_lock = threading.Lock()
+
+
+def _proxima_ejecucion(ahora: datetime, minutos_antes: int) -> datetime:
+    hoy = timezone.localdate(ahora)
+    objetivo = fin_del_dia(hoy) - timedelta(minutes=minutos_antes)
+    if objetivo <= ahora:
+        objetivo = fin_del_dia(hoy + timedelta(days=1)) - timedelta(
+            minutes=minutos_antes
+        )
+    return objetivo
+
+
+def _tick() -> None:
+    try:
+        manana = timezone.localdate() + timedelta(days=1)
+        planificar_dias(desde=manana)
+        precalentar(manana)
+    except Exception:
+        logger.exception("Programador: fallo planificando/precalentando")
+    finally:
+        close_old_connections()
+        iniciar_programador()
+
+
+def iniciar_programador() -> None:
+    global _timer
+    minutos = getattr(settings, "MOVIDLE_PROGRAMADOR_MINUTOS_ANTES", 5)
+    ahora = timezone.now()
+    espera = (_proxima_ejecucion(ahora, minutos) - ahora).total_seconds()
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(espera, _tick)
+        _timer.daemon = True
+        _timer.start()
+
+
+def arrancar_si_procede() -> None:
+    """Desde wsgi.py/asgi.py: inicia el temporizador si está activado en settings."""
+    if getattr(settings, "MOVIDLE_PROGRAMADOR_AUTOMATICO", False):
+        iniciar_programador()
+
+
+def detener_programador() -> None:
+    global _timer
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
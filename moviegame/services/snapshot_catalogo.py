@@ -0,0 +1,389 @@
+# moviegame/services/snapshot_catalogo.py
+from __future__ import annotations
+
+import heapq
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+from ..models import Pelicula
+from .catalog_cache import acatalog_version, catalog_version
+from .game_service import perfil_pelicula
+
+"""
+Catálogo compilado a un fichero binario que los procesos mapean (mmap) en
+solo lectura.
+
+Con muchos workers (gunicorn/uvicorn) cada uno compilaba su propia copia del
+catálogo desde la BD al arrancar y tras cada cambio. Aquí se compila una vez
+(comando compilar_catalogo) a un fichero versionado con:
+
+- columnas numéricas (ids, año, votos, duración, rating en décimas),
+- textos como tabla de offsets + blob UTF-8 (títulos, y géneros, actores y
+  director ya normalizados como en game_service),
+- órdenes precalculados de los índices de rango del solver,
+- tablas de búsqueda del autocompletar: jugables por votos y sus títulos en
+  minúsculas ordenados (prefijo por bisección, "contiene" con mmap.find).
+
+Las columnas se leen como memoryview sobre el mmap: las páginas son del
+fichero y las comparten todos los procesos; arrancar es abrir y mapear.
+Publicar es escribir a un temporal y os.replace: los procesos notan el
+cambio de inodo en el siguiente acceso y mapean el nuevo; el viejo se libera
+cuando nadie lo usa. Solo se usa si su versión coincide con
+catalog_version(); si no, todo sigue yendo a la BD como antes.
+"""
+
+logger = logging.getLogger(__name__)
+
+MAGIA = b"MVDCAT\x00\x01"
+FORMATO = 1
+SEP = "\x1f"  # separador de elementos en géneros y actores
+_ORDEN = 1 if sys.byteorder == "little" else 2  # columnas en el orden nativo
+# magia, formato, orden de bytes, nº películas, versión del catálogo, compilado en, nº secciones
+_CABECERA = struct.Struct("<8sHHIQdI")
+_ENTRADA = struct.Struct("<24sQQ")  # nombre, offset, longitud
+_ALINEACION = 8
+
+_NUMERICAS = {
+    "ids": "q",
+    "anios": "i",
+    "votos": "i",
+    "duraciones": "i",
+    "ratings": "h",  # décimas; -1 = sin rating
+    "orden_anios": "I",
+    "valores_anios": "i",
+    "orden_votos": "I",
+    "valores_votos": "i",
+    "orden_duraciones": "I",
+    "valores_duraciones": "i",
+    "jugables": "I",  # filas con votos y rating, más votadas primero
+    "por_titulo": "I",  # posiciones de `jugables` por título en minúsculas
+}
+_TEXTOS = ("titulos", "generos", "actores", "directores", "busqueda")
+
+
+class SnapshotInvalido(ValueError):
+    pass
+
+
+def ruta_snapshot() -> Path | None:
+    ruta = getattr(settings, "MOVIDLE_CATALOGO_SNAPSHOT", None)
+    return Path(ruta) if ruta else None
+
+
+# =========================
+# Columnas sobre el mmap
+# =========================
+class ColumnaTexto:
+    """Secuencia de str decodificados al vuelo desde offsets + blob."""
+
+    __slots__ = ("_off", "_txt")
+
+    def __init__(self, off: memoryview, txt: memoryview):
+        self._off = off
+        self._txt = txt
+
+    def __len__(self) -> int:
+        return len(self._off) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._txt[self._off[i] : self._off[i + 1]], "utf-8")
+
+
+class ColumnaRating:
+    """Ratings como float o None (mismo valor que float(Decimal))."""
+
+    __slots__ = ("_decimas",)
+
+    def __init__(self, decimas: memoryview):
+        self._decimas = decimas
+
+    def __len__(self) -> int:
+        return len(self._decimas)
+
+    def __getitem__(self, i: int) -> float | None:
+        v = self._decimas[i]
+        return None if v < 0 else v / 10
+
+
+class _Permutada:
+    """texto[orden[k]]: claves ordenadas para bisect sin materializarlas."""
+
+    __slots__ = ("_texto", "_orden")
+
+    def __init__(self, texto: ColumnaTexto, orden: memoryview):
+        self._texto = texto
+        self._orden = orden
+
+    def __len__(self) -> int:
+        return len(self._orden)
+
+    def __getitem__(self, k: int) -> str:
+        return self._texto[self._orden[k]]
+
+
+class SnapshotCatalogo:
+    def __init__(self, ruta: Path):
+        with open(ruta, "rb") as fh:
+            st = os.fstat(fh.fileno())
+            self.mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.ruta = ruta
+        self.identidad = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        try:
+            magia, formato, orden, self.n, self.version, self.compilado_en, nsec = (
+                _CABECERA.unpack_from(self.mm, 0)
+            )
+        except struct.error:
+            raise SnapshotInvalido(f"{ruta}: cabecera incompleta")
+        if magia != MAGIA or formato != FORMATO or orden != _ORDEN:
+            raise SnapshotInvalido(f"{ruta}: formato no soportado")
+
+        vista = memoryview(self.mm)
+        secciones: dict[str, memoryview] = {}
+        offsets: dict[str, int] = {}
+        for k in range(nsec):
+            nombre, off, largo = _ENTRADA.unpack_from(self.mm, _CABECERA.size + k * _ENTRADA.size)
+            if off + largo > len(self.mm):
+                raise SnapshotInvalido(f"{ruta}: fichero truncado")
+            nombre = nombre.rstrip(b"\0").decode("ascii")
+            secciones[nombre] = vista[off : off + largo]
+            offsets[nombre] = off
+        try:
+            self.columnas = {n: secciones[n].cast(t) for n, t in _NUMERICAS.items()}
+            self.textos = {
+                n: ColumnaTexto(secciones[n + ".off"].cast("I"), secciones[n + ".txt"])
+                for n in _TEXTOS
+            }
+            self._busqueda_base = offsets["busqueda.txt"]  # para mmap.find
+        except KeyError as e:
+            raise SnapshotInvalido(f"{ruta}: falta la sección {e}")
+
+        self.ids = self.columnas["ids"]
+        self.anios = self.columnas["anios"]
+        self.votos = self.columnas["votos"]
+        self.duraciones = self.columnas["duraciones"]
+        self.ratings = ColumnaRating(self.columnas["ratings"])
+        self.titulos = self.textos["titulos"]
+
+    def lista(self, texto: str, i: int) -> list[str]:
+        valor = self.textos[texto][i]
+        return valor.split(SEP) if valor else []
+
+    # ---------- autocompletar ----------
+    def buscar(self, q: str, limite: int) -> list[dict]:
+        """
+        Mismo contrato que el autocompletar sobre la BD: primero títulos que
+        empiezan por q, luego los que lo contienen, más votados primero.
+        """
+        q = q.lower()
+        if not q or limite <= 0:
+            return []
+        busqueda, jugables = self.textos["busqueda"], self.columnas["jugables"]
+        por_titulo = self.columnas["por_titulo"]
+        claves = _Permutada(busqueda, por_titulo)
+        lo = bisect_left(claves, q)
+        hi = bisect_left(claves, q + "\U0010ffff", lo)
+        # `jugables` ya va por votos: la posición más baja es la más votada
+        posiciones = heapq.nsmallest(limite, por_titulo[lo:hi])
+
+        if len(posiciones) < limite:
+            vistas = set(posiciones)
+            aguja = q.encode("utf-8")
+            offsets, base = busqueda._off, self._busqueda_base
+            fin = base + offsets[len(offsets) - 1]
+            pos = self.mm.find(aguja, base, fin)
+            while pos != -1 and len(posiciones) < limite:
+                k = bisect_right(offsets, pos - base) - 1
+                siguiente = base + offsets[k + 1]
+                if pos + len(aguja) <= siguiente:
+                    if k not in vistas:
+                        posiciones.append(k)
+                    pos = self.mm.find(aguja, siguiente, fin)
+                else:  # cruza al título siguiente: seguir dentro de él
+                    pos = self.mm.find(aguja, pos + 1, fin)
+
+        filas = [jugables[k] for k in posiciones]
+        return [{"id": self.ids[i], "titulo": self.titulos[i], "anio": self.anios[i]} for i in filas]
+
+
+# =========================
+# Compilación y publicación
+# =========================
+@dataclass
+class InformeSnapshot:
+    ruta: Path
+    version: int
+    peliculas: int
+    jugables: int
+    bytes: int
+    segundos: float
+
+
+def _alinear(pos: int) -> int:
+    return -(-pos // _ALINEACION) * _ALINEACION
+
+
+def _secciones(filas: list[Pelicula]) -> dict[str, bytes]:
+    n = len(filas)
+    perfiles = [perfil_pelicula(p) for p in filas]
+    col = {
+        "ids": [p.id for p in filas],
+        "anios": [p.anio for p in filas],
+        # Mismas conversiones que CatalogoCompilado
+        "votos": [p.imdb_votes or 0 for p in filas],
+        "duraciones": [p.duracion_min or 0 for p in filas],
+        "ratings": [-1 if p.imdb_rating is None else int(p.imdb_rating * 10) for p in filas],
+    }
+    for nombre in ("anios", "votos", "duraciones"):
+        orden = sorted(range(n), key=col[nombre].__getitem__)  # igual que IndiceRango
+        col[f"orden_{nombre}"] = orden
+        col[f"valores_{nombre}"] = [col[nombre][i] for i in orden]
+    jugables = sorted(
+        (i for i, p in enumerate(filas) if p.imdb_votes is not None and p.imdb_rating is not None),
+        key=lambda i: -col["votos"][i],
+    )
+    busqueda = [filas[i].titulo.lower() for i in jugables]
+    col["jugables"] = jugables
+    col["por_titulo"] = sorted(range(len(jugables)), key=busqueda.__getitem__)
+
+    textos = {
+        "titulos": [p.titulo for p in filas],
+        "generos": [SEP.join(sorted(pf.generos)) for pf in perfiles],
+        "actores": [SEP.join(sorted(pf.actores)) for pf in perfiles],
+        "directores": [pf.director for pf in perfiles],
+        "busqueda": busqueda,
+    }
+    secciones = {nombre: array(t, col[nombre]).tobytes() for nombre, t in _NUMERICAS.items()}
+    for nombre, valores in textos.items():
+        datos = [v.encode("utf-8") for v in valores]
+        offsets, acumulado = array("I", [0]), 0
+        for d in datos:
+            acumulado += len(d)
+            offsets.append(acumulado)
+        secciones[nombre + ".off"] = offsets.tobytes()
+        secciones[nombre + ".txt"] = b"".join(datos)
+    return secciones
+
+
+def _publicar(ruta: Path, n: int, version: int, secciones: dict[str, bytes]) -> int:
+    """Escribe a un temporal, fsync y os.replace (atómico para los lectores)."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+    pos = _CABECERA.size + _ENTRADA.size * len(secciones)
+    entradas = []
+    for nombre, datos in secciones.items():
+        pos = _alinear(pos)
+        entradas.append(_ENTRADA.pack(nombre.encode("ascii"), pos, len(datos)))
+        pos += len(datos)
+    try:
+        with open(tmp, "wb") as fh:
+            fh.write(_CABECERA.pack(MAGIA, FORMATO, _ORDEN, n, version, time.time(), len(secciones)))
+            fh.write(b"".join(entradas))
+            for datos in secciones.values():
+                fh.write(b"\0" * (_alinear(fh.tell()) - fh.tell()))
+                fh.write(datos)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, ruta)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return pos
+
+
+def compilar(ruta: Path | None = None) -> InformeSnapshot:
+    global _revisado
+    ruta = ruta or ruta_snapshot()
+    if ruta is None:
+        raise ValueError("MOVIDLE_CATALOGO_SNAPSHOT no está configurado.")
+    inicio = time.perf_counter()
+    # La versión se lee antes: si el catálogo cambia durante la compilación,
+    # el snapshot queda como antiguo y nadie lo usa.
+    version = catalog_version()
+    filas = list(
+        Pelicula.objects.order_by("id").only(
+            "id", "titulo", "anio", "genero", "director", "actores",
+            "duracion_min", "imdb_rating", "imdb_votes",
+        )
+    )
+    secciones = _secciones(filas)
+    tam = _publicar(Path(ruta), len(filas), version, secciones)
+    _revisado = 0.0  # este proceso lo ve ya, sin esperar a REVISAR_SEG
+    informe = InformeSnapshot(
+        ruta=Path(ruta),
+        version=version,
+        peliculas=len(filas),
+        jugables=len(secciones["jugables"]) // 4,
+        bytes=tam,
+        segundos=round(time.perf_counter() - inicio, 3),
+    )
+    logger.info("Catálogo compilado: %s", informe)
+    return informe
+
+
+# =========================
+# Acceso desde los procesos
+# =========================
+REVISAR_SEG = 1.0  # cada cuánto se comprueba si hay un fichero nuevo
+
+_actual: SnapshotCatalogo | None = None
+_revisado = 0.0
+_lock = threading.Lock()
+
+
+def cargar() -> SnapshotCatalogo | None:
+    """
+    Snapshot publicado; se remapea si cambió el fichero. El stat se hace como
+    mucho cada REVISAR_SEG, así que es barato también desde vistas async.
+    """
+    global _actual, _revisado
+    ruta = ruta_snapshot()
+    if ruta is None:
+        return None
+    snap = _actual
+    ahora = time.monotonic()
+    if snap is not None and snap.ruta == ruta and ahora - _revisado < REVISAR_SEG:
+        return snap
+    try:
+        st = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    _revisado = ahora
+    identidad = (st.st_dev, st.st_ino, st.st_mtime_ns)
+    snap = _actual
+    if snap is not None and snap.ruta == ruta and snap.identidad == identidad:
+        return snap
+    with _lock:
+        if _actual is None or _actual.ruta != ruta or _actual.identidad != identidad:
+            try:
+                _actual = SnapshotCatalogo(ruta)
+            except (OSError, ValueError) as e:
+                logger.warning("Snapshot del catálogo ignorado: %s", e)
+                return None
+        return _actual
+
+
+def vigente(version: int | None = None) -> SnapshotCatalogo | None:
+    """Snapshot solo si corresponde a la versión actual del catálogo."""
+    snap = cargar()
+    if snap is None:
+        return None
+    return snap if snap.version == (version if version is not None else catalog_version()) else None
+
+
+async def avigente() -> SnapshotCatalogo | None:
+    """vigente() para vistas async: la versión se lee con la API async de la caché."""
+    snap = cargar()
+    if snap is None:
+        return None
+    return snap if snap.version == await acatalog_version() else None
@@ -0,0 +1,424 @@
+# moviegame/services/solver.py
+from __future__ import annotations
+
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from itertools import compress
+
+from ..models import (
+    ColorCategoria,
+    Feedback,
+    Intento,
+    Partida,
+    Pelicula,
+    decodificar_feedback,
+)
+from . import snapshot_catalogo
+from .catalog_cache import catalog_version
+from .game_service import (
+    DUR_DELTA,
+    MAX_INTENTOS,
+    VOTES_DELTA,
+    YEAR_DELTA,
+    _arrow,
+    _band_color,
+    _color_conjuntos,
+    _color_rating_valores,
+    perfil_pelicula,
+)
+
+"""
+Solver de Movidle: reduce el catálogo a las películas compatibles con todas
+las pistas de una partida y sugiere el siguiente intento por ganancia de
+información esperada.
+
+El catálogo se compila una vez por versión (catalog_version) a columnas
+(listas por atributo) e índices de bitsets: un conjunto de películas es un
+int de Python donde el bit i es la película de la fila i. Cada pista se
+traduce a una máscara (rangos para año/votos/duración, uniones de géneros,
+actores o director) y los candidatos son el AND de todas. Si hay un snapshot
+publicado de la versión actual (snapshot_catalogo), columnas e índices de
+rango se leen del mmap compartido en vez de la BD.
+
+Las reglas son las de game_service (mismas funciones de color y flecha):
+un test comprueba que el patrón que predice el solver coincide con el que
+guarda registrar_intento.
+"""
+
+V, A, G = ColorCategoria.VERDE, ColorCategoria.AMARILLO, ColorCategoria.GRIS
+
+MUESTRA_ENTROPIA = 256  # candidatos usados para estimar la ganancia esperada
+POOL_CANDIDATAS = 24  # candidatas más votadas evaluadas como intento
+POOL_EXPLORACION = 16  # películas populares (no candidatas) evaluadas como sonda
+BLOQUE_RANGO = 16  # cada cuántas posiciones se guarda un prefijo en IndiceRango
+
+
+def _bits(filas) -> int:
+    """Bitset con las filas dadas."""
+    ix = list(filas)
+    if len(ix) < 32:
+        x = 0
+        for i in ix:
+            x |= 1 << i
+        return x
+    # Muchos índices: un bytearray evita crear un int grande por cada bit
+    buf = bytearray((max(ix) >> 3) + 1)
+    for i in ix:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+_A_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def indices(bits: int) -> list[int]:
+    """Índices de los bits a 1 (en orden)."""
+    binario = bin(bits)[:1:-1]  # bit 0 primero
+    if bits.bit_count() * 32 < len(binario):
+        # Disperso: saltar de un 1 al siguiente
+        res, i = [], binario.find("1")
+        while i != -1:
+            res.append(i)
+            i = binario.find("1", i + 1)
+        return res
+    return list(compress(range(len(binario)), binario.encode().translate(_A_BYTES)))
+
+
+class IndiceRango:
+    """Bitset de filas con valor en [lo, hi] usando prefijos cada BLOQUE_RANGO."""
+
+    __slots__ = ("valores", "orden", "prefijos")
+
+    def __init__(self, columna: list[int]):
+        self.orden = sorted(range(len(columna)), key=columna.__getitem__)
+        self.valores = [columna[i] for i in self.orden]
+        self._acumular()
+
+    @classmethod
+    def precalculado(cls, orden, valores) -> IndiceRango:
+        """Con orden y valores ya ordenados (p. ej. vistas del snapshot)."""
+        indice = cls.__new__(cls)
+        indice.orden, indice.valores = orden, valores
+        indice._acumular()
+        return indice
+
+    def _acumular(self) -> None:
+        self.prefijos = [0]
+        acumulado = 0
+        for k, i in enumerate(self.orden, 1):
+            acumulado |= 1 << i
+            if k % BLOQUE_RANGO == 0:
+                self.prefijos.append(acumulado)
+
+    def _prefijo(self, p: int) -> int:
+        """Bitset de las p primeras filas en orden de valor."""
+        b = p // BLOQUE_RANGO
+        x = self.prefijos[b]
+        for i in self.orden[b * BLOQUE_RANGO : p]:
+            x |= 1 << i
+        return x
+
+    def rango(self, lo: float, hi: float) -> int:
+        if lo > hi:
+            return 0
+        a = bisect_left(self.valores, lo)
+        b = bisect_right(self.valores, hi)
+        return self._prefijo(b) ^ self._prefijo(a) if b > a else 0
+
+
+class CatalogoCompilado:
+    """Columnas e índices del catálogo; se construye con `catalogo()`."""
+
+    def __init__(self, filas: list[Pelicula], version: int):
+        self.version = version
+        self.n = len(filas)
+        self.ids = [p.id for p in filas]
+        self.titulos = [p.titulo for p in filas]
+        self.anios = [p.anio for p in filas]
+        # Mismas conversiones que los comparadores de game_service
+        self.votos = [p.imdb_votes or 0 for p in filas]
+        self.duraciones = [p.duracion_min or 0 for p in filas]
+        self.ratings = [
+            float(p.imdb_rating) if p.imdb_rating is not None else None for p in filas
+        ]
+        perfiles = [perfil_pelicula(p) for p in filas]
+        self.generos = [pf.generos for pf in perfiles]
+        self.actores = [pf.actores for pf in perfiles]
+        self.directores = [pf.director for pf in perfiles]
+
+        self.rango_anio = IndiceRango(self.anios)
+        self.rango_votos = IndiceRango(self.votos)
+        self.rango_duracion = IndiceRango(self.duraciones)
+        self._indexar()
+
+    @classmethod
+    def desde_snapshot(cls, snap) -> CatalogoCompilado:
+        """
+        Columnas e índices de rango como vistas sobre el mmap compartido
+        (snapshot_catalogo); solo los conjuntos normalizados y los índices
+        invertidos se construyen en el proceso, sin BD ni normalizar.
+        """
+        cat = cls.__new__(cls)
+        cat.version = snap.version
+        cat.n = snap.n
+        cat.ids, cat.titulos = snap.ids, snap.titulos
+        cat.anios, cat.votos, cat.duraciones = snap.anios, snap.votos, snap.duraciones
+        cat.ratings = snap.ratings
+        cat.generos = [frozenset(snap.lista("generos", i)) for i in range(cat.n)]
+        cat.actores = [frozenset(snap.lista("actores", i)) for i in range(cat.n)]
+        cat.directores = [snap.textos["directores"][i] for i in range(cat.n)]
+        c = snap.columnas
+        cat.rango_anio = IndiceRango.precalculado(c["orden_anios"], c["valores_anios"])
+        cat.rango_votos = IndiceRango.precalculado(c["orden_votos"], c["valores_votos"])
+        cat.rango_duracion = IndiceRango.precalculado(c["orden_duraciones"], c["valores_duraciones"])
+        cat._indexar()
+        return cat
+
+    def _indexar(self) -> None:
+        self.todos = (1 << self.n) - 1
+        self.fila_de = {pid: i for i, pid in enumerate(self.ids)}
+        self._por_rating: dict[float | None, list[int]] = {}
+        self._por_genero: dict[str, list[int]] = {}
+        self._por_actor: dict[str, list[int]] = {}
+        self._por_director: dict[str, list[int]] = {}
+        self._por_generos: dict[frozenset[str], list[int]] = {}
+        self._por_actores: dict[frozenset[str], list[int]] = {}
+        for i in range(self.n):
+            self._por_rating.setdefault(self.ratings[i], []).append(i)
+            self._por_director.setdefault(self.directores[i], []).append(i)
+            self._por_generos.setdefault(self.generos[i], []).append(i)
+            self._por_actores.setdefault(self.actores[i], []).append(i)
+            for g in self.generos[i]:
+                self._por_genero.setdefault(g, []).append(i)
+            for a in self.actores[i]:
+                self._por_actor.setdefault(a, []).append(i)
+        # Pocos géneros y ratings (una décima) muy repetidos: bitsets precalculados
+        self.bits_genero = {g: _bits(ix) for g, ix in self._por_genero.items()}
+        self.bits_rating = {r: _bits(ix) for r, ix in self._por_rating.items()}
+        self._mascaras_rating: dict[tuple[float | None, str], int] = {}
+        # Orden de popularidad para elegir sondas
+        self.por_votos = sorted(range(self.n), key=lambda i: -self.votos[i])
+
+    # ---------- patrón de feedback (reglas de game_service) ----------
+    def patron(self, g: int, s: int) -> tuple:
+        """Feedback que produce adivinar la fila g si la secreta es la fila s."""
+        return (
+            _band_color(self.anios[g] - self.anios[s], YEAR_DELTA),
+            _arrow(self.anios[g], self.anios[s]),
+            _band_color(self.votos[g] - self.votos[s], VOTES_DELTA),
+            _arrow(self.votos[g], self.votos[s]),
+            _color_conjuntos(self.generos[g], self.generos[s]),
+            _band_color(self.duraciones[g] - self.duraciones[s], DUR_DELTA),
+            _arrow(self.duraciones[g], self.duraciones[s]),
+            V if self.directores[g] == self.directores[s] else G,
+            _color_conjuntos(self.actores[g], self.actores[s]),
+            _color_rating_valores(self.ratings[g], self.ratings[s]),
+            g == s,
+        )
+
+    # ---------- máscaras por pista ----------
+    @staticmethod
+    def _rango_banda(indice: IndiceRango, v: int, delta: int, color: str, flecha: str) -> int:
+        # diff = v - s; flecha UP => la secreta es mayor que el intento
+        if color == V:
+            return indice.rango(v, v)
+        cerca = color == A
+        if flecha == "UP":
+            return indice.rango(v + 1, v + delta) if cerca else indice.rango(v + delta + 1, math.inf)
+        if flecha == "DOWN":
+            return indice.rango(v - delta, v - 1) if cerca else indice.rango(-math.inf, v - delta - 1)
+        return 0  # AMARILLO/GRIS sin flecha no puede darse
+
+    def _conjuntos(self, a: frozenset[str], color: str, exactos: dict, por_item) -> int:
+        if not a:
+            # Sin elementos nunca hay intersección: siempre GRIS
+            return self.todos if color == G else 0
+        alguno = 0
+        for x in a:
+            alguno |= por_item(x)
+        if color == G:
+            return self.todos & ~alguno
+        iguales = _bits(exactos.get(a, ()))
+        return iguales if color == V else alguno & ~iguales
+
+    def _mascara_rating(self, r: float | None, color: str) -> int:
+        x = self._mascaras_rating.get((r, color))
+        if x is None:
+            x = 0
+            for valor, bits in self.bits_rating.items():
+                if _color_rating_valores(r, valor) == color:
+                    x |= bits
+            self._mascaras_rating[(r, color)] = x
+        return x
+
+    def mascara(self, g: int, fb) -> int:
+        """Películas compatibles con el feedback `fb` del intento g."""
+        if fb.es_correcto:
+            return 1 << g
+        m = self.todos & ~(1 << g)
+        m &= self._rango_banda(self.rango_anio, self.anios[g], YEAR_DELTA, fb.color_anio, fb.flecha_anio)
+        m &= self._rango_banda(
+            self.rango_votos, self.votos[g], VOTES_DELTA, fb.color_popularidad, fb.flecha_popularidad
+        )
+        m &= self._rango_banda(
+            self.rango_duracion, self.duraciones[g], DUR_DELTA, fb.color_duracion, fb.flecha_duracion
+        )
+        if not m:
+            return 0
+        m &= self._conjuntos(
+            self.generos[g], fb.color_genero, self._por_generos, self.bits_genero.__getitem__
+        )
+        m &= self._conjuntos(
+            self.actores[g],
+            fb.color_actores,
+            self._por_actores,
+            lambda a: _bits(self._por_actor[a]),
+        )
+        director = _bits(self._por_director[self.directores[g]])
+        m &= director if fb.color_direccion == V else ~director
+        if m:
+            m &= self._mascara_rating(self.ratings[g], fb.color_rating)
+        return m
+
+
+@dataclass(frozen=True)
+class Sugerencia:
+    pelicula_id: int
+    titulo: str
+    bits: float  # ganancia de información esperada
+    es_candidata: bool
+
+
+# =========================
+# Catálogo compilado (por proceso y versión)
+# =========================
+_compilado: CatalogoCompilado | None = None
+_lock = threading.Lock()
+
+
+def catalogo() -> CatalogoCompilado:
+    global _compilado
+    version = catalog_version()
+    cat = _compilado
+    if cat is not None and cat.version == version:
+        return cat
+    with _lock:
+        if _compilado is None or _compilado.version != version:
+            snap = snapshot_catalogo.vigente(version)
+            if snap is not None:
+                _compilado = CatalogoCompilado.desde_snapshot(snap)
+                return _compilado
+            filas = list(
+                Pelicula.objects.order_by("id").only(
+                    "id", "titulo", "anio", "genero", "director", "actores",
+                    "duracion_min", "imdb_rating", "imdb_votes",
+                )
+            )
+            _compilado = CatalogoCompilado(filas, version)
+        return _compilado
+
+
+# =========================
+# API del solver
+# =========================
+def candidatos(cat: CatalogoCompilado, pistas) -> int:
+    """Bitset de candidatas compatibles con [(pelicula_id, feedback), ...]."""
+    bits = cat.todos
+    for pelicula_id, fb in pistas:
+        g = cat.fila_de.get(pelicula_id)
+        if g is None:
+            continue
+        bits &= cat.mascara(g, fb)
+        if not bits:
+            break
+    return bits
+
+
+def pistas_de_partida(partida: Partida) -> list[tuple[int, object]]:
+    return [
+        (pelicula_id, decodificar_feedback(code))
+        for pelicula_id, code in Intento.objects.filter(
+            partida=partida, feedback_code__isnull=False
+        )
+        .order_by("numero_intento")
+        .values_list("pelicula_adivinada_id", "feedback_code")
+    ]
+
+
+def _entropia(cat: CatalogoCompilado, g: int, muestra: list[int]) -> float:
+    cuentas = Counter(cat.patron(g, s) for s in muestra)
+    n = len(muestra)
+    return math.log2(n) - sum(c * math.log2(c) for c in cuentas.values()) / n
+
+
+def sugerir(
+    cat: CatalogoCompilado, bits: int, excluir: set[int] = frozenset(), n: int = 3
+) -> list[Sugerencia]:
+    """
+    Mejores intentos por ganancia de información esperada sobre los
+    candidatos (estimada con una muestra si son muchos). A igual ganancia se
+    prefiere una candidata (puede acertar) y luego la más votada.
+    """
+    filas = indices(bits)
+    if not filas:
+        return []
+    if len(filas) > MUESTRA_ENTROPIA:
+        paso = len(filas) / MUESTRA_ENTROPIA
+        muestra = [filas[int(k * paso)] for k in range(MUESTRA_ENTROPIA)]
+    else:
+        muestra = filas
+
+    excluidas = {cat.fila_de[p] for p in excluir if p in cat.fila_de}
+    candidatas = sorted(filas, key=lambda i: -cat.votos[i])
+    pool = [i for i in candidatas if i not in excluidas][:POOL_CANDIDATAS]
+    en_pool = set(pool)
+    sondas = 0
+    for i in cat.por_votos:
+        if sondas >= POOL_EXPLORACION or len(filas) <= 2:
+            break
+        if i not in en_pool and i not in excluidas:
+            pool.append(i)
+            en_pool.add(i)
+            sondas += 1
+
+    puntuadas = []
+    for g in pool:
+        es_candidata = (bits >> g) & 1 == 1
+        ganancia = _entropia(cat, g, muestra)
+        # Una candidata además puede terminar la partida: pequeño bonus
+        puntuadas.append((ganancia + (1e-9 if es_candidata else 0), es_candidata, cat.votos[g], g))
+    puntuadas.sort(reverse=True)
+    return [
+        Sugerencia(cat.ids[g], cat.titulos[g], round(ganancia, 3), es_candidata)
+        for ganancia, es_candidata, _, g in puntuadas[:n]
+    ]
+
+
+def simular(
+    secreta_id: int, max_intentos: int = MAX_INTENTOS, cat: CatalogoCompilado | None = None
+) -> list[tuple[Sugerencia, int]]:
+    """
+    Juega contra `secreta_id` siguiendo siempre la mejor sugerencia.
+    Devuelve [(intento, candidatas_tras_el_intento)]; resuelto si el último
+    intento es la secreta.
+    """
+    cat = cat or catalogo()
+    s = cat.fila_de[secreta_id]
+    bits = cat.todos
+    jugadas: list[tuple[Sugerencia, int]] = []
+    intentadas: set[int] = set()
+    for _ in range(max_intentos):
+        mejor = sugerir(cat, bits, excluir=intentadas, n=1)
+        if not mejor:
+            break
+        sug = mejor[0]
+        g = cat.fila_de[sug.pelicula_id]
+        intentadas.add(sug.pelicula_id)
+        bits &= cat.mascara(g, Feedback(*cat.patron(g, s)))
+        jugadas.append((sug, bits.bit_count()))
+        if g == s:
+            break
+    return jugadas
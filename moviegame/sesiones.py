@@ -0,0 +1,124 @@
+# moviegame/sesiones.py
+"""
+Sesiones en caché con escritura diferida a la BD (SESSION_ENGINE).
+
+Como cached_db de Django, las lecturas salen de la caché y solo van a
+django_session si la clave no está. La diferencia está al guardar: la
+caché se actualiza siempre, pero la fila de la BD se escribe al momento si
+la sesión es nueva, si la escritura anterior fue la inserción inicial
+(login() hace cycle_key y luego añade el usuario), si cambia la
+autenticación o si la última escritura tiene más de
+MOVIDLE_SESION_ESCRITURA_SEG segundos. El resto de cambios quedan en la
+caché y marcados como pendientes; un temporizador del proceso (y la salida
+del proceso) los vuelca a la BD, así que una caché vaciada pierde como
+mucho ese intervalo de cambios y nunca la autenticación.
+
+Requiere una caché compartida entre procesos para que todos vean la última
+versión y el logout llegue a todos: settings solo lo activa con
+MOVIDLE_REDIS_URL. Con 0 segundos se comporta como cached_db.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Sesiones con cambios solo en la caché: session_key -> primer cambio sin volcar
+_pendientes: dict[str, float] = {}
+_lock = threading.Lock()
+_volcador: threading.Timer | None = None
+
+
+def _intervalo() -> int:
+    return getattr(settings, "MOVIDLE_SESION_ESCRITURA_SEG", 0)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = "movidle.sesion."
+
+    @property
+    def _clave_escrita(self) -> str:
+        return self.cache_key + ":bd"
+
+    def _huella(self) -> tuple:
+        datos = self._session
+        return (datos.get(SESSION_KEY), datos.get(HASH_SESSION_KEY), datos.get(BACKEND_SESSION_KEY))
+
+    def save(self, must_create=False):
+        intervalo = _intervalo()
+        huella = self._huella()
+        if not must_create and self.session_key is not None and intervalo:
+            marca = self._cache.get(self._clave_escrita)
+            if marca is not None:
+                escrita, huella_bd, insercion = marca
+                if not insercion and huella_bd == huella and time.time() - escrita < intervalo:
+                    self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+                    _marcar_pendiente(self.session_key, intervalo)
+                    return
+        insercion = must_create or self.session_key is None
+        super().save(must_create)
+        self._cache.set(self._clave_escrita, (time.time(), huella, insercion), self.get_expiry_age())
+        with _lock:
+            _pendientes.pop(self.session_key, None)
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        clave = self.cache_key_prefix + (session_key or "")
+        super().delete(session_key)
+        self._cache.delete(clave + ":bd")
+        with _lock:
+            _pendientes.pop(session_key, None)
+
+
+# =========================
+# Volcado de pendientes
+# =========================
+def _marcar_pendiente(session_key: str, intervalo: int) -> None:
+    global _volcador
+    with _lock:
+        _pendientes.setdefault(session_key, time.time())
+        if _volcador is None:
+            _volcador = threading.Timer(intervalo, _tick)
+            _volcador.daemon = True
+            _volcador.start()
+
+
+def _tick() -> None:
+    global _volcador
+    with _lock:
+        _volcador = None
+    try:
+        volcar_pendientes()
+    except Exception:
+        logger.exception("Sesiones: fallo volcando pendientes")
+    finally:
+        close_old_connections()
+
+
+def volcar_pendientes() -> int:
+    """Escribe en la BD las sesiones con cambios solo en la caché; devuelve cuántas."""
+    with _lock:
+        claves = list(_pendientes)
+        _pendientes.clear()
+    volcadas = 0
+    for session_key in claves:
+        sesion = SessionStore(session_key)
+        datos = sesion._cache.get(sesion.cache_key)
+        if datos is None:  # cerrada o caducada entre medias
+            continue
+        sesion._session_cache = datos
+        CachedDBStore.save(sesion)
+        sesion._cache.set(
+            sesion._clave_escrita, (time.time(), sesion._huella(), False), sesion.get_expiry_age()
+        )
+        volcadas += 1
+    return volcadas
+
+
+atexit.register(volcar_pendientes)
@@ -1,10 +1,39 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Jugador
+from .backends import invalidar_usuario
+from .models import Jugador, Pelicula, PeliculaDelDia
+from .services.catalog_cache import bump_catalog_version
+from .services.game_service import invalidar_pelicula_diaria
 
 
 @receiver(post_save, sender=User)
 def crear_perfil_jugador(sender, instance: User, created, **kwargs):
     if created:
         Jugador.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_usuario_cacheado(sender, instance: User, **kwargs):
+    invalidar_usuario(instance.pk)
+
+
+@receiver(post_save, sender=Jugador)
+@receiver(post_delete, sender=Jugador)
+def invalidar_jugador_cacheado(sender, instance: Jugador, **kwargs):
+    invalidar_usuario(instance.user_id)
+
+
+@receiver(post_save, sender=Pelicula)
+@receiver(post_delete, sender=Pelicula)
+def invalidar_catalogo(sender, instance: Pelicula, **kwargs):
+    bump_catalog_version()
+    # La película del día memorizada puede ser esta misma
+    invalidar_pelicula_diaria()
+
+
+@receiver(post_save, sender=PeliculaDelDia)
+@receiver(post_delete, sender=PeliculaDelDia)
+def invalidar_diaria(sender, instance: PeliculaDelDia, **kwargs):
+    invalidar_pelicula_diaria()
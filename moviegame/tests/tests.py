@@ -1,5 +1,9 @@
 # moviegame/tests.py
-from django.test import TestCase
+import io
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from moviegame.models import Pelicula
 
@@ -56,3 +60,1434 @@ class PublicMoviesAPITest(TestCase):
             for key in ("id", "title", "year", "genres", "runtime_min",
                         "imdb_rating", "popularity_votes", "app_url"):
                 self.assertIn(key, item)
+
+
+class PublicMoviesBatchAPITest(TestCase):
+    def setUp(self):
+        self.alien = Pelicula.objects.create(
+            titulo="Alien", anio=1979, genero="Horror, Sci-Fi",
+            imdb_id="tt0078748", imdb_rating=8.5, imdb_votes=900000,
+        )
+        self.matrix = Pelicula.objects.create(
+            titulo="The Matrix", anio=1999, genero="Action, Sci-Fi",
+            imdb_id="tt0133093", imdb_rating=8.7, imdb_votes=2000000,
+        )
+        self.url = reverse("moviegame:api_public_movies_batch")
+
+    def test_lote_por_ids_e_imdb_ids(self):
+        resp = self.client.get(
+            self.url, {"ids": f"{self.alien.id},999999", "imdb_ids": "tt0133093"}
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual([r["title"] for r in data["results"]], ["Alien", "The Matrix"])
+        self.assertEqual(data["missing"], ["999999"])
+        self.assertEqual(data["count"], 2)
+
+    def test_segunda_consulta_sin_bd_e_invalidacion_al_guardar(self):
+        params = {"ids": f"{self.alien.id},{self.matrix.id}"}
+        self.client.get(self.url, params)
+        with self.assertNumQueries(0):
+            self.client.get(self.url, params)
+
+        self.alien.titulo = "Alien (Director's Cut)"
+        self.alien.save()
+        data = self.client.get(self.url, params).json()
+        self.assertEqual(data["results"][0]["title"], "Alien (Director's Cut)")
+
+    def test_limite_de_lote(self):
+        ids = ",".join(str(i) for i in range(1, 400))
+        self.assertEqual(self.client.get(self.url, {"ids": ids}).status_code, 400)
+
+
+def crear_peliculas_de_juego():
+    """Catálogo mínimo para jugar: devuelve (secreta, otras...)."""
+    datos = [
+        ("Alien", 1979, "Horror, Sci-Fi", "Ridley Scott", "Sigourney Weaver, Tom Skerritt", 117, 8.5, 900000),
+        ("Blade Runner", 1982, "Sci-Fi, Thriller", "Ridley Scott", "Harrison Ford, Rutger Hauer", 117, 8.1, 800000),
+        ("Inception", 2010, "Action, Sci-Fi", "Christopher Nolan", "Leonardo DiCaprio, Tom Hardy", 148, 8.8, 2400000),
+        ("Heat", 1995, "Crime, Drama", "Michael Mann", "Al Pacino, Robert De Niro", 170, 8.3, 700000),
+    ]
+    return [
+        Pelicula.objects.create(
+            titulo=t, anio=a, genero=g, director=d, actores=ac,
+            duracion_min=m, imdb_rating=r, imdb_votes=v,
+        )
+        for (t, a, g, d, ac, m, r, v) in datos
+    ]
+
+
+class GameStateAPITest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from moviegame.models import PeliculaDelDia
+
+        self.pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(pelicula=self.pelis[0])
+        self.user = User.objects.create_user("ana", password="x")
+        self.client.force_login(self.user)
+
+    def _intentar(self, peli):
+        return self.client.post(
+            reverse("moviegame:api_intentos"), {"pelicula_id": peli.id}
+        ).json()
+
+    def test_estado_restaura_intentos_con_feedback(self):
+        self._intentar(self.pelis[1])
+        self._intentar(self.pelis[2])
+
+        data = self.client.get(reverse("moviegame:api_estado")).json()
+        self.assertEqual(data["estadoPartida"], "EN_CURSO")
+        self.assertEqual(data["intentosRestantes"], 8)
+        self.assertEqual(
+            [i["titulo"] for i in data["intentos"]], ["Blade Runner", "Inception"]
+        )
+        self.assertEqual(data["intentos"][0]["colorDirector"], "VERDE")
+        self.assertEqual(data["intentos"][1]["valAño"], 2010)
+
+    def test_consultas_acotadas_y_revelacion(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._intentar(self.pelis[1])
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get(reverse("moviegame:api_estado"))
+        self._intentar(self.pelis[2])
+        self._intentar(self.pelis[0])
+        with CaptureQueriesContext(connection) as muchas:
+            data = self.client.get(reverse("moviegame:api_estado")).json()
+
+        self.assertEqual(len(pocas), len(muchas))
+        self.assertEqual(data["estadoPartida"], "GANADA")
+        self.assertEqual(data["revealTitle"], "Alien")
+
+    def test_game_view_embebe_estado(self):
+        self._intentar(self.pelis[1])
+        resp = self.client.get(reverse("moviegame:game"))
+        self.assertContains(resp, 'id="estado-juego"')
+        self.assertEqual(len(resp.context["estado_juego"]["intentos"]), 1)
+
+
+class PeliculaDiariaCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.pelis = crear_peliculas_de_juego()
+
+    def test_memoriza_sin_consultas_e_invalida_al_cambiar(self):
+        from moviegame.models import PeliculaDelDia
+        from moviegame.services.game_service import seleccionar_pelicula_diaria
+
+        sel = PeliculaDelDia.objects.create(pelicula=self.pelis[0])
+        self.assertEqual(seleccionar_pelicula_diaria(), self.pelis[0])
+        with self.assertNumQueries(0):
+            self.assertEqual(seleccionar_pelicula_diaria(), self.pelis[0])
+
+        sel.pelicula = self.pelis[1]
+        sel.save()
+        self.assertEqual(seleccionar_pelicula_diaria(), self.pelis[1])
+
+        sel.delete()
+        with self.assertRaises(RuntimeError):
+            seleccionar_pelicula_diaria()
+
+        # Solo hay días futuros programados: no se adelanta ninguno
+        from datetime import timedelta
+        from django.utils import timezone
+
+        PeliculaDelDia.objects.create(
+            fecha=timezone.localdate() + timedelta(days=1), pelicula=self.pelis[2]
+        )
+        with self.assertRaises(RuntimeError):
+            seleccionar_pelicula_diaria()
+
+
+    def test_memoria_por_fecha_acotada(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from moviegame.models import PeliculaDelDia
+        from moviegame.services import game_service as gs
+
+        PeliculaDelDia.objects.create(pelicula=self.pelis[0])
+        hoy = timezone.localdate()
+        for d in range(gs._MAX_DIARIAS_LOCAL * 2):
+            self.assertEqual(gs.seleccionar_pelicula_diaria(hoy + timedelta(days=d)), self.pelis[0])
+            self.assertLessEqual(len(gs._diaria_local), gs._MAX_DIARIAS_LOCAL)
+
+
+class ProgramadorTest(TestCase):
+    def test_rellena_ventana_sin_repetir_y_respeta_admin(self):
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from django.utils import timezone
+        from moviegame.models import PeliculaDelDia
+
+        cache.clear()
+        pelis = crear_peliculas_de_juego()
+        hoy = timezone.localdate()
+        PeliculaDelDia.objects.create(fecha=hoy, pelicula=pelis[3])
+
+        call_command(
+            "schedule_daily", "--dias", "4", "--min-votos", "1", "--precalentar",
+            stdout=io.StringIO(),
+        )
+
+        programadas = list(
+            PeliculaDelDia.objects.filter(fecha__gte=hoy).order_by("fecha")
+        )
+        self.assertEqual(
+            [p.fecha for p in programadas], [hoy + timedelta(days=i) for i in range(4)]
+        )
+        self.assertEqual(programadas[0].pelicula, pelis[3])
+        self.assertEqual(len({p.pelicula_id for p in programadas}), 4)
+
+        # Mañana ya está resuelta en caché
+        from moviegame.services.game_service import seleccionar_pelicula_diaria
+
+        with self.assertNumQueries(0):
+            seleccionar_pelicula_diaria(hoy + timedelta(days=1))
+
+
+class IntentosConcurrentesTest(TransactionTestCase):
+    """Un mismo jugador martillando desde muchos hilos (doble clic / pestañas)."""
+
+    def test_partida_unica_y_numeracion_consecutiva(self):
+        import threading
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from django.db import connection
+        from moviegame.models import Intento, Partida, PeliculaDelDia
+        from moviegame.services.game_service import registrar_intento
+
+        cache.clear()
+        pelis = crear_peliculas_de_juego()
+        extra = [
+            Pelicula.objects.create(titulo=f"Extra {i}", anio=2000 + i, imdb_votes=1000 * i)
+            for i in range(12)
+        ]
+        PeliculaDelDia.objects.create(pelicula=pelis[0])
+        jugador = User.objects.create_user("hilos", password="x").jugador
+
+        errores = []
+
+        def jugar(peli):
+            try:
+                registrar_intento(jugador, peli)
+            except ValueError:
+                pass  # "ya intentaste", "máximo de intentos": respuestas válidas
+            except Exception as e:  # pragma: no cover - es lo que buscamos detectar
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [
+            threading.Thread(target=jugar, args=(p,))
+            for p in (pelis[1:] + extra) * 2
+        ]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(Partida.objects.filter(jugador=jugador).count(), 1)
+        numeros = list(
+            Intento.objects.filter(partida__jugador=jugador)
+            .order_by("numero_intento")
+            .values_list("numero_intento", flat=True)
+        )
+        self.assertEqual(numeros, list(range(1, 11)))
+
+
+class BenchmarkRunnerTest(TestCase):
+    def test_genera_datos_y_resume_escenarios(self):
+        from moviegame.benchmarks import datos as datos_sinteticos
+        from moviegame.benchmarks.runner import (
+            comparar, ejecutar_escenario, escenarios_por_defecto,
+        )
+
+        datos = datos_sinteticos.generar(n_peliculas=40, n_jugadores=5, n_dias=3)
+        informe = {"escenarios": {}}
+        for esc in escenarios_por_defecto(datos):
+            res = ejecutar_escenario(esc, datos, peticiones=4, hilos=1)
+            informe["escenarios"][esc.nombre] = res.resumen()
+
+        for nombre, r in informe["escenarios"].items():
+            self.assertEqual(r["errores"], 0, nombre)
+            self.assertEqual(r["requests"], 4)
+            self.assertGreater(r["queries_max"], 0)
+        self.assertEqual(comparar(informe, informe, 0.0), [])
+
+    async def test_escenarios_por_asgi(self):
+        from asgiref.sync import sync_to_async
+        from moviegame.benchmarks import datos as datos_sinteticos
+        from moviegame.benchmarks.runner import (
+            aejecutar_escenario_asgi, escenarios_por_defecto,
+        )
+
+        datos = await sync_to_async(datos_sinteticos.generar)(
+            n_peliculas=20, n_jugadores=2, n_dias=1
+        )
+        for esc in escenarios_por_defecto(datos):
+            if esc.nombre in ("api_autocomplete", "api_public_movies"):
+                res = await aejecutar_escenario_asgi(esc, datos, peticiones=6, concurrencia=3)
+                r = res.resumen()
+                self.assertEqual((r["requests"], r["errores"]), (6, 0), esc.nombre)
+
+
+class MicrobenchmarkTest(TestCase):
+    def test_comando_emite_json_con_todos_los_casos(self):
+        import json
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command(
+            "bench_feedback", "--peliculas", "30", "--pares", "20",
+            "--repeat", "1", "--number", "1", stdout=out,
+        )
+        informe = json.loads(out.getvalue())
+        for caso in ("_norm", "_color_generos", "_color_actores",
+                     "lista_generos", "mapear_a_pelicula_dict"):
+            self.assertGreater(informe["resultados"][caso]["ns_por_op_min"], 0)
+
+
+class MetricasTest(TestCase):
+    def test_endpoint_staff_en_formato_prometheus(self):
+        from django.contrib.auth.models import User
+        from moviegame.services.metrics import registro
+
+        registro.reiniciar()
+        Pelicula.objects.create(titulo="Alien", anio=1979, imdb_votes=1, imdb_rating=8.5)
+        self.client.get(reverse("moviegame:api_public_movies"))
+
+        url = reverse("moviegame:metrics")
+        self.assertEqual(self.client.get(url).status_code, 302)  # anónimo -> login
+
+        staff = User.objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_login(staff)
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        texto = resp.content.decode()
+        self.assertIn("# TYPE movidle_request_seconds histogram", texto)
+        self.assertIn('movidle_db_queries_count{view="moviegame:api_public_movies"} 1', texto)
+        self.assertIn('movidle_request_seconds_bucket{view="moviegame:api_public_movies",le="+Inf"} 1', texto)
+
+    def test_seccion_registrar_intento(self):
+        from django.contrib.auth.models import User
+        from moviegame.models import PeliculaDelDia
+        from moviegame.services.game_service import registrar_intento
+        from moviegame.services.metrics import registro
+
+        registro.reiniciar()
+        pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(pelicula=pelis[0])
+        jugador = User.objects.create_user("ana", password="x").jugador
+        registrar_intento(jugador, pelis[1])
+        self.assertIn(
+            'movidle_section_seconds_count{section="registrar_intento"} 1',
+            registro.exportar(),
+        )
+
+
+class PerfiladorConsultasTest(TestCase):
+    def test_normaliza_y_detecta_n_mas_1_con_origen(self):
+        from moviegame.services.query_profiler import normalizar_sql, perfilar, sin_n_mas_1
+
+        self.assertEqual(
+            normalizar_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND x = 'a''b' LIMIT 21"),
+            "SELECT * FROM t WHERE id IN (...) AND x = ? LIMIT ?",
+        )
+        for p in crear_peliculas_de_juego():
+            Pelicula.objects.create(titulo=f"{p.titulo} 2", anio=p.anio)
+
+        with perfilar() as perfil:
+            for p in Pelicula.objects.all():
+                Pelicula.objects.filter(pk=p.pk).exists()  # N+1 deliberado
+        [hallazgo] = perfil.hallazgos()
+        self.assertEqual(hallazgo.tipo, "n+1")
+        self.assertEqual(hallazgo.veces, 8)
+        self.assertIn("tests.py", hallazgo.origen)
+
+        with self.assertRaises(AssertionError):
+            with sin_n_mas_1():
+                for p in Pelicula.objects.all():
+                    Pelicula.objects.filter(pk=p.pk).exists()
+
+    def test_partida_completa_sin_n_mas_1(self):
+        from django.contrib.auth.models import User
+        from moviegame.models import PeliculaDelDia
+        from moviegame.services.query_profiler import sin_n_mas_1
+
+        pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(pelicula=pelis[0])
+        self.client.force_login(User.objects.create_user("ana", password="x"))
+        for p in pelis[1:] + pelis[:1]:
+            self.client.post(reverse("moviegame:api_intentos"), {"pelicula_id": p.id})
+
+        with sin_n_mas_1(umbral_repeticiones=2):
+            data = self.client.get(reverse("moviegame:api_estado")).json()
+        with sin_n_mas_1(umbral_repeticiones=2):
+            self.client.get(reverse("moviegame:game"))
+        self.assertEqual(data["revealTitle"], "Alien")
+
+    @override_settings(MOVIDLE_PERFILADOR_CONSULTAS=True)
+    async def test_cadena_async_no_pasa_a_hilo(self):
+        from asgiref.sync import iscoroutinefunction
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from moviegame.middleware import PerfiladorConsultasMiddleware
+
+        async def vista(request):
+            return HttpResponse("ok")
+
+        mw = PerfiladorConsultasMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(mw))
+        resp = await mw(RequestFactory().get("/"))
+        self.assertEqual(resp.content, b"ok")
+
+
+class AdminHistorialTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from moviegame.models import PeliculaDelDia
+
+        pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(pelicula=pelis[0])
+        for i in range(3):
+            self.client.force_login(User.objects.create_user(f"j{i}", password="x"))
+            for p in pelis[1:]:
+                self.client.post(reverse("moviegame:api_intentos"), {"pelicula_id": p.id})
+        self.client.force_login(
+            User.objects.create_superuser("root", "root@example.org", "x")
+        )
+
+    def test_changelists_sin_n_mas_1(self):
+        from moviegame.services.query_profiler import sin_n_mas_1
+
+        for nombre in ("partida", "intento"):
+            url = reverse(f"admin:moviegame_{nombre}_changelist")
+            with sin_n_mas_1(umbral_repeticiones=3):
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200, nombre)
+
+    def test_feedback_solo_lectura_y_conteo_estimado(self):
+        from moviegame.admin import EstimadoPaginator
+        from moviegame.models import Intento
+
+        it = Intento.objects.first()
+        resp = self.client.get(reverse("admin:moviegame_intento_change", args=[it.pk]))
+        self.assertContains(resp, "🟩" if it.feedback.color_direccion == "VERDE" else "⬜")
+        self.assertNotIn("feedback_code", resp.context["adminform"].form.fields)
+
+        paginator = EstimadoPaginator(Intento.objects.order_by("pk"), 50)
+        paginator.umbral = 0
+        total = Intento.objects.count()
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, total)
+
+
+class QueryPlanAuditTest(TestCase):
+    def test_formas_calientes_usan_indices(self):
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command("query_plan_audit", stdout=out)
+        self.assertIn("OK  intento_repetido", out.getvalue())
+
+    def test_detecta_escaneo_completo(self):
+        from moviegame.services.query_plans import es_escaneo_completo
+
+        self.assertTrue(es_escaneo_completo("SCAN moviegame_pelicula"))
+        self.assertTrue(es_escaneo_completo("Seq Scan on moviegame_pelicula  (cost=0..1)"))
+        self.assertFalse(es_escaneo_completo("SCAN moviegame_pelicula USING INDEX x"))
+        self.assertFalse(es_escaneo_completo("SEARCH moviegame_intento USING INDEX y (partida_id=?)"))
+
+
+class HomeCacheTest(TestCase):
+    def test_grid_cacheado_sin_consultas_e_invalidado_por_catalogo(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        Pelicula.objects.create(
+            titulo="Alien", anio=1979, imdb_votes=900000, poster_url="https://x/alien.jpg"
+        )
+        home = reverse("moviegame:home")
+
+        self.assertContains(self.client.get(home), "Poster Alien")
+        from moviegame.services.home_cache import precalentar_home
+
+        precalentar_home()
+        with self.assertNumQueries(0):
+            self.client.get(home)
+            self.client.get(home, HTTP_ACCEPT_LANGUAGE="de")
+
+        Pelicula.objects.create(
+            titulo="Heat", anio=1995, imdb_votes=700000, poster_url="https://x/heat.jpg"
+        )
+        self.assertContains(self.client.get(home), "Poster Heat")
+
+
+class PaginasAnonimasCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def test_howto_cacheado_por_idioma_con_csrf_propio(self):
+        import re
+
+        url = reverse("moviegame:howto")
+        primera = self.client.get(url, HTTP_ACCEPT_LANGUAGE="en")
+        self.assertTemplateUsed(primera, "moviegame/howto.html")
+
+        otro = self.client_class()
+        segunda = otro.get(url, HTTP_ACCEPT_LANGUAGE="en")
+        self.assertTemplateNotUsed(segunda, "moviegame/howto.html")
+        self.assertIn("Accept-Language", segunda["Vary"])
+
+        token = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+        self.assertNotEqual(
+            token.search(primera.content).group(1), token.search(segunda.content).group(1)
+        )
+        # El token servido desde caché es válido para el visitante
+        resp = otro.post(
+            reverse("set_language"),
+            {"language": "de"},
+            HTTP_X_CSRFTOKEN=token.search(segunda.content).group(1).decode(),
+        )
+        self.assertNotEqual(resp.status_code, 403)
+
+        de = self.client_class().get(url, HTTP_ACCEPT_LANGUAGE="de")
+        self.assertTemplateUsed(de, "moviegame/howto.html")
+
+    def test_query_arbitraria_no_crea_entradas(self):
+        url = reverse("moviegame:howto")
+        self.client.get(url)
+        claves = set(cache._cache)
+        for i in range(5):
+            r = self.client_class().get(url, {"x": i})
+            self.assertTemplateUsed(r, "moviegame/howto.html")  # sin caché
+        self.assertEqual(set(cache._cache), claves)
+        self.assertTemplateNotUsed(self.client_class().get(url), "moviegame/howto.html")
+
+    def test_autenticado_no_usa_cache(self):
+        from django.contrib.auth.models import User
+
+        url = reverse("moviegame:api_info")
+        self.client_class().get(url)
+        self.client.force_login(User.objects.create_user("ana", password="x"))
+        self.assertTemplateUsed(self.client.get(url), "moviegame/api_info.html")
+
+
+class ProductosAliadosTest(TestCase):
+    """Contra un servidor HTTP local que imita /api/products/in-stock/."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        estado = cls.estado = {"llamadas": 0, "falla": False}
+
+        class Stub(BaseHTTPRequestHandler):
+            def do_GET(self):
+                estado["llamadas"] += 1
+                if estado["falla"]:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                cuerpo = json.dumps(
+                    {"results": [{"name": "Palomitas", "price": 9000, "detail_url": "/p/1/"}]}
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        cls.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.servidor.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        from moviegame.services import aliados
+
+        self.aliados = aliados
+        self.estado.update(llamadas=0, falla=False)
+        aliados.reiniciar()
+        self.addCleanup(aliados.reiniciar)
+        ajustes = self.settings(MOVIDLE_ALIADOS_BASE=self.base)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def envejecer(self):
+        for destacados, copia in list(self.aliados._local.items()):
+            vieja = self.aliados.Copia(copia.productos, copia.obtenido_en - 3600)
+            self.aliados._local[destacados] = vieja
+            cache.set(self.aliados._clave(destacados), vieja)
+
+    def test_copia_fresca_no_llama_al_aliado(self):
+        url = reverse("moviegame:productos_aliados")
+        r = self.client.get(url)
+        self.assertContains(r, "Palomitas")
+        self.assertContains(r, f"{self.base}/p/1/")
+        self.client.get(url)
+        self.assertEqual(self.estado["llamadas"], 1)
+
+    def test_obsoleta_se_sirve_y_se_refresca_en_segundo_plano(self):
+        self.aliados.obtener_productos()
+        self.envejecer()
+        productos, obsoletos = self.aliados.obtener_productos()
+        self.assertTrue(obsoletos)
+        self.assertEqual(productos[0]["name"], "Palomitas")
+        self.aliados.esperar_refrescos()
+        self.assertEqual(self.estado["llamadas"], 2)
+        self.assertFalse(self.aliados.obtener_productos()[1])
+
+    def test_fallos_sirven_ultima_copia_y_abren_el_circuito(self):
+        self.aliados.obtener_productos()
+        self.estado["falla"] = True
+        with self.assertLogs("moviegame.services.aliados", "WARNING"):
+            for _ in range(self.aliados.FALLOS_PARA_ABRIR + 2):
+                self.envejecer()
+                productos, obsoletos = self.aliados.obtener_productos()
+                self.aliados.esperar_refrescos()
+                self.assertEqual(productos[0]["name"], "Palomitas")
+        self.assertEqual(self.aliados.circuito.estado, "abierto")
+        # 1 buena + FALLOS_PARA_ABRIR fallidas; con el circuito abierto no se llama
+        self.assertEqual(self.estado["llamadas"], 1 + self.aliados.FALLOS_PARA_ABRIR)
+
+    def test_sonda_cancelada_no_bloquea_el_circuito(self):
+        import asyncio
+        from unittest import mock
+
+        c = self.aliados.circuito
+        c.fallos, c.abierto_hasta = self.aliados.FALLOS_PARA_ABRIR, 0.0  # semiabierto
+        with mock.patch.object(self.aliados.httpx.AsyncClient, "get", side_effect=asyncio.CancelledError):
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(self.aliados._adescargar(False))
+        self.assertEqual(c.estado, "semiabierto")
+        # La siguiente petición puede volver a sondear y cierra el circuito
+        self.assertEqual(self.aliados._descargar(False)[0]["name"], "Palomitas")
+        self.assertEqual(c.estado, "cerrado")
+
+    def test_sin_copia_y_aliado_caido_responde_error(self):
+        self.estado["falla"] = True
+        with self.assertLogs("moviegame.services.aliados", "WARNING"):
+            r = self.client.get(reverse("moviegame:productos_aliados"))
+        self.assertEqual(r.status_code, 500)
+
+    async def test_vista_async_descarga_con_httpx(self):
+        r = await self.async_client.get(
+            reverse("moviegame:productos_aliados"), {"featured": "true"}
+        )
+        self.assertContains(r, "Palomitas")
+        self.assertEqual(self.estado["llamadas"], 1)
+        self.assertIn(True, self.aliados._local)
+
+
+class VistasAsyncTest(TestCase):
+    def setUp(self):
+        crear_peliculas_de_juego()
+
+    async def test_autocomplete_async_requiere_login(self):
+        from asgiref.sync import sync_to_async
+        from django.contrib.auth.models import User
+
+        url = reverse("moviegame:api_autocomplete")
+        r = await self.async_client.get(url, {"q": "Al"})
+        self.assertEqual(r.status_code, 302)
+        self.assertIn(reverse("moviegame:login"), r["Location"])
+
+        user = await sync_to_async(User.objects.create_user)("ana", password="x")
+        await self.async_client.aforce_login(user)
+        r = await self.async_client.get(url, {"q": "a"})
+        titulos = [p["titulo"] for p in r.json()["results"]]
+        # Primero los que empiezan por "a", luego los que la contienen (por votos)
+        self.assertEqual(titulos, ["Alien", "Blade Runner", "Heat"])
+
+    async def test_api_publica_async(self):
+        r = await self.async_client.get(reverse("moviegame:api_public_movies"), {"q": "Heat"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([m["title"] for m in r.json()["results"]], ["Heat"])
+        self.assertEqual(r["Access-Control-Allow-Origin"], "*")
+
+
+class SolverTest(TestCase):
+    def test_patron_y_mascaras_siguen_las_reglas_del_juego(self):
+        import random
+        from moviegame.benchmarks.datos import peliculas_en_memoria
+        from moviegame.services import game_service as gs
+        from moviegame.models import Feedback
+        from moviegame.services.solver import CatalogoCompilado, indices
+
+        pelis = peliculas_en_memoria(60, random.Random(3))
+        for i, p in enumerate(pelis, 1):
+            p.id = i
+        # Casos límite: mismo director/reparto, sin rating, sin géneros
+        pelis[1].director, pelis[1].actores = pelis[0].director, pelis[0].actores
+        pelis[2].imdb_rating, pelis[3].genero = None, ""
+        cat = CatalogoCompilado(pelis, version=0)
+
+        for g, adiv in enumerate(pelis):
+            for s, sec in enumerate(pelis):
+                esperado = (
+                    *gs._color_anio(adiv, sec),
+                    *gs._color_popularidad_por_votos(adiv, sec),
+                    gs._color_generos(adiv, sec),
+                    *gs._color_duracion(adiv, sec),
+                    gs._color_director(adiv, sec),
+                    gs._color_actores(adiv, sec),
+                    gs._color_rating(adiv, sec),
+                    adiv.id == sec.id,
+                )
+                self.assertEqual(cat.patron(g, s), esperado)
+            # La máscara de cada pista = fuerza bruta sobre el patrón
+            for s in (0, 1, 2, 3, 30):
+                p = cat.patron(g, s)
+                bf = [t for t in range(cat.n) if cat.patron(g, t) == p]
+                self.assertEqual(indices(cat.mascara(g, Feedback(*p))), bf)
+
+    def test_api_pista_usa_el_feedback_guardado_y_limita(self):
+        from django.contrib.auth.models import User
+        from moviegame.models import PeliculaDelDia
+
+        pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(pelicula=pelis[0])
+        self.client.force_login(User.objects.create_user("ana", password="x"))
+        url = reverse("moviegame:api_pista")
+        with self.settings(MOVIDLE_PISTAS_POR_DIA=2):
+            self.assertEqual(self.client.get(url).json()["candidatos"], 4)
+            # Heat (1995, 700k votos) contra Alien: año GRIS ↓ y votos GRIS ↑
+            # solo dejan a Alien (1979, 900k)
+            self.client.post(reverse("moviegame:api_intentos"), {"pelicula_id": pelis[3].id})
+            data = self.client.get(url).json()
+            self.assertEqual(data["pistasRestantes"], 0)
+            self.assertEqual(data["candidatos"], 1)
+            self.assertEqual(data["sugerencias"][0]["id"], pelis[0].id)
+            self.assertTrue(data["sugerencias"][0]["esCandidata"])
+            self.assertEqual(self.client.get(url).status_code, 429)
+
+    def test_comando_verifica_que_el_puzzle_se_resuelve(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from moviegame.models import PeliculaDelDia
+
+        pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(pelicula=pelis[2])
+        out = io.StringIO()
+        call_command("resolver", stdout=out)
+        self.assertIn("resuelto en", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("resolver", "--max-intentos", "0", stdout=io.StringIO())
+
+
+class DificultadTest(TestCase):
+    def test_distribucion_y_reparto_en_procesos(self):
+        import random
+        from moviegame.benchmarks.datos import peliculas_en_memoria
+        from moviegame.services import dificultad
+        from moviegame.services.solver import CatalogoCompilado
+
+        pelis = peliculas_en_memoria(80, random.Random(5))
+        for i, p in enumerate(pelis, 1):
+            p.id = i
+        cat = CatalogoCompilado(pelis, version=0)
+
+        serie = dificultad.evaluar(cat, [3, 7, 11], partidas=15)
+        paralelo = dificultad.evaluar_en_paralelo([3, 7, 11], partidas=15, procesos=2, cat=cat)
+        # La semilla es por película: el reparto no cambia el resultado
+        self.assertEqual([d.resumen() for d in serie], [d.resumen() for d in paralelo])
+        for d in serie:
+            self.assertEqual(d.partidas, 1 if d.modelo == "solver" else 15)
+            self.assertTrue(all(1 <= n <= 10 for n in d.intentos))
+
+        # Con 1 intento solo gana quien acierta a la primera
+        d = dificultad.evaluar(cat, [3], ("aleatorio",), partidas=20, max_intentos=1)[0]
+        self.assertGreater(d.resumen()["tasa_perdida"], 0.5)
+
+    def test_comando_por_fecha_con_salida_json(self):
+        import json
+        import os
+        import tempfile
+        from datetime import date
+        from django.core.management import call_command
+        from moviegame.models import PeliculaDelDia
+
+        pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(fecha=date(2030, 1, 1), pelicula=pelis[1])
+        ruta = os.path.join(tempfile.mkdtemp(), "dificultad.json")
+        call_command(
+            "simular_dificultad", "--fecha", "2030-01-01", "--partidas", "5",
+            "--procesos", "1", "--output", ruta, stdout=io.StringIO(),
+        )
+        with open(ruta, encoding="utf-8") as fh:
+            resultados = json.load(fh)["resultados"]
+        self.assertEqual({r["modelo"] for r in resultados}, {"aleatorio", "popularidad", "solver"})
+        self.assertTrue(all(r["pelicula_id"] == pelis[1].id for r in resultados))
+
+
+class FeedbackCompactoTest(TestCase):
+    def test_codec_ida_y_vuelta(self):
+        import itertools
+        from moviegame.models import (
+            CAMPOS_FEEDBACK, COLOR_A_BITS, FEEDBACK_CORRECTO, codificar_feedback,
+            decodificar_feedback,
+        )
+
+        colores, flechas = list(COLOR_A_BITS), ["", "UP", "DOWN"]
+        for k, (es_ok, c, f) in enumerate(itertools.product((False, True), colores, flechas)):
+            campos = {
+                nombre: (c if tabla is COLOR_A_BITS else f)
+                for nombre, tabla in CAMPOS_FEEDBACK
+            }
+            code = codificar_feedback(es_correcto=es_ok, **campos)
+            self.assertLess(code, 1 << 21)
+            self.assertEqual(code >= FEEDBACK_CORRECTO, es_ok)
+            fb = decodificar_feedback(code)
+            self.assertEqual({n: getattr(fb, n) for n, _ in CAMPOS_FEEDBACK}, campos)
+            self.assertEqual(fb.es_correcto, es_ok)
+        with self.assertRaises(TypeError):
+            codificar_feedback(color_año="VERDE")
+
+    def test_intento_guarda_feedback_en_una_fila(self):
+        from django.contrib.auth.models import User
+        from moviegame.models import Intento, PeliculaDelDia
+
+        pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(pelicula=pelis[0])
+        self.client.force_login(User.objects.create_user("ana", password="x"))
+        r = self.client.post(reverse("moviegame:api_intentos"), {"pelicula_id": pelis[1].id})
+        it = Intento.objects.get()
+        # Blade Runner vs Alien: mismo director, 3 años después (AMARILLO, ↓)
+        self.assertEqual(it.feedback.color_direccion, "VERDE")
+        self.assertEqual((it.feedback.color_anio, it.feedback.flecha_anio), ("AMARILLO", "DOWN"))
+        self.assertEqual(r.json()["colorAño"], "AMARILLO")
+        self.client.post(reverse("moviegame:api_intentos"), {"pelicula_id": pelis[0].id})
+        self.assertEqual(list(Intento.objects.correctos().values_list("numero_intento", flat=True)), [2])
+
+
+class FeedbackMigracionTest(TransactionTestCase):
+    """Backfill Feedback -> Intento.feedback_code (0007) y su inversa."""
+
+    def migrar(self, destino):
+        from django.db import connection
+        from django.db.migrations.executor import MigrationExecutor
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([("moviegame", destino)])
+        executor.loader.build_graph()
+        return executor.loader.project_state([("moviegame", destino)]).apps
+
+    def test_backfill_y_vuelta_atras(self):
+        apps = self.migrar("0006_hot_query_indexes")
+        User = apps.get_model("auth", "User")
+        M = {n: apps.get_model("moviegame", n) for n in ("Pelicula", "Jugador", "Partida", "Intento", "Feedback")}
+        peli = M["Pelicula"].objects.create(titulo="Alien", anio=1979)
+        jugador = M["Jugador"].objects.create(user=User.objects.create(username="ana"))
+        partida = M["Partida"].objects.create(jugador=jugador, pelicula_secreta=peli)
+        it1, it2 = (
+            M["Intento"].objects.create(partida=partida, pelicula_adivinada=peli, numero_intento=n)
+            for n in (1, 2)
+        )
+        M["Feedback"].objects.create(
+            intento=it1, color_anio="AMARILLO", flecha_anio="UP", color_rating="VERDE"
+        )
+        M["Feedback"].objects.create(intento=it2, es_correcto=True, color_direccion="VERDE")
+
+        self.migrar("0008_delete_feedback")
+        from moviegame.models import Intento
+
+        fb1, fb2 = (i.feedback for i in Intento.objects.order_by("numero_intento"))
+        self.assertEqual((fb1.color_anio, fb1.flecha_anio, fb1.color_rating), ("AMARILLO", "UP", "VERDE"))
+        self.assertFalse(fb1.es_correcto)
+        self.assertTrue(fb2.es_correcto)
+        self.assertEqual(fb2.color_direccion, "VERDE")
+
+        apps = self.migrar("0006_hot_query_indexes")
+        restaurados = apps.get_model("moviegame", "Feedback").objects.order_by("intento_id")
+        self.assertEqual(
+            [(f.color_anio, f.flecha_anio, f.es_correcto) for f in restaurados],
+            [("AMARILLO", "UP", False), ("GRIS", "", True)],
+        )
+
+    def tearDown(self):
+        from django.core.management import call_command
+
+        call_command("migrate", "moviegame", verbosity=0)
+
+
+class ArchivoTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from moviegame.models import EstadoPartida, Intento, Partida, codificar_feedback
+
+        self.dir = tempfile.mkdtemp()
+        self.user = User.objects.create_user("ana", password="x")
+        jugador = self.user.jugador
+        pelis = crear_peliculas_de_juego()
+        hoy = date.today()
+        # Tres partidas viejas (dos meses distintos) y una de ayer
+        for dias, estado, n in ((400, "GANADA", 2), (370, "PERDIDA", 3), (369, "GANADA", 1), (1, "GANADA", 2)):
+            p = Partida.objects.create(
+                jugador=jugador, pelicula_secreta=pelis[0],
+                fecha=hoy - timedelta(days=dias), estado=estado,
+            )
+            for k in range(1, n + 1):
+                ok = estado == EstadoPartida.GANADA and k == n
+                Intento.objects.create(
+                    partida=p, pelicula_adivinada=pelis[0] if ok else pelis[k],
+                    numero_intento=k, feedback_code=codificar_feedback(es_correcto=ok),
+                )
+        self.corte = hoy - timedelta(days=365)
+        self.client.force_login(self.user)
+
+    def _stats(self):
+        r = self.client.get(reverse("moviegame:stats"))
+        return r.context["ganadas"], r.context["perdidas"], r.context["distribucion"]
+
+    def test_archivar_conserva_estadisticas_y_rehidrata(self):
+        from pathlib import Path
+        from moviegame.models import Intento, Partida, ResumenArchivado
+        from moviegame.services.archivo import _escribir, archivar, leer_archivo, rehidratar
+
+        antes = self._stats()
+        informe = archivar(self.corte, self.dir, lote=2)
+        self.assertEqual((informe.partidas, informe.intentos), (3, 6))
+        self.assertEqual(Partida.objects.count(), 1)
+        self.assertEqual(Intento.objects.count(), 2)
+        self.assertEqual(self._stats(), antes)
+        self.assertEqual(ResumenArchivado.objects.get().distribucion, {"1": 1, "2": 1})
+
+        # Un archivado interrumpido reescribe partidas: los lectores no duplican
+        archivadas = list(leer_archivo(directorio=self.dir))
+        _escribir(Path(self.dir), archivadas[:2])
+        self.assertEqual(list(leer_archivo(directorio=self.dir)), archivadas)
+        self.assertEqual(
+            len(list(leer_archivo(jugador_id=self.user.jugador.pk, desde=self.corte, directorio=self.dir))), 0
+        )
+
+        with self.settings(MOVIDLE_ARCHIVO_DIR=Path(self.dir)):
+            solo_bd = self.client.get(reverse("moviegame:api_historial")).json()["partidas"]
+            todo = self.client.get(reverse("moviegame:api_historial"), {"archivo": "1"}).json()["partidas"]
+        self.assertEqual(len(solo_bd), 1)
+        self.assertEqual([p["archivada"] for p in todo], [False, True, True, True])
+        self.assertEqual([p["intentos"] for p in todo], [2, 1, 3, 2])
+
+        for fichero in sorted(Path(self.dir).glob("*.jsonl.gz")):
+            anio, mes = map(int, fichero.name[9:16].split("-"))
+            with self.captureOnCommitCallbacks(execute=True):
+                rehidratar(anio, mes, self.dir)
+        self.assertEqual(Partida.objects.count(), 4)
+        self.assertEqual(Intento.objects.count(), 8)
+        self.assertEqual(ResumenArchivado.objects.get().partidas, 0)
+        self.assertEqual(self._stats(), antes)
+        self.assertEqual(list(Path(self.dir).iterdir()), [])
+
+    def test_ida_y_vuelta_conserva_cierre_de_partida(self):
+        import gzip
+        import json as json_
+        from datetime import timedelta
+        from pathlib import Path
+        from django.utils import timezone
+        from moviegame.models import Partida
+        from moviegame.services.archivo import archivar, rehidratar
+
+        momento = timezone.now().replace(microsecond=0) - timedelta(days=380)
+        for p in Partida.objects.all():
+            p.intentos_usados = p.intentos.count()
+            p.terminado_en = momento + timedelta(hours=p.pk)
+            p.save(update_fields=["intentos_usados", "terminado_en"])
+        antes = dict(Partida.objects.values_list("pk", "intentos_usados"))
+        cierres = dict(Partida.objects.values_list("pk", "terminado_en"))
+
+        archivar(self.corte, self.dir)
+        ficheros = sorted(Path(self.dir).glob("*.jsonl.gz"))
+        # El más antiguo se reescribe en el formato previo (sin los campos)
+        with gzip.open(ficheros[0], "rt") as fh:
+            viejos = [json_.loads(linea) for linea in fh]
+        with gzip.open(ficheros[0], "wt") as fh:
+            for r in viejos:
+                r.pop("usados"), r.pop("terminado")
+                fh.write(json_.dumps(r) + "\n")
+
+        for fichero in ficheros:
+            anio, mes = map(int, fichero.name[9:16].split("-"))
+            with self.captureOnCommitCallbacks(execute=True):
+                rehidratar(anio, mes, self.dir)
+        viejo_ids = {r["id"] for r in viejos}
+        for p in Partida.objects.all():
+            self.assertEqual(p.intentos_usados, antes[p.pk])
+            if p.pk in viejo_ids:  # deducido del último intento
+                self.assertEqual(p.terminado_en, p.intentos.order_by("-numero_intento")[0].creado_en)
+            else:
+                self.assertEqual(p.terminado_en, cierres[p.pk])
+
+    def test_rehidratar_conserva_lo_que_no_se_puede_restaurar(self):
+        from pathlib import Path
+        from moviegame.models import Partida, ResumenArchivado
+        from moviegame.services.archivo import archivar, leer_archivo, rehidratar
+
+        archivar(self.corte, self.dir)
+        # La partida perdida de hace 370 días intentó Heat, que ya no existe
+        Pelicula.objects.filter(titulo="Heat").delete()
+        informes = []
+        for fichero in sorted(Path(self.dir).glob("*.jsonl.gz")):
+            anio, mes = map(int, fichero.name[9:16].split("-"))
+            with self.captureOnCommitCallbacks(execute=True):
+                informes.append(rehidratar(anio, mes, self.dir))
+        self.assertEqual(sum(i.restauradas for i in informes), 2)
+        self.assertEqual(sum(i.omitidas for i in informes), 1)
+        self.assertEqual(Partida.objects.count(), 3)
+        quedan = list(leer_archivo(directorio=self.dir))
+        self.assertEqual([r["estado"] for r in quedan], ["PERDIDA"])
+        self.assertEqual(len(list(Path(self.dir).iterdir())), 1)
+        self.assertEqual(ResumenArchivado.objects.get().partidas, 1)
+
+    def test_comando_simular_no_mueve_nada(self):
+        from django.core.management import call_command
+        from moviegame.models import Partida
+
+        out = io.StringIO()
+        call_command(
+            "archivar_partidas", "--antes-de", self.corte.isoformat(),
+            "--directorio", self.dir, "--simular", stdout=out,
+        )
+        self.assertIn("Se archivarían 3 partidas y 6 intentos", out.getvalue())
+        self.assertEqual(Partida.objects.count(), 4)
+
+
+class RachasTest(TestCase):
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+
+        self.pelis = crear_peliculas_de_juego()
+        self.hoy = date.today()
+        self.dia = lambda n: self.hoy - timedelta(days=n)
+        self.jugadores = [User.objects.create_user(u, password="x").jugador for u in ("ana", "beto", "carla")]
+
+    def _partidas(self, jugador, *dias_estado):
+        from moviegame.models import Partida
+
+        for dias, estado in dias_estado:
+            Partida.objects.create(
+                jugador=jugador, pelicula_secreta=self.pelis[0], fecha=self.dia(dias), estado=estado
+            )
+
+    def test_calcular(self):
+        from moviegame.services.rachas import calcular
+
+        G, P, C = "GANADA", "PERDIDA", "EN_CURSO"
+        casos = [
+            ([(5, G), (4, G), (3, P), (2, G), (1, G), (0, C)], (2, 2)),
+            ([(6, G), (5, G), (4, G), (1, G), (0, G)], (2, 3)),  # días sin jugar cortan
+            ([(4, G), (3, G)], (0, 2)),  # ayer no jugó
+            ([(2, G), (1, C)], (0, 1)),  # partida de ayer sin terminar
+        ]
+        for partidas, esperado in casos:
+            with self.subTest(partidas=partidas):
+                self.assertEqual(calcular([(self.dia(d), e) for d, e in partidas], self.hoy), esperado)
+
+    def test_recalculo_completo_y_cierre_nocturno(self):
+        from django.core.management import call_command
+        from moviegame.models import Jugador
+
+        ana, beto, carla = self.jugadores
+        self._partidas(ana, (3, "GANADA"), (2, "GANADA"), (1, "GANADA"))
+        self._partidas(beto, (5, "GANADA"), (4, "GANADA"), (1, "GANADA"))
+        # Rachas infladas por el bug anterior (no cortaba al saltarse días)
+        Jugador.objects.filter(pk=beto.pk).update(racha_actual=3, racha_maxima=3)
+        Jugador.objects.filter(pk=carla.pk).update(racha_actual=4, racha_maxima=4)
+
+        out = io.StringIO()
+        call_command("recalcular_rachas", "--completo", "--lote", "2", stdout=out)
+        self.assertIn("3 jugadores revisados, 3 actualizados", out.getvalue())
+        rachas = dict(Jugador.objects.values_list("pk", "racha_actual"))
+        self.assertEqual(rachas, {ana.pk: 3, beto.pk: 1, carla.pk: 0})
+        self.assertEqual(Jugador.objects.get(pk=beto.pk).racha_maxima, 2)
+
+        # Cierre de ayer: quien tiene racha ganó ayer, nada que cortar.
+        # Cierre de hoy: ana ganó hoy y la conserva; beto la pierde
+        from moviegame.services.rachas import cerrar_dia
+
+        self.assertEqual(cerrar_dia(self.dia(1)), 0)
+        self._partidas(ana, (0, "GANADA"))
+        self.assertEqual(cerrar_dia(self.hoy), 1)
+        rachas = dict(Jugador.objects.values_list("pk", "racha_actual"))
+        self.assertEqual(rachas, {ana.pk: 3, beto.pk: 0, carla.pk: 0})
+
+    def test_ganar_tras_saltarse_un_dia_reinicia_la_racha(self):
+        from moviegame.models import Jugador, PeliculaDelDia
+        from moviegame.services.game_service import registrar_intento
+
+        ana = self.jugadores[0]
+        self._partidas(ana, (3, "GANADA"), (2, "GANADA"))
+        Jugador.objects.filter(pk=ana.pk).update(racha_actual=2, racha_maxima=2)
+        PeliculaDelDia.objects.create(pelicula=self.pelis[0], fecha=self.hoy)
+        registrar_intento(ana, self.pelis[0])
+        ana.refresh_from_db()
+        self.assertEqual((ana.racha_actual, ana.racha_maxima), (1, 2))
+
+
+class ClasificacionTest(TestCase):
+    def tearDown(self):
+        from moviegame.services import clasificacion
+
+        clasificacion.reiniciar()
+
+    def test_lista_ordenada_contra_sorted(self):
+        import random
+        from moviegame.services import clasificacion
+        from moviegame.services.clasificacion import ListaOrdenada
+
+        rnd = random.Random(1)
+        viejo, clasificacion.CARGA = clasificacion.CARGA, 4  # fuerza muchos cubos
+        try:
+            lista, ref = ListaOrdenada(rnd.sample(range(1000), 30)), None
+            ref = sorted(lista[k] for k in range(len(lista)))
+            for _ in range(600):
+                x = rnd.randrange(1000)
+                if x in ref:
+                    lista.quitar(x)
+                    ref.remove(x)
+                else:
+                    lista.agregar(x)
+                    ref.append(x)
+                    ref.sort()
+                self.assertEqual(len(lista), len(ref))
+                self.assertEqual(lista.posicion(x), ref.index(x) if x in ref else sum(v < x for v in ref))
+            self.assertEqual([lista[k] for k in range(len(lista))], ref)
+        finally:
+            clasificacion.CARGA = viejo
+
+    def test_diaria_se_actualiza_al_terminar_y_sobrevive_al_snapshot(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from moviegame.models import Partida, PeliculaDelDia
+        from moviegame.services import clasificacion
+        from moviegame.services.game_service import registrar_intento
+
+        pelis = crear_peliculas_de_juego()
+        PeliculaDelDia.objects.create(pelicula=pelis[0])
+        users = [User.objects.create_user(f"u{i}", password="x") for i in range(4)]
+        # u0 ya terminó hoy (otro proceso), antes de que este cargue nada
+        Partida.objects.create(
+            jugador=users[0].jugador, pelicula_secreta=pelis[0], estado="GANADA",
+            intentos_usados=3, terminado_en=timezone.now() - timedelta(hours=1),
+        )
+        c = clasificacion.clasificaciones()
+        self.assertEqual(len(c.tablero("diaria")), 1)
+
+        # Terminadas en este proceso: se aplican al hacer commit
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_intento(users[1].jugador, pelis[1])
+            registrar_intento(users[1].jugador, pelis[0])  # gana en 2
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_intento(users[2].jugador, pelis[0])  # gana en 1
+        t = c.tablero("diaria")
+        self.assertEqual([t.posicion(u.jugador.pk) for u in users], [3, 2, 1, None])
+
+        self.client.force_login(users[1])
+        r = self.client.get(reverse("moviegame:api_clasificacion"), {"tipo": "diaria"}).json()
+        self.assertEqual((r["total"], r["posicion"]), (3, 2))
+        self.assertEqual([f["jugador"] for f in r["top"]], ["u2", "u1", "u0"])
+        self.assertEqual([f["intentos"] for f in r["top"]], [1, 2, 3])
+        r = self.client.get(reverse("moviegame:api_clasificacion"), {"tipo": "rachas"}).json()
+        # u0 no tiene racha guardada; u1 y u2 empatan a 1 y desempata el id
+        self.assertEqual((r["total"], r["posicion"]), (2, 1))
+
+        # Un proceso nuevo arranca del snapshot y recoge lo posterior
+        clasificacion.guardar_snapshot()
+        clasificacion.reiniciar()
+        Partida.objects.create(
+            jugador=users[3].jugador, pelicula_secreta=pelis[0], estado="PERDIDA",
+            intentos_usados=10, terminado_en=timezone.now(),
+        )
+        t = clasificacion.clasificaciones().tablero("diaria")
+        self.assertEqual([t.posicion(u.jugador.pk) for u in users], [3, 2, 1, 4])
+        self.assertEqual(clasificacion.reconstruir().tablero("diaria").claves(), t.claves())
+
+
+class RepeticionTest(TestCase):
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from moviegame.models import PeliculaDelDia
+
+        self.pelis = crear_peliculas_de_juego()
+        hoy = date.today()
+        self.ayer = hoy - timedelta(days=1)
+        PeliculaDelDia.objects.create(fecha=self.ayer, pelicula=self.pelis[1])
+        PeliculaDelDia.objects.create(fecha=hoy, pelicula=self.pelis[0])
+        self.user = User.objects.create_user("ana", password="x")
+        self.client.force_login(self.user)
+
+    def _intento(self, fecha, peli):
+        return self.client.post(
+            reverse("moviegame:api_repeticion_intentos", args=[fecha.isoformat()]),
+            {"pelicula_id": peli.id},
+        )
+
+    def test_pelicula_fuera_del_catalogo_compilado(self):
+        from moviegame.services import solver
+
+        solver.catalogo()
+        # Alta desde otro proceso: sin señales, este no ha recompilado
+        nueva = Pelicula.objects.bulk_create([Pelicula(titulo="Nueva", anio=2024)])[0]
+        r = self._intento(self.ayer, nueva)
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["error"], "Película no encontrada")
+
+    def test_jugar_dia_pasado_sin_tocar_el_diario(self):
+        from moviegame.models import Intento, Partida
+        from moviegame.services.game_service import registrar_intento
+        from moviegame.services.rachas import calcular
+
+        r = self.client.get(reverse("moviegame:api_repeticiones")).json()
+        self.assertEqual(r["dias"], [{"fecha": self.ayer.isoformat(), "estado": None}])
+
+        fallo = self._intento(self.ayer, self.pelis[0]).json()
+        # Mismo feedback que daría el juego diario con esa secreta
+        self.assertEqual((fallo["colorAño"], fallo["arrowAño"]), ("AMARILLO", "UP"))
+        self.assertEqual(fallo["colorDirector"], "VERDE")
+        self.assertEqual(fallo["estadoPartida"], "EN_CURSO")
+        # Sesión, usuario, película y jugador + savepoint×2 + 4 de la repetición:
+        # ni PeliculaDelDia ni la secreta (calendario y catálogo en memoria)
+        with self.assertNumQueries(10):
+            acierto = self._intento(self.ayer, self.pelis[1]).json()
+        self.assertEqual(acierto["estadoPartida"], "GANADA")
+        self.assertEqual(acierto["revealTitle"], self.pelis[1].titulo)
+
+        estado = self.client.get(
+            reverse("moviegame:api_repeticion_estado", args=[self.ayer.isoformat()])
+        ).json()
+        self.assertEqual([i["esCorrecto"] for i in estado["intentos"]], [False, True])
+        self.assertEqual(self._intento(self.ayer, self.pelis[2]).status_code, 400)
+
+        # Nada en las tablas del juego diario; hoy y mañana no se repiten
+        self.assertFalse(Partida.objects.exists() or Intento.objects.exists())
+        self.user.jugador.refresh_from_db()
+        self.assertEqual(self.user.jugador.racha_actual, 0)
+        self.assertEqual(self._intento(self.ayer.replace(year=2000), self.pelis[0]).status_code, 400)
+        hoy = self.ayer.fromordinal(self.ayer.toordinal() + 1)
+        self.assertEqual(self._intento(hoy, self.pelis[0]).status_code, 400)
+
+    def test_calendario_se_invalida_con_la_programacion(self):
+        from moviegame.models import PeliculaDelDia
+        from moviegame.services import repeticiones
+
+        self.assertEqual(repeticiones.fechas_jugables(), [self.ayer])
+        with self.assertNumQueries(0):
+            repeticiones.secreta_de(self.ayer)
+        PeliculaDelDia.objects.filter(fecha=self.ayer).update(pelicula=self.pelis[2])
+        self.assertEqual(repeticiones.secreta_de(self.ayer), self.pelis[1].id)  # update() no avisa
+        PeliculaDelDia.objects.get(fecha=self.ayer).save()
+        self.assertEqual(repeticiones.secreta_de(self.ayer), self.pelis[2].id)
+
+
+class PracticaTest(TestCase):
+    def test_alias_respeta_los_pesos(self):
+        import random
+        from collections import Counter
+        from moviegame.services.practica import Alias
+
+        alias, rnd = Alias([1, 2, 7, 0]), random.Random(3)
+        cuenta = Counter(alias.muestra(rnd) for _ in range(20000))
+        self.assertEqual(cuenta[3], 0)
+        for i, p in enumerate((0.1, 0.2, 0.7)):
+            self.assertAlmostEqual(cuenta[i] / 20000, p, delta=0.015)
+
+    def test_catalogo_vacio_responde_503(self):
+        r = self.client.post(reverse("moviegame:api_practica"))
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(r.json()["error"], "No hay películas para practicar.")
+
+    def test_partida_sin_bd_con_token_firmado(self):
+        from moviegame.models import Intento, Partida
+        from moviegame.services import practica
+
+        pelis = crear_peliculas_de_juego()
+        practica.catalogo_practica()  # compilado una vez por versión
+        token = self.client.post(reverse("moviegame:api_practica")).json()["token"]
+        estado = practica.leer(token)
+        # El token no va cifrado: la secreta viaja enmascarada
+        from django.core import signing
+
+        self.assertNotEqual(signing.loads(token, salt=practica.SALT)["s"], estado.secreta_id)
+
+        otra = next(p for p in pelis if p.id != estado.secreta_id)
+        url = reverse("moviegame:api_practica_intentos")
+        with self.assertNumQueries(0):
+            r = self.client.post(url, {"token": token, "pelicula_id": otra.id}).json()
+        self.assertEqual(r["estadoPartida"], "EN_CURSO")
+        self.assertEqual(r["valAño"], otra.anio)
+        r2 = self.client.post(url, {"token": r["token"], "pelicula_id": estado.secreta_id}).json()
+        self.assertEqual((r2["estadoPartida"], r2["numero_intento"]), ("GANADA", 2))
+        self.assertIn("revealTitle", r2)
+        self.assertEqual(self.client.post(url, {"token": r2["token"], "pelicula_id": otra.id}).status_code, 400)
+
+        # Token manipulado o repetir película
+        falso = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+        self.assertEqual(self.client.post(url, {"token": falso, "pelicula_id": otra.id}).status_code, 400)
+        r3 = self.client.post(url, {"token": r["token"], "pelicula_id": otra.id})
+        self.assertEqual(r3.json()["error"], "Ya intentaste esa película en esta partida.")
+        self.assertFalse(Partida.objects.exists() or Intento.objects.exists())
+
+
+@override_settings(
+    SESSION_ENGINE="moviegame.sesiones",
+    AUTHENTICATION_BACKENDS=[
+        "moviegame.backends.BackendCacheado",
+        "django.contrib.auth.backends.ModelBackend",
+    ],
+)
+class SesionCacheadaTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        crear_peliculas_de_juego()
+        self.user = User.objects.create_user("ana", password="x")
+        self.client.force_login(self.user)
+
+    def test_peticion_autenticada_sin_sesion_ni_usuario_en_bd(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = reverse("moviegame:api_estado")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        sql = " ".join(q["sql"] for q in consultas)
+        for tabla in ("django_session", "auth_user", "moviegame_jugador"):
+            self.assertNotIn(tabla, sql)
+
+    def test_escritura_diferida_de_la_sesion(self):
+        from django.contrib.sessions.models import Session
+        from django.test import override_settings
+        from moviegame.sesiones import SessionStore, volcar_pendientes
+
+        with override_settings(MOVIDLE_SESION_ESCRITURA_SEG=300):
+            sesion = SessionStore(self.client.session.session_key)
+            sesion["tema"] = "oscuro"
+            sesion.save()
+            self.assertNotIn("tema", Session.objects.get(pk=sesion.session_key).get_decoded())
+            self.assertEqual(SessionStore(sesion.session_key)["tema"], "oscuro")
+            # El volcador del proceso escribe los cambios pendientes
+            self.assertEqual(volcar_pendientes(), 1)
+        self.assertEqual(Session.objects.get(pk=sesion.session_key).get_decoded()["tema"], "oscuro")
+
+    def test_login_llega_a_la_bd_y_sobrevive_a_vaciar_la_cache(self):
+        from django.contrib.auth.models import User
+        from django.test import Client
+
+        User.objects.create_user("beto", password="clave-larga-1")
+        cliente = Client()
+        r = cliente.post(reverse("moviegame:login"), {"username": "beto", "password": "clave-larga-1"})
+        self.assertEqual(r.status_code, 302)
+        cache.clear()
+        self.assertEqual(cliente.get(reverse("moviegame:api_estado")).status_code, 200)
+
+    def test_rachas_masivas_invalidan_el_usuario(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from moviegame.backends import BackendCacheado
+        from moviegame.models import Jugador
+        from moviegame.services.rachas import cerrar_dia
+
+        backend = BackendCacheado()
+        Jugador.objects.filter(user=self.user).update(racha_actual=4)
+        backend.get_user(self.user.pk)  # se cachea tras el UPDATE, sin señal
+        self.assertEqual(backend.get_user(self.user.pk).jugador.racha_actual, 4)
+        with self.assertNumQueries(0):
+            backend.get_user(self.user.pk)
+
+        self.assertEqual(cerrar_dia(timezone.localdate() - timedelta(days=1)), 1)
+        self.assertEqual(backend.get_user(self.user.pk).jugador.racha_actual, 0)
+
+        jugador = self.user.jugador
+        jugador.racha_maxima = 9
+        jugador.save()
+        self.assertEqual(backend.get_user(self.user.pk).jugador.racha_maxima, 9)
+
+
+class SnapshotCatalogoTest(TestCase):
+    def setUp(self):
+        import random
+        import tempfile
+        from moviegame.benchmarks.datos import generar_peliculas
+
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        pelis = generar_peliculas(80, random.Random(5))
+        # Casos límite: sin rating (no jugable), sin géneros, título con acentos
+        Pelicula.objects.filter(pk=pelis[2].pk).update(imdb_rating=None)
+        Pelicula.objects.filter(pk=pelis[3].pk).update(genero="", titulo="Ámbar y Óxido")
+        self.ruta = f"{self.dir.name}/catalogo.bin"
+        ajustes = self.settings(MOVIDLE_CATALOGO_SNAPSHOT=self.ruta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_solver_desde_el_mmap_equivale_a_la_bd(self):
+        from moviegame.models import Feedback
+        from moviegame.services import snapshot_catalogo, solver
+
+        bd = solver.CatalogoCompilado(
+            list(Pelicula.objects.order_by("id")), snapshot_catalogo.catalog_version()
+        )
+        inf = snapshot_catalogo.compilar()
+        self.assertEqual((inf.peliculas, inf.jugables), (80, 79))
+        with self.assertNumQueries(0):
+            cat = solver.catalogo()
+        self.assertIsInstance(cat.anios, memoryview)
+        self.assertEqual(list(cat.ids), bd.ids)
+        for g in range(cat.n):
+            for s in range(cat.n):
+                self.assertEqual(cat.patron(g, s), bd.patron(g, s))
+            for s in (0, 2, 3, 40):
+                fb = Feedback(*bd.patron(g, s))
+                self.assertEqual(cat.mascara(g, fb), bd.mascara(g, fb))
+
+    def test_autocompletar_y_publicacion_atomica(self):
+        from django.contrib.auth.models import User
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from moviegame.services import snapshot_catalogo
+        from moviegame.services.catalog_cache import bump_catalog_version
+
+        self.client.force_login(User.objects.create_user("ana", password="x"))
+        url = reverse("moviegame:api_autocomplete")
+        consultas = ("a", "st", "ÁMBAR", "xido", "zzz", "e 1")
+        esperado = {q: self.client.get(url, {"q": q, "limit": 7}).json() for q in consultas}
+
+        snapshot_catalogo.compilar()
+        viejo = snapshot_catalogo.vigente()
+        for q in consultas:
+            with self.subTest(q=q), CaptureQueriesContext(connection) as consultas_bd:
+                self.assertEqual(self.client.get(url, {"q": q, "limit": 7}).json(), esperado[q])
+            # Solo sesión y usuario: las películas salen del mmap
+            self.assertNotIn("moviegame_pelicula", " ".join(c["sql"] for c in consultas_bd))
+
+        # Un cambio en el catálogo deja el snapshot antiguo fuera de uso...
+        bump_catalog_version()
+        self.assertIsNone(snapshot_catalogo.vigente())
+        # ...hasta publicar otro: se remapea y el anterior sigue siendo legible
+        snapshot_catalogo.compilar()
+        nuevo = snapshot_catalogo.vigente()
+        self.assertIsNot(nuevo, viejo)
+        self.assertEqual(nuevo.version, viejo.version + 1)
+        self.assertEqual(viejo.titulos[0], nuevo.titulos[0])
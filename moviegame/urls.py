@@ -13,8 +13,22 @@ urlpatterns = [
     path("how-to/", views.howto_view, name="howto"),
     path("panel/", views.admin_dashboard, name="admin_dashboard"),
     path("panel/set-daily/", views.admin_set_daily, name="admin_set_daily"),
+    path("metrics/", views.metrics_view, name="metrics"),
     # API
     path("api/intentos/", views.api_intentos, name="api_intentos"),
+    path("api/estado/", views.api_estado, name="api_estado"),
+    path("api/pista/", views.api_pista, name="api_pista"),
+    path("api/historial/", views.api_historial, name="api_historial"),
+    path("api/clasificacion/", views.api_clasificacion, name="api_clasificacion"),
+    path("api/practica/", views.api_practica, name="api_practica"),
+    path("api/practica/intentos/", views.api_practica_intentos, name="api_practica_intentos"),
+    path("api/repeticion/", views.api_repeticiones, name="api_repeticiones"),
+    path("api/repeticion/<str:fecha>/", views.api_repeticion_estado, name="api_repeticion_estado"),
+    path(
+        "api/repeticion/<str:fecha>/intentos/",
+        views.api_repeticion_intentos,
+        name="api_repeticion_intentos",
+    ),
     path("api/autocomplete/", views.api_autocomplete, name="api_autocomplete"),
     # Auth
     path(
@@ -30,6 +44,11 @@ urlpatterns = [
         name="logout",
     ),
     path("api/public/movies/", views.api_public_movies, name="api_public_movies"),
+    path(
+        "api/public/movies/batch/",
+        views.api_public_movies_batch,
+        name="api_public_movies_batch",
+    ),
     path("api-info/", api_info, name="api_info"),
     path("productos-aliados/", views.productos_aliados, name="productos_aliados"),
     path("export/peliculas/", export_peliculas, name="export_peliculas"),
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-import requests
+import json
+from datetime import date
+from collections import Counter
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import cache
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.models import User
 from django.shortcuts import render, redirect, get_object_or_404, resolve_url
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseServerError, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponseBadRequest, HttpResponseServerError, HttpResponse
 from django.views.decorators.http import require_POST
 from django.db.models import Count
 from django.utils import timezone
@@ -14,9 +20,15 @@ from django.urls import reverse_lazy, reverse
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
-from django.db.models import Q
 
 from .services.reports.registry import get_report
+from .services.catalog_cache import peliculas_en_lote, MAX_LOTE
+from .services.metrics import registro as registro_metricas
+from .services.home_cache import grid_famosas
+from .services.aliados import aobtener_productos
+from .services import clasificacion, practica, repeticiones, snapshot_catalogo, solver
+from .services.archivo import historial_jugador
+from .decorators import cache_pagina_anonima, login_requerido_async
 
 from .models import (
     Pelicula,
@@ -26,10 +38,16 @@ from .models import (
     Intento,
     EstadoPartida,
     PeliculaDelDia,
+    Repeticion,
+    ResumenArchivado,
 )
 from .services.game_service import (
+    ResultadoIntento,
     registrar_intento,
     seleccionar_pelicula_diaria,
+    invalidar_pelicula_diaria,
+    obtener_partida,
+    fin_del_dia,
     MAX_INTENTOS,
 )
 
@@ -44,37 +62,14 @@ from .services.game_service import (
 def home_view(request):
     """
     Landing: mensaje + posters famosos + CTA.
-    Enviamos 'famous_movies' con lo más conocido (votos/rating) y con poster.
+    El grid de posters viene ya renderizado de la caché (por idioma y versión
+    de catálogo, rotando entre varias variantes): no consulta la BD.
     """
-    # Ajusta el límite como prefieras (entre 6–18 luce bien con el layout)
-    limit = 12
-
-    famous_qs = (
-        Pelicula.objects
-        .filter(
-            ~Q(poster_url__isnull=True),
-            ~Q(poster_url__exact=""),
-            imdb_votes__isnull=False,
-        )
-        .order_by("-imdb_votes", "-imdb_rating")[:limit]
-        .only("id", "titulo", "anio", "poster_url", "imdb_votes", "imdb_rating")
-    )
-
-    # Normalizamos a un dict simple que el template consume directo
-    famous_movies = [
-        {
-            "title": m.titulo,
-            "year": m.anio,
-            "poster_url": m.poster_url,
-        }
-        for m in famous_qs
-    ]
-
     return render(
         request,
         "moviegame/home.html",
         {
-            "famous_movies": famous_movies,
+            "famous_grid": grid_famosas(),
         },
     )
 
@@ -144,19 +139,16 @@ def game_view(request):
             },
         )
 
-    partida, _ = Partida.objects.get_or_create(
-        jugador=jugador,
-        fecha=fecha,
-        defaults={"pelicula_secreta": secreta, "intentos_maximos": MAX_INTENTOS},
-    )
+    partida = obtener_partida(jugador, fecha, secreta)
 
-    guess_now = partida.intentos.count() + 1
+    estado = _estado_juego(partida)
     return render(
         request,
         "moviegame/game.html",
         {
-            "guess_now": guess_now,
+            "guess_now": len(estado["intentos"]) + 1,
             "max_intentos": MAX_INTENTOS,
+            "estado_juego": estado,
         },
     )
 
@@ -168,12 +160,20 @@ def stats_view(request):
     partidas = jugador.partidas.all()
     ganadas = partidas.filter(estado=EstadoPartida.GANADA).count()
     perdidas = partidas.filter(estado=EstadoPartida.PERDIDA).count()
-    distribucion = (
-        Intento.objects.filter(partida__jugador=jugador, feedback__es_correcto=True)
-        .values("numero_intento")
-        .annotate(cnt=Count("id"))
-        .order_by("numero_intento")
+    distribucion = Counter(
+        dict(
+            Intento.objects.correctos()
+            .filter(partida__jugador=jugador)
+            .values_list("numero_intento")
+            .annotate(cnt=Count("id"))
+        )
     )
+    # Lo ya movido al archivo en frío cuenta igual (services/archivo.py)
+    resumen = ResumenArchivado.objects.filter(jugador=jugador).first()
+    if resumen:
+        ganadas += resumen.ganadas
+        perdidas += resumen.perdidas
+        distribucion.update({int(n): c for n, c in resumen.distribucion.items()})
     return render(
         request,
         "moviegame/stats.html",
@@ -181,7 +181,9 @@ def stats_view(request):
             "jugador": jugador,
             "ganadas": ganadas,
             "perdidas": perdidas,
-            "distribucion": list(distribucion),
+            "distribucion": [
+                {"numero_intento": n, "cnt": distribucion[n]} for n in sorted(distribucion)
+            ],
         },
     )
 
@@ -245,14 +247,231 @@ def admin_set_daily(request):
 
     fecha = timezone.localdate()
     PeliculaDelDia.objects.update_or_create(fecha=fecha, defaults={"pelicula": peli})
+    invalidar_pelicula_diaria()
     return redirect("moviegame:admin_dashboard")
 
 
+@user_passes_test(_es_staff)
+def metrics_view(request):
+    """Métricas del proceso en formato de texto de Prometheus (solo staff)."""
+    return HttpResponse(
+        registro_metricas.exportar(), content_type="text/plain; version=0.0.4"
+    )
+
+
 # --------------------------
 #  API
 # --------------------------
 
 
+def _valores_pelicula(peli: Pelicula) -> dict:
+    """Valores (pistas) de la película intentada, tal como los pinta game.html."""
+    return {
+        "valAño": int(peli.anio) if peli.anio is not None else None,
+        "valPopularidad": int(peli.imdb_votes or 0),
+        "valGeneros": ", ".join(peli.lista_generos()),
+        "valDuración": int(peli.duracion_min or 0),
+        "valDirector": peli.director,
+        "valActores": ", ".join(peli.lista_actores()),
+        "valRating": (
+            float(peli.imdb_rating) if peli.imdb_rating is not None else None
+        ),
+    }
+
+
+def _colores_feedback(fb: Feedback) -> dict:
+    return {
+        "colorAño": fb.color_anio,
+        "arrowAño": fb.flecha_anio,
+        "colorPopularidad": fb.color_popularidad,
+        "arrowPopularidad": fb.flecha_popularidad,
+        "colorGeneros": fb.color_genero,
+        "colorDuración": fb.color_duracion,
+        "arrowDuración": fb.flecha_duracion,
+        "colorDirector": fb.color_direccion,
+        "colorActores": fb.color_actores,
+        "colorRating": fb.color_rating,
+    }
+
+
+def _reveal(s: Pelicula) -> dict:
+    return {
+        "revealTitle": s.titulo,
+        "revealAño": s.anio,
+        "revealPoster": s.poster_url,
+    }
+
+
+def _estado_juego(partida: Partida | None) -> dict:
+    """
+    Estado completo de la partida del día (para restaurar game.html).
+    Usa como máximo dos consultas: la partida ya viene cargada y los intentos
+    se traen con su feedback (empaquetado en la fila) y película en una sola.
+    """
+    if partida is None:
+        return {
+            "estadoPartida": EstadoPartida.EN_CURSO,
+            "intentosMaximos": MAX_INTENTOS,
+            "intentosRestantes": MAX_INTENTOS,
+            "intentos": [],
+        }
+
+    intentos = partida.intentos.select_related("pelicula_adivinada").order_by(
+        "numero_intento"
+    )
+    filas = []
+    for it in intentos:
+        fila = {
+            "numero_intento": it.numero_intento,
+            "titulo": it.pelicula_adivinada.titulo,
+            "esCorrecto": False,
+            **_valores_pelicula(it.pelicula_adivinada),
+        }
+        fb = it.feedback
+        if fb is not None:
+            fila.update(_colores_feedback(fb))
+            fila["esCorrecto"] = fb.es_correcto
+        filas.append(fila)
+
+    data = {
+        "fecha": partida.fecha.isoformat(),
+        "estadoPartida": partida.estado,
+        "intentosMaximos": partida.intentos_maximos,
+        "intentosRestantes": max(0, partida.intentos_maximos - len(filas)),
+        "intentos": filas,
+    }
+    if partida.estado != EstadoPartida.EN_CURSO:
+        data["intentosRestantes"] = 0
+        data.update(_reveal(partida.pelicula_secreta))
+    return data
+
+
+@login_required
+@require_GET
+def api_estado(request):
+    """Estado de la partida de hoy: intentos previos con su feedback y restantes."""
+    partida = (
+        Partida.objects.filter(jugador=request.user.jugador, fecha=timezone.localdate())
+        .select_related("pelicula_secreta")
+        .first()
+    )
+    return JsonResponse(_estado_juego(partida))
+
+
+@login_required
+@require_GET
+def api_historial(request):
+    """Partidas del jugador; con ?archivo=1 incluye también las archivadas."""
+    partidas = historial_jugador(
+        request.user.jugador, incluir_archivo=request.GET.get("archivo") == "1"
+    )
+    return JsonResponse({"partidas": partidas})
+
+
+def _fila_clasificacion(tipo: str, puesto: int, jid: int, clave: tuple, totales, nombres) -> dict:
+    fila = {"posicion": puesto, "jugador": nombres.get(jid, "")}
+    if tipo == "diaria":
+        fila["intentos"] = clave[0] if clave[0] <= MAX_INTENTOS else None
+    elif tipo == "rachas":
+        fila["racha"] = -clave[0]
+    else:
+        fila["ganadas"], fila["jugadas"] = totales[jid]
+    return fila
+
+
+@login_required
+@require_GET
+def api_clasificacion(request):
+    """
+    ?tipo=diaria|rachas|victorias (&fecha=YYYY-MM-DD para la diaria de ayer).
+    Top N, puesto del jugador y sus vecinos; todo en memoria.
+    """
+    tipo = request.GET.get("tipo", "diaria")
+    if tipo not in clasificacion.TIPOS:
+        return HttpResponseBadRequest("tipo inválido")
+    try:
+        n = max(1, min(int(request.GET.get("n", 10)), 50))
+        fecha = date.fromisoformat(request.GET["fecha"]) if "fecha" in request.GET else None
+    except ValueError:
+        return HttpResponseBadRequest("parámetros inválidos")
+
+    c = clasificacion.clasificaciones()
+    jid = request.user.jugador.pk
+    with c.lock:
+        t = c.tablero(tipo, fecha)
+        if t is None:
+            t = clasificacion.Tablero()
+        top = t.tramo(1, n)
+        puesto = t.posicion(jid)
+        vecinos = t.tramo(puesto - 2, puesto + 2) if puesto else []
+        total = len(t)
+        # Copia de [ganadas, jugadas]: `aplicar` los modifica desde otros hilos
+        totales = {j: tuple(c.totales[j]) for _, j, _ in top + vecinos} if tipo == "victorias" else {}
+    nombres = dict(
+        User.objects.filter(jugador__pk__in={j for _, j, _ in top + vecinos})
+        .values_list("jugador__pk", "username")
+    )
+
+    def filas(tramo):
+        return [_fila_clasificacion(tipo, p, j, k, totales, nombres) for p, j, k in tramo]
+
+    return JsonResponse(
+        {
+            "tipo": tipo,
+            "total": total,
+            "top": filas(top),
+            "posicion": puesto,
+            "vecinos": filas(vecinos),
+        }
+    )
+
+
+def _consumir_pista(user_id: int, fecha) -> int | None:
+    """Descuenta una pista del día; devuelve las que quedan o None si no hay."""
+    limite = getattr(settings, "MOVIDLE_PISTAS_POR_DIA", 3)
+    key = f"movidle:pistas:{user_id}:{fecha.isoformat()}"
+    cache.add(key, 0, timeout=int((fin_del_dia(fecha) - timezone.now()).total_seconds()) + 60)
+    usadas = cache.incr(key)
+    return None if usadas > limite else limite - usadas
+
+
+@login_required
+@require_GET
+def api_pista(request):
+    """
+    Sugiere el siguiente intento de la partida de hoy (solver por ganancia de
+    información). Limitado a MOVIDLE_PISTAS_POR_DIA por jugador y día.
+    """
+    fecha = timezone.localdate()
+    partida = Partida.objects.filter(jugador=request.user.jugador, fecha=fecha).first()
+    if partida is not None and partida.estado != EstadoPartida.EN_CURSO:
+        return JsonResponse({"error": "La partida del día ya finalizó."}, status=400)
+
+    restantes = _consumir_pista(request.user.pk, fecha)
+    if restantes is None:
+        return JsonResponse({"error": "No te quedan pistas por hoy."}, status=429)
+
+    cat = solver.catalogo()
+    pistas = solver.pistas_de_partida(partida) if partida else []
+    bits = solver.candidatos(cat, pistas)
+    sugerencias = solver.sugerir(cat, bits, excluir={pid for pid, _ in pistas})
+    return JsonResponse(
+        {
+            "candidatos": bits.bit_count(),
+            "sugerencias": [
+                {
+                    "id": s.pelicula_id,
+                    "titulo": s.titulo,
+                    "bits": s.bits,
+                    "esCandidata": s.es_candidata,
+                }
+                for s in sugerencias
+            ],
+            "pistasRestantes": restantes,
+        }
+    )
+
+
 @login_required
 @require_POST
 def api_intentos(request):
@@ -279,14 +498,11 @@ def api_intentos(request):
         .first()
     )
     if partida_existente and partida_existente.estado != EstadoPartida.EN_CURSO:
-        s = partida_existente.pelicula_secreta
         return JsonResponse(
             {
                 "error": "La partida del día ya finalizó.",
                 "estadoPartida": partida_existente.estado,
-                "revealTitle": s.titulo,
-                "revealAño": s.anio,
-                "revealPoster": s.poster_url,
+                **_reveal(partida_existente.pelicula_secreta),
                 "intentosRestantes": 0,
             },
             status=200,
@@ -316,67 +532,143 @@ def api_intentos(request):
         )
         payload = {"error": str(e)}
         if partida and partida.estado != EstadoPartida.EN_CURSO:
-            s = partida.pelicula_secreta
             payload.update(
                 {
                     "estadoPartida": partida.estado,
-                    "revealTitle": s.titulo,
-                    "revealAño": s.anio,
-                    "revealPoster": s.poster_url,
+                    **_reveal(partida.pelicula_secreta),
                     "intentosRestantes": 0,
                 }
             )
         return JsonResponse(payload, status=200)
 
+    return JsonResponse(_respuesta_intento(res, peli))
+
+
+def _respuesta_intento(res: ResultadoIntento, peli: Pelicula) -> dict:
     reveal = {}
     if res.estado_partida != EstadoPartida.EN_CURSO:
-        # Traemos la secreta para revelar
-        partida = Partida.objects.get(jugador=jugador, fecha=fecha)
-        s = partida.pelicula_secreta
-        reveal = {
-            "revealTitle": s.titulo,
-            "revealAño": s.anio,
-            "revealPoster": s.poster_url,
-        }
+        # La secreta ya viene cargada con el resultado
+        reveal = _reveal(res.pelicula_secreta)
 
+    return {
+        "numero_intento": res.numero_intento,
+        "intentosRestantes": res.intentos_restantes,
+        "estadoPartida": res.estado_partida,
+        "colorAño": res.color_anio,
+        "arrowAño": res.arrow_anio,
+        "colorPopularidad": res.color_popularidad,
+        "arrowPopularidad": res.arrow_popularidad,
+        "colorGeneros": res.color_genero,
+        "colorDuración": res.color_duracion,
+        "arrowDuración": res.arrow_duracion,
+        "colorDirector": res.color_direccion,
+        "colorActores": res.color_actores,
+        "colorRating": res.color_rating,
+        # ⬇⬇⬇  VALORES DEL INTENTO (PISTAS)  ⬇⬇⬇
+        **_valores_pelicula(peli),
+        **reveal,
+    }
+
+
+# --------------------------
+#  MODO PRÁCTICA (sin estado en el servidor)
+# --------------------------
+
+
+@require_POST
+def api_practica(request):
+    """Nueva partida de práctica: el estado va en el token que guarda el cliente."""
+    try:
+        token = practica.nueva_partida()
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=503)
+    return JsonResponse({"token": token, "intentosMaximos": MAX_INTENTOS})
+
+
+@require_POST
+def api_practica_intentos(request):
+    """Como api_intentos (mismas claves) más el token actualizado. Sin BD."""
+    try:
+        pid = int(request.POST.get("pelicula_id", ""))
+    except ValueError:
+        return HttpResponseBadRequest("Faltan parámetros")
+    try:
+        res, token, peli = practica.intentar(request.POST.get("token", ""), pid)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({**_respuesta_intento(res, peli), "token": token})
+
+
+# --------------------------
+#  MODO ARCHIVO (días pasados)
+# --------------------------
+
+
+def _fecha_repeticion(fecha: str) -> date:
+    try:
+        return date.fromisoformat(fecha)
+    except ValueError:
+        raise Http404("Fecha inválida")
+
+
+@login_required
+@require_GET
+def api_repeticiones(request):
+    """Días pasados que se pueden jugar y el estado del jugador en cada uno."""
+    estados = dict(request.user.jugador.repeticiones.values_list("fecha", "estado"))
     return JsonResponse(
         {
-            "numero_intento": res.numero_intento,
-            "intentosRestantes": res.intentos_restantes,
-            "estadoPartida": res.estado_partida,
-            "colorAño": res.color_anio,
-            "arrowAño": res.arrow_anio,
-            "colorPopularidad": res.color_popularidad,
-            "arrowPopularidad": res.arrow_popularidad,
-            "colorGeneros": res.color_genero,
-            "colorDuración": res.color_duracion,
-            "arrowDuración": res.arrow_duracion,
-            "colorDirector": res.color_direccion,
-            "colorActores": res.color_actores,
-            "colorRating": res.color_rating,
-            # ⬇⬇⬇  VALORES DEL INTENTO (PISTAS)  ⬇⬇⬇
-            "valAño": int(peli.anio) if peli.anio is not None else None,
-            "valPopularidad": int(peli.imdb_votes or 0),
-            "valGeneros": ", ".join(peli.lista_generos()),
-            "valDuración": int(peli.duracion_min or 0),
-            "valDirector": peli.director,
-            "valActores": ", ".join(peli.lista_actores()),
-            "valRating": (
-                float(peli.imdb_rating) if peli.imdb_rating is not None else None
-            ),
-            **reveal,
+            "dias": [
+                {"fecha": f.isoformat(), "estado": estados.get(f)}
+                for f in reversed(repeticiones.fechas_jugables())
+            ]
         }
     )
 
 
 @login_required
-def api_autocomplete(request):
+@require_GET
+def api_repeticion_estado(request, fecha):
+    """Como api_estado, para la repetición de un día pasado."""
+    dia = _fecha_repeticion(fecha)
+    try:
+        repeticiones.secreta_de(dia)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    rep = (
+        Repeticion.objects.filter(jugador=request.user.jugador, fecha=dia)
+        .select_related("pelicula_secreta")
+        .first()
+    )
+    return JsonResponse({"fecha": dia.isoformat(), **_estado_juego(rep)})
+
+
+@login_required
+@require_POST
+def api_repeticion_intentos(request, fecha):
+    """Como api_intentos (mismas claves), para la repetición de un día pasado."""
+    dia = _fecha_repeticion(fecha)
+    pid = request.POST.get("pelicula_id")
+    if not pid:
+        return HttpResponseBadRequest("Faltan parámetros")
+    peli = get_object_or_404(Pelicula, id=pid)
+    try:
+        res = repeticiones.registrar_intento_repeticion(request.user.jugador, dia, peli)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(_respuesta_intento(res, peli))
+
+
+@login_requerido_async
+async def api_autocomplete(request):
     """
     Sugerencias de películas (para el buscador del juego).
     - Prioriza títulos que EMPIEZAN por q, luego los que CONTIENEN q (sin duplicar).
     - Solo devuelve películas con datos suficientes para jugar.
     - Ordena por imdb_votes DESC para mostrar las más conocidas primero.
     Parámetros: q (texto), limit (por defecto 20)
+    Vista async: bajo ASGI no ocupa un hilo por petición.
+    Con un snapshot del catálogo vigente se resuelve sobre el mmap, sin BD.
     """
     q = (request.GET.get("q") or "").strip()
     try:
@@ -387,16 +679,22 @@ def api_autocomplete(request):
     if not q:
         return JsonResponse({"results": []})
 
+    snap = await snapshot_catalogo.avigente()
+    if snap is not None:
+        return JsonResponse({"results": snap.buscar(q, limit)})
+
     base = Pelicula.objects.filter(
         imdb_votes__isnull=False, imdb_rating__isnull=False
     ).order_by("-imdb_votes")
 
     # Empiezan por q
-    starts = list(
-        base.filter(titulo__istartswith=q).values("id", "titulo", "anio")[:limit]
-    )
+    results = [
+        r
+        async for r in base.filter(titulo__istartswith=q).values("id", "titulo", "anio")[
+            :limit
+        ]
+    ]
 
-    results = starts[:]
     if len(results) < limit:
         left = limit - len(results)
         contains = (
@@ -404,11 +702,12 @@ def api_autocomplete(request):
             .exclude(id__in=[r["id"] for r in results])
             .values("id", "titulo", "anio")[:left]
         )
-        results.extend(list(contains))
+        results.extend([r async for r in contains])
 
     return JsonResponse({"results": results})
 
 
+@cache_pagina_anonima()
 def howto_view(request):
     return render(request, "moviegame/howto.html")
 
@@ -446,7 +745,7 @@ def _movie_to_public_dict(m, request):
     }
 
 @require_GET
-def api_public_movies(request):
+async def api_public_movies(request):
 
     q = (request.GET.get("q") or "").strip()
     try:
@@ -469,13 +768,56 @@ def api_public_movies(request):
 
     qs = qs.order_by(*order_fields)[:limit]
 
-    results = [_movie_to_public_dict(m, request) for m in qs]
+    results = [_movie_to_public_dict(m, request) async for m in qs]
     data = {"provider": "Movidle", "count": len(results), "results": results}
 
     resp = JsonResponse(data, json_dumps_params={"ensure_ascii": False})
     resp["Access-Control-Allow-Origin"] = "*"
     return resp
 
+
+def _lista_param(request, nombre):
+    """Acepta ?ids=1,2,3 y/o ?ids=1&ids=2."""
+    valores = []
+    for raw in request.GET.getlist(nombre):
+        valores.extend(v.strip() for v in raw.split(",") if v.strip())
+    return valores
+
+
+@require_GET
+def api_public_movies_batch(request):
+    """
+    Consulta en lote por ids y/o imdb_ids (máx. MAX_LOTE en total).
+    Se sirve desde la caché en memoria id -> JSON serializado.
+    """
+    raw_ids = _lista_param(request, "ids")
+    imdb_ids = _lista_param(request, "imdb_ids")
+    if not raw_ids and not imdb_ids:
+        return HttpResponseBadRequest("Faltan ids o imdb_ids")
+    if len(raw_ids) + len(imdb_ids) > MAX_LOTE:
+        return HttpResponseBadRequest(f"Máximo {MAX_LOTE} elementos por consulta")
+    try:
+        ids = [int(v) for v in raw_ids]
+    except ValueError:
+        return HttpResponseBadRequest("ids debe ser una lista de enteros")
+
+    fragmentos, faltantes = peliculas_en_lote(ids, imdb_ids)
+    cabecera = json.dumps(
+        {
+            "provider": "Movidle",
+            "count": len(fragmentos),
+            "missing": faltantes,
+            "app_url": request.build_absolute_uri(reverse("moviegame:howto")),
+        },
+        ensure_ascii=False,
+    )
+    # Los fragmentos ya vienen serializados: solo los concatenamos
+    body = cabecera[:-1] + ', "results": [' + ", ".join(fragmentos) + "]}"
+
+    resp = HttpResponse(body, content_type="application/json")
+    resp["Access-Control-Allow-Origin"] = "*"
+    return resp
+
 # --- Página informativa/API Explorer ---------------------------------------
 from django.shortcuts import render
 from django.urls import reverse
@@ -484,11 +826,27 @@ from django.http import HttpRequest
 def _abs(request: HttpRequest, path: str) -> str:
     return request.build_absolute_uri(path)
 
-def api_info(request):
-    endpoints = {
-        "movies": _abs(request, reverse("moviegame:api_public_movies")),
 
-    }
+# Las URLs absolutas solo dependen de (esquema, host): se calculan una vez
+_endpoints_por_host: dict[tuple[str, str], dict] = {}
+
+
+def _endpoints(request: HttpRequest) -> dict:
+    clave = (request.scheme, request.get_host())
+    endpoints = _endpoints_por_host.get(clave)
+    if endpoints is None:
+        endpoints = {
+            "movies": _abs(request, reverse("moviegame:api_public_movies")),
+            "movies_batch": _abs(request, reverse("moviegame:api_public_movies_batch")),
+        }
+        if len(_endpoints_por_host) < 32:  # hosts válidos: pocos (ALLOWED_HOSTS)
+            _endpoints_por_host[clave] = endpoints
+    return endpoints
+
+
+@cache_pagina_anonima()
+def api_info(request):
+    endpoints = _endpoints(request)
     ctx = {
         "endpoints": endpoints,
         "sample_movies_url": f'{endpoints["movies"]}?limit=12',
@@ -497,34 +855,18 @@ def api_info(request):
 
 # ---------------- API DE ALIADOS ----------------------
 
-API_BASE = "https://ctrlstore-service-420478585093.us-central1.run.app"
-IN_STOCK_URL = f"{API_BASE}/api/products/in-stock/"
-
-def productos_aliados(request):
+async def productos_aliados(request):
     # Permite filtrar destacados vía ?featured=true
-    params = {}
-    featured = request.GET.get("featured")
-    if featured in ("true", "1", "yes"):
-        params["featured"] = featured
-
-    try:
-        r = requests.get(IN_STOCK_URL, params=params, timeout=8)
-        r.raise_for_status()
-        data = r.json()
-        products = data.get("results", [])[:100]  # el endpoint ya limita a 100
-        # Construir URL absoluta de detalle
-        for p in products:
-            rel = p.get("detail_url") or ""
-            p["detail_absolute"] = f"{API_BASE}{rel}"
-        context = {
-            "products": products,
-            "featured": bool(params.get("featured")),
-        }
-        return render(request, "moviegame/aliados.html", {"products": products, "featured": "featured" in params})
-
-    except requests.RequestException as e:
-        # Puedes registrar el error con logging
+    destacados = request.GET.get("featured") in ("true", "1", "yes")
+    products, obsoletos = await aobtener_productos(destacados)
+    if products is None:
         return HttpResponseServerError("No fue posible cargar los productos aliados.")
+    # La plantilla base lee request.user (sesión en BD): se renderiza en un hilo
+    return await sync_to_async(render)(
+        request,
+        "moviegame/aliados.html",
+        {"products": products, "featured": destacados, "obsoletos": obsoletos},
+    )
 
 
 def export_peliculas(request):